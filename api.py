@@ -1,6 +1,8 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Any, Dict, List, Optional
+import json
 import logging
 from contextlib import asynccontextmanager
 
@@ -8,7 +10,13 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from src.core.proxy_manager import ProxyManager
+from src.models.proxy import ProxyBase
+from src.repositories.proxy_repo import ProxyRepository
+from config.settings import PROXY_PAGE_MAX_SIZE
 from src.storage.mongo_client import MongoClient
+from src.storage.redis_client import RedisClient
+from src.monitoring.metrics import REGISTRY, QUEUE_DEPTH, CONTENT_TYPE
+from src.tasks.jobs import JobRunner, JobStore
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -17,44 +25,149 @@ async def lifespan(app: FastAPI):
     mongo_client = MongoClient()
     await mongo_client.init_db()
     logger.info("Database initialized successfully")
+
+    redis_client = RedisClient()
+
+    async def refresh_queue_depth():
+        for state, count in (await redis_client.queue_stats()).items():
+            QUEUE_DEPTH.labels(state).set(count)
+
+    REGISTRY.add_refresher(refresh_queue_depth)
+    app.state.jobs = JobRunner(JobStore(redis_client.redisClient))
     
     yield
     
     logger.info("Shutting down...")
+    await app.state.jobs.close()
+    REGISTRY.remove_refresher(refresh_queue_depth)
 
 app = FastAPI(lifespan=lifespan)
 
-@app.post("/proxies/migrate")
-async def migrate_proxies():
-    """Migrate proxies from text file to MongoDB"""
+async def _migrate_job(progress):
+    proxy_manager = ProxyManager()
     try:
-        proxy_manager = ProxyManager()
-        result = await proxy_manager.migrate_from_file()
-        logger.info(f"Proxy migration completed: {result}")
-        return result
+        return await proxy_manager.migrate_from_file(progress=progress)
+    finally:
+        await proxy_manager.close()
+
+async def _clean_job(progress):
+    proxy_manager = ProxyManager()
+    try:
+        return await proxy_manager.validate_proxies(progress=progress)
+    finally:
+        await proxy_manager.close()
+
+async def _submit(request: Request, kind: str, func) -> Dict[str, Any]:
+    try:
+        job_id, created = await request.app.state.jobs.submit(kind, func, coalesce=True)
     except Exception as e:
-        logger.error(f"Error migrating proxies: {str(e)}")
+        logger.error(f"Error starting {kind} job: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    return {"job_id": job_id, "coalesced": not created, "status_url": f"/jobs/{job_id}"}
+
+@app.post("/proxies/migrate", status_code=202)
+async def migrate_proxies(request: Request):
+    """Start migrating proxies from the text file to MongoDB
+
+    Returns a job id right away; poll GET /jobs/{job_id} for progress.
+    A migration requested while one is active joins that one.
+    """
+    return await _submit(request, "proxies.migrate", _migrate_job)
+
+@app.post("/proxies/clean", status_code=202)
+async def clean_proxies(request: Request):
+    """Start validating and cleaning proxies
+
+    Returns a job id right away; poll GET /jobs/{job_id} for progress.
+    A clean requested while one is active joins that one.
+    """
+    return await _submit(request, "proxies.clean", _clean_job)
 
-@app.post("/proxies/clean")
-async def clean_proxies():
-    """Validate and clean proxies"""
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    """Status, progress counts and, once finished, result of a background job"""
     try:
-        proxy_manager = ProxyManager()
-        result = await proxy_manager.validate_proxies()
-        logger.info("Proxy validation completed")
-        return result
+        job = await request.app.state.jobs.store.get(job_id)
     except Exception as e:
-        logger.error(f"Error cleaning proxies: {str(e)}")
+        logger.error(f"Error fetching job {job_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+PROXY_FIELDS = set(ProxyBase.model_fields) | {"id"}
+
+def _proxy_projection(fields: Optional[str]) -> Optional[Dict[str, int]]:
+    """Mongo projection for a comma separated field list, None for URLs only"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = set(names) - PROXY_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown proxy fields: {', '.join(sorted(unknown))}")
+    projection = {("_id" if name == "id" else name): 1 for name in names}
+    if "id" not in names:
+        projection["_id"] = 0
+    return projection
+
+def _proxy_item(doc: Dict[str, Any], projection: Optional[Dict[str, int]]) -> Any:
+    if projection is None:
+        return doc["url"]
+    return {
+        ("id" if name == "_id" else name): (str(doc[name]) if name == "_id" else doc.get(name))
+        for name, included in projection.items() if included
+    }
 
 @app.get("/proxies")
-async def get_proxies():
-    """Get all active proxies"""
+async def get_proxies(
+    limit: Optional[int] = Query(None, ge=1, le=PROXY_PAGE_MAX_SIZE),
+    after: Optional[str] = None,
+    sort: str = Query("_id", pattern="^(_id|last_checked)$"),
+    fields: Optional[str] = None,
+    stream: bool = False,
+):
+    """Get active proxies
+
+    Without parameters this returns every active proxy URL. Pass limit
+    (and the returned next cursor as after) to page through them, fields
+    to get documents with those fields instead of URLs, and stream=true to
+    get every proxy as NDJSON without building the whole response in
+    memory.
+    """
+    projection = _proxy_projection(fields)
+    repo = ProxyRepository()
+
+    if stream:
+        async def lines():
+            try:
+                async for doc in repo.iter_active(projection or {"_id": 0, "url": 1}):
+                    yield json.dumps(_proxy_item(doc, projection) if projection else {"url": doc["url"]}, default=str) + "\n"
+            except Exception as e:
+                # Headers are already sent, so all we can do is end the stream
+                logger.error(f"Error streaming proxies: {str(e)}")
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
     try:
-        proxy_manager = ProxyManager()
-        proxies = await proxy_manager.get_proxies()
-        return {"proxies": proxies}
+        if limit is None and after is None:
+            proxies = await repo.get_active_urls() if projection is None else [
+                _proxy_item(doc, projection) async for doc in repo.iter_active(projection)
+            ]
+            return {"proxies": proxies}
+
+        docs, next_cursor = await repo.get_active_page(after, limit or 100, sort, projection or {"url": 1})
+        items = [_proxy_item(doc, projection) for doc in docs]
+        return {"proxies": items, "next": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching proxies: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/metrics")
+async def metrics():
+    """Metrics in the Prometheus text format
+
+    Queue depth is shared by every process; task, stage and proxy metrics
+    are exported per worker process (see METRICS_PORT).
+    """
+    return Response(content=await REGISTRY.collect(), media_type=CONTENT_TYPE)
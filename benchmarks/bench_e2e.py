@@ -0,0 +1,367 @@
+"""End-to-end throughput benchmark: Generator -> Redis queue -> Worker -> scrape_product
+
+Starts a local HTTP target serving product pages (with optional latency and
+error injection) and a local forwarding proxy, enqueues --tasks URLs through
+the Generator, then runs in-process workers until the queue is drained.
+Reports tasks/s, per-task latency percentiles, Redis commands per task and
+peak RSS, and saves everything as JSON for comparison with earlier runs.
+
+Redis and Mongo are the configured ones (REDIS_HOST, MONGO_HOST, ...), with
+results and proxies kept in a separate "<MONGO_DB>_bench" database; the task
+queue must be empty. With --fakes they are replaced by in-process fakeredis
+and mongomock-motor instances instead (see requirements-dev.txt).
+
+    python main.py bench --tasks 2000 --workers 2 --slots 16 --latency 50
+    python main.py bench --fakes --error-rate 0.05 --baseline benchmarks/results/last.json
+"""
+import os
+import sys
+import glob
+import json
+import time
+import uuid
+import random
+import asyncio
+import logging
+import platform
+import resource
+import tempfile
+import statistics
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+import aiohttp
+from aiohttp import web
+from config.settings import MONGO_DB
+from src.storage import redis_client as redis_client_module
+from src.storage.mongo_client import MongoClient
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = os.path.join(project_root, "benchmarks", "results")
+
+# Headers a proxy must not forward
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "content-length",
+}
+
+
+def install_fakes() -> Callable[[], int]:
+    """Swap Redis and Mongo for in-process fakes; returns a Redis command counter"""
+    try:
+        import fakeredis
+        # fakeredis runs the queue's Lua scripts with lupa
+        import lupa
+        from fakeredis.aioredis import FakeRedis
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError as e:
+        raise ImportError(
+            f"--fakes requires fakeredis, lupa, mongomock and mongomock-motor "
+            f"(pip install -r requirements-dev.txt): {e}"
+        )
+
+    server = fakeredis.FakeServer()
+
+    class CountingRedis(FakeRedis):
+        # fakeredis has no INFO, so commands are counted on the client side
+        commands = 0
+
+        async def execute_command(self, *args, **options):
+            CountingRedis.commands += 1
+            return await super().execute_command(*args, **options)
+
+    def redis_factory(host=None, port=None, **kwargs):
+        return CountingRedis(server=server, **kwargs)
+
+    redis_client_module.Redis = redis_factory
+
+    # mongomock's bulk builder predates the sort option pymongo passes for
+    # UpdateOne, which the proxy stats writes go through
+    import mongomock.collection
+    add_update = mongomock.collection.BulkOperationBuilder.add_update
+
+    def add_update_without_sort(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+
+    mongomock.collection.BulkOperationBuilder.add_update = add_update_without_sort
+    mongo = MongoClient()
+    mongo.client = AsyncMongoMockClient()
+    mongo.db = mongo.client[MONGO_DB]
+    return lambda: CountingRedis.commands
+
+
+def load_pages(pages_dir: Optional[str], page_size: int) -> List[bytes]:
+    if pages_dir:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+            with open(path, "rb") as f:
+                pages.append(f.read())
+        if not pages:
+            raise ValueError(f"No *.html pages found in {pages_dir}")
+        return pages
+    from benchmarks.bench_extraction import synthetic_page
+    return [synthetic_page(page_size)]
+
+
+async def start_site(app: web.Application):
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def start_target(pages: List[bytes], latency: float, error_rate: float):
+    """Product page server; latency is the mean delay in seconds, varied by +-50%"""
+    stats = {"requests": 0, "errors": 0}
+
+    async def product(request):
+        stats["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency * random.uniform(0.5, 1.5))
+        if random.random() < error_rate:
+            stats["errors"] += 1
+            return web.Response(status=503, text="Injected error")
+        page = pages[hash(request.match_info["item"]) % len(pages)]
+        return web.Response(body=page, content_type="text/html", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/dp/{item}", product)
+    runner, url = await start_site(app)
+    return runner, url, stats
+
+
+async def start_proxy():
+    """Plain HTTP forwarding proxy with a pooled upstream session"""
+    stats = {"requests": 0}
+    upstream = aiohttp.ClientSession(auto_decompress=False)
+
+    async def forward(request):
+        stats["requests"] += 1
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP}
+        async with upstream.request(request.method, str(request.url), headers=headers) as response:
+            body = await response.read()
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_BY_HOP}
+            return web.Response(status=response.status, body=body, headers=headers)
+
+    async def close_upstream(app):
+        await upstream.close()
+
+    app = web.Application()
+    app.router.add_route("*", "/{path:.*}", forward)
+    app.on_cleanup.append(close_upstream)
+    runner, url = await start_site(app)
+    return runner, url, stats
+
+
+def percentile(samples: List[float], pct: int) -> Optional[float]:
+    if not samples:
+        return None
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is in KiB on Linux; children only count once they have exited
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def compare(report: Dict[str, Any], baseline_path: str):
+    """Print the change of the headline numbers against an earlier report"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"Compared with {baseline_path}:")
+    for key in ("tasks_per_second", "latency_p50", "latency_p95", "latency_p99", "redis_ops_per_task"):
+        old, new = baseline.get(key), report["results"].get(key)
+        if old and new is not None:
+            print(f"  {key:>20}: {old:10.3f} -> {new:10.3f} ({(new - old) / old * 100:+.1f}%)")
+
+
+async def run_benchmark(
+    tasks: int = 1000,
+    workers: int = 1,
+    slots: int = 8,
+    latency: float = 0.05,
+    error_rate: float = 0.0,
+    pages_dir: Optional[str] = None,
+    page_size: int = 200_000,
+    sink: str = "jsonl",
+    fakes: bool = False,
+    timeout: float = 600,
+    output: Optional[str] = None,
+    baseline: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Run one benchmark and return (and save) its report
+
+    Args:
+        tasks: Number of URLs enqueued
+        workers: In-process workers sharing this event loop
+        slots: Concurrent tasks per worker
+        latency: Mean target response delay in seconds
+        error_rate: Fraction of target responses replaced by HTTP 503
+        pages_dir: Directory of recorded *.html product pages
+        page_size: Size of the synthetic page used without pages_dir
+        sink: Result sink, "jsonl", "parquet" or "mongo"
+        fakes: Use in-process Redis and Mongo fakes
+        timeout: Seconds after which workers are stopped even if tasks remain
+        output: Report path, by default a timestamped file in benchmarks/results
+        baseline: Earlier report to compare against
+    """
+    if fakes:
+        count_redis_ops = install_fakes()
+    else:
+        # Keep bench proxies and results out of the real database
+        MongoClient(database=f"{MONGO_DB}_bench")
+        count_redis_ops = None
+
+    from src.tasks.generator import Generator
+    from src.tasks.worker import Worker
+    from src.models.proxy import ProxyCreate
+    from src.repositories.proxy_repo import ProxyRepository
+    from src.storage.redis_client import RedisClient
+    from src.storage.result_writer import (
+        BufferedResultWriter, JsonlResultSink, ParquetResultSink, create_result_sink,
+    )
+
+    redis_client = RedisClient()
+    redis = redis_client.redisClient
+
+    async def redis_ops() -> Optional[int]:
+        if count_redis_ops is not None:
+            return count_redis_ops()
+        info = await redis.info("stats")
+        return int(info["total_commands_processed"])
+
+    if await redis_client.queue_size() or await redis.zcard(redis_client.inflight_tasks):
+        raise RuntimeError("The task queue is not empty; drain it or run the benchmark with --fakes")
+
+    pages = load_pages(pages_dir, page_size)
+    target_runner, target_url, target_stats = await start_target(pages, latency, error_rate)
+    proxy_runner, proxy_url, proxy_stats = await start_proxy()
+    result_dir = tempfile.mkdtemp(prefix="bench-results-")
+    try:
+        proxy_repo = ProxyRepository()
+        if not fakes:
+            await proxy_repo.collection.delete_many({})
+        await proxy_repo.create(ProxyCreate(url=proxy_url))
+
+        # A fresh run id keeps URLs out of the dedup index and fetch cache of earlier runs
+        run_id = uuid.uuid4().hex[:8]
+        urls_file = os.path.join(result_dir, "urls.txt")
+        with open(urls_file, "w") as f:
+            for i in range(tasks):
+                f.write(f"{target_url}/dp/{run_id}-{i}\n")
+
+        ops_before = await redis_ops()
+        ingest = await Generator().add_urls_from_file(urls_file)
+        ops_after_ingest = await redis_ops()
+
+        latencies: List[float] = []
+        outcomes = {"succeeded": 0, "failed": 0}
+        worker_list = []
+        for i in range(workers):
+            worker = Worker(f"bench_{i}", slots=slots)
+            # Politeness limits would make this a benchmark of the rate limiter
+            worker.rate_limiter.enabled = False
+            if sink == "jsonl":
+                worker.results = BufferedResultWriter(JsonlResultSink(result_dir))
+            elif sink == "parquet":
+                worker.results = BufferedResultWriter(ParquetResultSink(result_dir))
+            else:
+                worker.results = BufferedResultWriter(create_result_sink(sink))
+            worker.process_task = timed(worker.process_task, latencies, outcomes)
+            worker_list.append(worker)
+
+        started = time.perf_counter()
+        worker_tasks = [asyncio.create_task(worker.start()) for worker in worker_list]
+        deadline = started + timeout
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+            if not await redis_client.queue_size() and not await redis.zcard(redis_client.inflight_tasks):
+                break
+        elapsed = time.perf_counter() - started
+        ops_after = await redis_ops()
+        for worker in worker_list:
+            worker.stop()
+        await asyncio.gather(*worker_tasks, return_exceptions=True)
+
+        pending_retries = await redis.zcard(redis_client.delayed_tasks)
+        remaining = await redis_client.queue_size()
+    finally:
+        await proxy_runner.cleanup()
+        await target_runner.cleanup()
+
+    attempts = outcomes["succeeded"] + outcomes["failed"]
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {
+            "tasks": tasks, "workers": workers, "slots": slots, "latency": latency,
+            "error_rate": error_rate, "pages": len(pages), "page_bytes": sum(map(len, pages)) // len(pages),
+            "sink": sink, "fakes": fakes,
+        },
+        "results": {
+            "elapsed": round(elapsed, 3),
+            "ingested": ingest["added"],
+            "ingest_seconds": ingest["elapsed"],
+            "succeeded": outcomes["succeeded"],
+            "failed_attempts": outcomes["failed"],
+            "pending_retries": pending_retries,
+            "remaining": remaining,
+            "tasks_per_second": round(outcomes["succeeded"] / elapsed, 2) if elapsed else None,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+            "latency_p99": percentile(latencies, 99),
+            "redis_ops_per_task": round((ops_after - ops_after_ingest) / attempts, 2) if attempts else None,
+            "ingest_redis_ops_per_task": round((ops_after_ingest - ops_before) / tasks, 2) if tasks else None,
+            "target_requests": target_stats["requests"],
+            "injected_errors": target_stats["errors"],
+            "proxied_requests": proxy_stats["requests"],
+            "peak_rss_mb": peak_rss_mb(),
+        },
+    }
+
+    output = output or os.path.join(RESULTS_DIR, f"e2e-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    results = report["results"]
+    print(
+        f"{results['succeeded']} tasks in {results['elapsed']:.2f}s ({results['tasks_per_second']} tasks/s), "
+        f"{results['failed_attempts']} failed attempts"
+    )
+    if latencies:
+        print(
+            f"latency p50 {results['latency_p50'] * 1000:.1f} ms, p95 {results['latency_p95'] * 1000:.1f} ms, "
+            f"p99 {results['latency_p99'] * 1000:.1f} ms"
+        )
+    print(
+        f"{results['redis_ops_per_task']} Redis ops/task, peak RSS {results['peak_rss_mb']['self']} MiB "
+        f"(children {results['peak_rss_mb']['children']} MiB)"
+    )
+    print(f"Report saved to {output}")
+    if baseline:
+        compare(report, baseline)
+    return report
+
+
+def timed(process_task, latencies: List[float], outcomes: Dict[str, int]):
+    """Wrap Worker.process_task to record how long each claimed task takes"""
+    async def wrapper(task):
+        started = time.perf_counter()
+        ok = await process_task(task)
+        latencies.append(time.perf_counter() - started)
+        outcomes["succeeded" if ok else "failed"] += 1
+        return ok
+    return wrapper
@@ -0,0 +1,134 @@
+"""Compare BeautifulSoup extraction with the compiled lxml extraction engine
+
+Uses saved product pages from --pages (every *.html file in the directory),
+or a synthetic ~1.5 MB Amazon-like page when none are given. Reports time
+per page for each path, and for the async paths the longest stall seen by
+a coroutine ticking on the event loop while pages are extracted.
+
+    python benchmarks/bench_extraction.py --pages samples/ --rounds 20
+"""
+import os
+import sys
+import glob
+import time
+import asyncio
+import argparse
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from bs4 import BeautifulSoup
+from src.core.extractor import Extractor, InlineExtractor, ProcessPoolExtractor
+
+
+def synthetic_page(size: int = 1_500_000) -> bytes:
+    head = (
+        "<html><head><meta charset='utf-8'><title>Product</title></head><body>"
+        "<div id='dp'><span id='productTitle'>  Synthetic Benchmark Product  </span>"
+        "<span id='acrPopover' title='4.6 out of 5 stars'></span>"
+        "<div id='corePrice_feature_div'><span class='a-price'>"
+        "<span class='a-offscreen'>$24.99</span></span></div>"
+        "<div id='availability'><span> In Stock </span></div>"
+    )
+    filler = "<div class='row'><ul>" + "<li><a href='/dp/x'>Related item</a> <span>details</span></li>" * 20 + "</ul></div>"
+    body = [head]
+    while sum(map(len, body)) < size:
+        body.append(filler)
+    body.append("</div></body></html>")
+    return "".join(body).encode()
+
+
+def bs4_text(element):
+    return " ".join(element.get_text().split()) or None if element is not None else None
+
+
+def bs4_extract(html: bytes):
+    """The DEFAULT_SCHEMA fields with BeautifulSoup, so both paths do the same work"""
+    soup = BeautifulSoup(html, "lxml")
+    rating = soup.select_one("#acrPopover")
+    return {
+        "title": bs4_text(soup.select_one("#productTitle")) or "Title not found",
+        "price": bs4_text(soup.select_one(
+            "#corePrice_feature_div .a-offscreen, #corePriceDisplay_desktop_feature_div .a-offscreen"
+        )),
+        "rating": rating.get("title", "").strip() or None if rating is not None else None,
+        "availability": bs4_text(soup.select_one("#availability")),
+    }
+
+
+def bench_sync(label, func, pages, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            func(page)
+    per_page = (time.perf_counter() - started) / (rounds * len(pages))
+    print(f"{label:>22}: {per_page * 1000:8.2f} ms/page")
+
+
+async def bench_async(label, extractor, pages, rounds, concurrency):
+    max_stall = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal max_stall
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            max_stall = max(max_stall, now - last - 0.001)
+            last = now
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(page):
+        async with semaphore:
+            await extractor.extract(page)
+
+    # Warm up (spawns pool processes)
+    await extractor.extract(pages[0])
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(one(page) for _ in range(rounds) for page in pages))
+    elapsed = time.perf_counter() - started
+    done = True
+    await tick
+    total = rounds * len(pages)
+    print(
+        f"{label:>22}: {elapsed / total * 1000:8.2f} ms/page wall, "
+        f"{total / elapsed:6.1f} pages/s, max loop stall {max_stall * 1000:.1f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=str, help='Directory of saved product pages (*.html)')
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = [open(path, 'rb').read() for path in sorted(glob.glob(os.path.join(args.pages, '*.html')))]
+    else:
+        pages = [synthetic_page()]
+    if not pages:
+        sys.exit(f"No *.html pages found in {args.pages}")
+    print(f"{len(pages)} page(s), {sum(map(len, pages)) / len(pages) / 1e6:.2f} MB average")
+
+    extractor = Extractor()
+    # Both paths should find the same fields, or the comparison is not like for like
+    expected, found = extractor.extract(pages[0]), bs4_extract(pages[0])
+    if found != expected:
+        print(f"Warning: bs4 extracted {found}, lxml {expected}")
+    bench_sync("bs4 (current)", bs4_extract, pages, args.rounds)
+    bench_sync("lxml compiled", extractor.extract, pages, args.rounds)
+
+    await bench_async("inline on loop", InlineExtractor(), pages, args.rounds, args.processes)
+    pool = ProcessPoolExtractor(processes=args.processes)
+    try:
+        await bench_async(f"process pool x{args.processes}", pool, pages, args.rounds, args.processes)
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""Compare fresh-session and pooled-session scraping against a local server
+
+Counts distinct client connections seen by the server, i.e. TCP (and, against
+a real target, TLS) handshakes, per scraped page.
+
+    python benchmarks/bench_sessions.py --requests 500 --concurrency 20
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from aiohttp import web
+from src.core.scraper import scrape_product
+from src.core.session_manager import SessionManager
+
+PAGE = "<html><body><span id='productTitle'> Benchmark Product </span></body></html>"
+
+
+async def start_server():
+    peers = set()
+
+    async def product(request):
+        peers.add(request.transport.get_extra_info('peername'))
+        return web.Response(text=PAGE, content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/dp/{asin}', product)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", peers
+
+
+async def run(label, base_url, peers, requests, concurrency, session_manager=None):
+    peers.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            session = session_manager.get_session() if session_manager else None
+            await scrape_product(f"{base_url}/dp/{i}", {}, 10, session=session)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:>8}: {requests} requests in {elapsed:.2f}s "
+        f"({requests / elapsed:.0f} req/s), {len(peers)} connections, "
+        f"{len(peers) / requests:.3f} handshakes/request"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+
+    runner, base_url, peers = await start_server()
+    try:
+        await run("fresh", base_url, peers, args.requests, args.concurrency)
+        sessions = SessionManager(headers={})
+        try:
+            await run("pooled", base_url, peers, args.requests, args.concurrency, sessions)
+        finally:
+            await sessions.close()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""Import-time budget of the command line entry point
+
+Runs a fresh interpreter with -X importtime per command: first importing
+main.py alone (what --help and argument errors cost), then main.py plus
+the modules the command imports when it runs. Reports the median import
+time over --rounds runs and the slowest modules, and exits non-zero when
+main.py on its own goes over --budget-ms, so heavy imports creeping back
+to module level fail the check.
+
+    python benchmarks/bench_startup.py --rounds 5 --budget-ms 200
+"""
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules each command imports on top of main.py when it runs
+COMMANDS: Dict[str, List[str]] = {
+    "cli": [],
+    "generate": ["src.tasks.generator"],
+    "process": ["src.tasks.worker", "src.tasks.supervisor", "src.monitoring.metrics"],
+    "clean-proxies": ["src.core.proxy_manager"],
+    "migrate-queue": ["src.storage.redis_client"],
+    "serve": ["uvicorn", "api"],
+}
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(modules: List[str]) -> Tuple[float, List[Tuple[float, str]]]:
+    """Import main and modules in a new interpreter
+
+    Returns:
+        Total import time in ms, and (cumulative ms, module) for every module
+    """
+    code = "; ".join(f"import {name}" for name in ["main"] + modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=project_root, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {modules or 'main'} failed:\n{proc.stderr[-2000:]}")
+
+    total = 0.0
+    modules_ms = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative = int(match.group(2)) / 1000
+        modules_ms.append((cumulative, match.group(4)))
+        # Top-level imports carry the cost of everything they import
+        if len(match.group(3)) == 1:
+            total += cumulative
+    return total, modules_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=200,
+                        help='Largest allowed import time of main.py alone (default: 200)')
+    parser.add_argument('--top', type=int, default=5, help='Slowest modules shown per command')
+    parser.add_argument('commands', nargs='*', default=list(COMMANDS), help='Commands to measure')
+    args = parser.parse_args()
+
+    cli_ms = None
+    for command in args.commands:
+        runs = [measure(COMMANDS[command]) for _ in range(args.rounds)]
+        median = statistics.median(total for total, _ in runs)
+        if command == "cli":
+            cli_ms = median
+        print(f"{command:>14}: {median:8.1f} ms")
+        _, modules_ms = runs[-1]
+        for cumulative, name in sorted(modules_ms, reverse=True)[:args.top]:
+            print(f"{'':>16}{cumulative:8.1f} ms  {name}")
+
+    if cli_ms is not None and cli_ms > args.budget_ms:
+        sys.exit(f"main.py imports in {cli_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
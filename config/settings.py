@@ -9,11 +9,162 @@ USER_AGENT = os.getenv('USER_AGENT')
 REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', 30))
 MAX_RETRIES = int(os.getenv('MAX_RETRIES', 3))
 
+# Storage
+REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
+MONGO_HOST = os.getenv('MONGO_HOST', 'localhost')
+MONGO_PORT = int(os.getenv('MONGO_PORT', 27017))
+MONGO_DB = os.getenv('MONGO_DB', 'scraper')
+# Documents fetched per round trip when iterating Mongo cursors
+DB_CURSOR_BATCH_SIZE = int(os.getenv('DB_CURSOR_BATCH_SIZE', 1000))
+PROXY_PAGE_MAX_SIZE = int(os.getenv('PROXY_PAGE_MAX_SIZE', 1000))
+
+# Task Queue
+TASK_LEASE_SECONDS = float(os.getenv('TASK_LEASE_SECONDS', 120))
+LEASE_REAPER_INTERVAL = float(os.getenv('LEASE_REAPER_INTERVAL', 30))
+RETRY_BACKOFF_BASE = float(os.getenv('RETRY_BACKOFF_BASE', 5))
+RETRY_BACKOFF_MAX = float(os.getenv('RETRY_BACKOFF_MAX', 600))
+RETRY_BACKOFF_JITTER = float(os.getenv('RETRY_BACKOFF_JITTER', 0.1))
+URL_BATCH_SIZE = int(os.getenv('URL_BATCH_SIZE', 1000))
+INGEST_PROGRESS_INTERVAL = float(os.getenv('INGEST_PROGRESS_INTERVAL', 5))
+# Each domain has its own sub-queue and domains take turns in proportion to
+# their weight; JSON object of domain -> weight, e.g. {"www.amazon.com": 4}.
+# The queue scripts touch keys they derive themselves, so they need a
+# standalone Redis, not Redis Cluster or a key-checking proxy.
+QUEUE_DOMAIN_WEIGHTS = os.getenv('QUEUE_DOMAIN_WEIGHTS', '{}')
+QUEUE_DEFAULT_WEIGHT = float(os.getenv('QUEUE_DEFAULT_WEIGHT', 1))
+# Seconds of waiting worth one priority level within a domain; 0 disables aging
+QUEUE_AGING_INTERVAL = float(os.getenv('QUEUE_AGING_INTERVAL', 3600))
+
+# Crawl Frontier
+# How long a URL crawled once is remembered and skipped when seeded again
+FRONTIER_SEEN_TTL = int(os.getenv('FRONTIER_SEEN_TTL', 30 * 24 * 3600))
+# Default seconds between recrawls of seeded URLs; 0 crawls them once
+FRONTIER_RECRAWL_INTERVAL = float(os.getenv('FRONTIER_RECRAWL_INTERVAL', 0))
+# How often workers move due recrawls into the queue, and how many at a time
+FRONTIER_SCHEDULE_INTERVAL = float(os.getenv('FRONTIER_SCHEDULE_INTERVAL', 30))
+FRONTIER_SCHEDULE_BATCH = int(os.getenv('FRONTIER_SCHEDULE_BATCH', 1000))
+
 # Proxy Settings
-try:
-    PROXY_URLS = open('proxies.txt', 'r').read().splitlines()
-except (FileNotFoundError, IOError):
-    PROXY_URLS = []
+PROXY_CHECK_URL = os.getenv('PROXY_CHECK_URL', 'https://httpbin.org/ip')
+PROXY_CHECK_TIMEOUT = float(os.getenv('PROXY_CHECK_TIMEOUT', 10))
+PROXY_CHECK_CONCURRENCY = int(os.getenv('PROXY_CHECK_CONCURRENCY', 200))
+PROXY_WRITE_BATCH_SIZE = int(os.getenv('PROXY_WRITE_BATCH_SIZE', 500))
+USE_PROXY = os.getenv('USE_PROXY', 'True').lower() in ('1', 'true', 'yes')
+
+# Background Jobs (proxy clean / migrate started from the API)
+JOB_MAX_CONCURRENT = int(os.getenv('JOB_MAX_CONCURRENT', 2))
+# A job that stops heartbeating for this long is reported as abandoned
+JOB_LOCK_TTL = int(os.getenv('JOB_LOCK_TTL', 60))
+JOB_PROGRESS_INTERVAL = float(os.getenv('JOB_PROGRESS_INTERVAL', 2))
+JOB_TTL = int(os.getenv('JOB_TTL', 7 * 24 * 3600))
+
+# Proxy Pool
+PROXY_POOL_REFRESH_INTERVAL = float(os.getenv('PROXY_POOL_REFRESH_INTERVAL', 60))
+PROXY_BREAKER_FAILURES = int(os.getenv('PROXY_BREAKER_FAILURES', 5))
+PROXY_BREAKER_FORBIDDEN = int(os.getenv('PROXY_BREAKER_FORBIDDEN', 2))
+PROXY_BREAKER_COOLDOWN = float(os.getenv('PROXY_BREAKER_COOLDOWN', 60))
+PROXY_BREAKER_MAX_COOLDOWN = float(os.getenv('PROXY_BREAKER_MAX_COOLDOWN', 600))
+PROXY_EWMA_ALPHA = float(os.getenv('PROXY_EWMA_ALPHA', 0.2))
+# Proxy outcomes are counted per process and written to Mongo in bulk this often
+PROXY_STATS_FLUSH_INTERVAL = float(os.getenv('PROXY_STATS_FLUSH_INTERVAL', 10))
+# Blacklist a proxy after this many consecutive failures / 403s across all workers (0 disables)
+PROXY_BLACKLIST_FAILURES = int(os.getenv('PROXY_BLACKLIST_FAILURES', 50))
+PROXY_BLACKLIST_FORBIDDEN = int(os.getenv('PROXY_BLACKLIST_FORBIDDEN', 10))
+
+# Workers
+WORKER_SLOTS = int(os.getenv('WORKER_SLOTS', 8))
+WORKER_DRAIN_TIMEOUT = float(os.getenv('WORKER_DRAIN_TIMEOUT', 60))
+# Tasks claimed ahead of the busy slots, fetched together in one round trip
+WORKER_PREFETCH = int(os.getenv('WORKER_PREFETCH', 4))
+# Longest an idle worker waits for an enqueue signal before polling again
+WORKER_IDLE_INTERVAL = float(os.getenv('WORKER_IDLE_INTERVAL', 5))
+SUPERVISOR_MAX_RESTART_DELAY = float(os.getenv('SUPERVISOR_MAX_RESTART_DELAY', 30))
+
+# Adaptive Concurrency
+# Tune each worker's concurrency between 1 and its slots from fetch latency
+# and error rate (AIMD); without it every slot is always in use
+ADAPTIVE_CONCURRENCY = os.getenv('ADAPTIVE_CONCURRENCY', 'True').lower() in ('1', 'true', 'yes')
+CONCURRENCY_INITIAL_LIMIT = int(os.getenv('CONCURRENCY_INITIAL_LIMIT', 4))
+# Requests per adjustment, and the factor applied when backing off
+CONCURRENCY_WINDOW = int(os.getenv('CONCURRENCY_WINDOW', 20))
+CONCURRENCY_BACKOFF = float(os.getenv('CONCURRENCY_BACKOFF', 0.7))
+CONCURRENCY_MAX_ERROR_RATE = float(os.getenv('CONCURRENCY_MAX_ERROR_RATE', 0.1))
+# Back off once p95 latency exceeds the best p95 seen by this factor
+CONCURRENCY_LATENCY_TOLERANCE = float(os.getenv('CONCURRENCY_LATENCY_TOLERANCE', 2.0))
+# Also keep a limit per proxy
+CONCURRENCY_PER_PROXY = os.getenv('CONCURRENCY_PER_PROXY', 'False').lower() in ('1', 'true', 'yes')
+CONCURRENCY_PROXY_INITIAL_LIMIT = int(os.getenv('CONCURRENCY_PROXY_INITIAL_LIMIT', 2))
+CONCURRENCY_PROXY_MAX_LIMIT = int(os.getenv('CONCURRENCY_PROXY_MAX_LIMIT', 8))
+
+# Hedged Requests
+# Start a second attempt through another proxy when the response headers of
+# the first take longer than this quantile of recent header times
+HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'False').lower() in ('1', 'true', 'yes')
+HEDGE_QUANTILE = float(os.getenv('HEDGE_QUANTILE', 0.9))
+HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', 0.1))
+# Extra attempts allowed, as a fraction of all requests
+HEDGE_BUDGET = float(os.getenv('HEDGE_BUDGET', 0.1))
+
+# Extraction
+# Processes parsing pages per worker; 0 parses on the worker's event loop
+EXTRACTION_PROCESSES = int(os.getenv('EXTRACTION_PROCESSES', 2))
+
+# Parse pages while they download and stop once every field is found
+STREAM_EXTRACTION = os.getenv('STREAM_EXTRACTION', 'False').lower() in ('1', 'true', 'yes')
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 64 * 1024))
+MAX_BODY_SIZE = int(os.getenv('MAX_BODY_SIZE', 8 * 1024 * 1024))
+
+# Fetch Cache
+# Remember validators, body hashes and results so unchanged pages are not re-extracted
+FETCH_CACHE_ENABLED = os.getenv('FETCH_CACHE_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+FETCH_CACHE_LOCAL_SIZE = int(os.getenv('FETCH_CACHE_LOCAL_SIZE', 10000))
+FETCH_CACHE_TTL = int(os.getenv('FETCH_CACHE_TTL', 7 * 24 * 3600))
+
+# Results
+# Where scraped results go: "mongo", "jsonl" or "parquet" (files in RESULT_DIR)
+RESULT_SINK = os.getenv('RESULT_SINK', 'mongo')
+RESULT_DIR = os.getenv('RESULT_DIR', 'results')
+RESULT_BATCH_SIZE = int(os.getenv('RESULT_BATCH_SIZE', 500))
+RESULT_FLUSH_INTERVAL = float(os.getenv('RESULT_FLUSH_INTERVAL', 2))
+RESULT_MAX_PENDING = int(os.getenv('RESULT_MAX_PENDING', 10000))
+RESULT_MAX_RETRY_DELAY = float(os.getenv('RESULT_MAX_RETRY_DELAY', 30))
+
+# Page Archive
+# Keep every fetched page in compressed segment files under ARCHIVE_DIR so
+# extraction can be rerun later with `main.py reextract`
+ARCHIVE_ENABLED = os.getenv('ARCHIVE_ENABLED', 'False').lower() in ('1', 'true', 'yes')
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+# A new segment is started once the current one reaches this many bytes
+ARCHIVE_SEGMENT_SIZE = int(os.getenv('ARCHIVE_SEGMENT_SIZE', 256 * 1024 * 1024))
+ARCHIVE_COMPRESSION_LEVEL = int(os.getenv('ARCHIVE_COMPRESSION_LEVEL', 6))
+# Pages waiting to be written before fetches wait for the archive
+ARCHIVE_MAX_PENDING = int(os.getenv('ARCHIVE_MAX_PENDING', 1000))
+
+# Rate Limiting
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+RATE_LIMIT_DOMAIN_RPS = float(os.getenv('RATE_LIMIT_DOMAIN_RPS', 2))
+RATE_LIMIT_DOMAIN_BURST = int(os.getenv('RATE_LIMIT_DOMAIN_BURST', 4))
+RATE_LIMIT_PROXY_DOMAIN_RPS = float(os.getenv('RATE_LIMIT_PROXY_DOMAIN_RPS', 0.2))
+RATE_LIMIT_PROXY_DOMAIN_BURST = int(os.getenv('RATE_LIMIT_PROXY_DOMAIN_BURST', 1))
+# JSON object of domain -> requests per second, e.g. {"www.amazon.com": 1}
+RATE_LIMIT_DOMAIN_OVERRIDES = os.getenv('RATE_LIMIT_DOMAIN_OVERRIDES', '{}')
+RATE_LIMIT_PENALTY_TTL = int(os.getenv('RATE_LIMIT_PENALTY_TTL', 300))
+RATE_LIMIT_MAX_PENALTY = float(os.getenv('RATE_LIMIT_MAX_PENALTY', 32))
+
+# Monitoring
+# Port of the per-process /metrics exporter for workers (0 disables it); with
+# --multiprocess worker process i listens on METRICS_PORT + i
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9100))
+# Fraction of tasks whose per-stage timings are kept as detailed traces
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0))
+TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', 200))
+
+# HTTP Connection Pool
+HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', 10))
+HTTP_DNS_CACHE_TTL = int(os.getenv('HTTP_DNS_CACHE_TTL', 300))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', 30))
 
 # HTTP Headers
 HEADERS = {
@@ -21,4 +172,18 @@ HEADERS = {
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
     'Accept-Language': 'en-US,en;q=0.5',
     'Connection': 'keep-alive'
-}
\ No newline at end of file
+}
+
+
+def __getattr__(name):
+    # PROXY_URLS is read from proxies.txt on first access instead of at
+    # import, so commands that never touch it don't pay for the file read
+    if name == 'PROXY_URLS':
+        try:
+            with open('proxies.txt', 'r') as f:
+                value = f.read().splitlines()
+        except (FileNotFoundError, IOError):
+            value = []
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,9 +2,10 @@ import os
 import sys
 import asyncio
 import argparse
+import signal
 import uuid
 import textwrap
-import uvicorn
+import importlib.util
 
 __version__ = "1.0.0"
 
@@ -12,9 +13,10 @@ __version__ = "1.0.0"
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(project_root)
 
-from src.core.proxy_manager import ProxyManager
-from src.tasks.generator import Generator
-from src.tasks.worker import Worker
+# Only cheap modules are imported here. Each command imports what it needs
+# when it runs, so --help and short commands don't pay for aiohttp, pydantic,
+# the database drivers and the API stack (see benchmarks/bench_startup.py).
+from config.settings import WORKER_SLOTS, ARCHIVE_DIR, RESULT_SINK
 import logging
 
 logging.basicConfig(
@@ -23,9 +25,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-async def generate_tasks():
-    """Generate sample tasks and add them to Redis"""
+async def generate_tasks(urls_file: str = None, priority: int = 1, batch_size: int = None, recrawl_interval: float = None):
+    """Add tasks from a seed file to Redis, or generate sample tasks if none is given"""
+    from src.tasks.generator import Generator
     generator = Generator()
+    if urls_file:
+        kwargs = {"batch_size": batch_size} if batch_size else {}
+        if recrawl_interval is not None:
+            kwargs["recrawl_interval"] = recrawl_interval
+        result = await generator.add_urls_from_file(urls_file, priority=priority, **kwargs)
+        logger.info(f"Tasks generated successfully: {result}")
+        return
+
     urls = [
         "https://www.amazon.com/dp/B0B8Q9FGMD",
         "https://www.amazon.com/dp/B0B8Q9FGME", 
@@ -35,29 +46,124 @@ async def generate_tasks():
         await generator.add_url(url, index)
     logger.info("Tasks generated successfully")
 
-async def process_tasks(num_workers: int = 2):
+async def process_tasks(num_workers: int = 2, slots: int = WORKER_SLOTS, timeout: float = None, multiprocess: bool = False):
+    """Run workers until interrupted or until the timeout expires
+
+    With multiprocess each worker gets its own OS process and event loop
+    under a Supervisor; otherwise all workers share this event loop. Each
+    process serves its metrics on METRICS_PORT (plus its index with
+    multiprocess).
+    """
+    from config.settings import METRICS_PORT
+    from src.monitoring.metrics import MetricsServer
+    from src.tasks.supervisor import Supervisor
+    from src.tasks.worker import Worker
+
+    if multiprocess:
+        supervisor = Supervisor(num_workers, slots=slots)
+        await supervisor.run(timeout)
+        return
+
     workers = []
     for i in range(num_workers):
         worker_id = f"worker_{uuid.uuid4().hex[:8]}"
-        worker = Worker(worker_id)
+        worker = Worker(worker_id, slots=slots)
         workers.append(worker)
-    
-    # Start all workers
-    worker_tasks = [worker.start() for worker in workers]
-    try:
-        # Wait for all workers to complete
-        await asyncio.gather(*worker_tasks)
-    except KeyboardInterrupt:
+
+    def stop_workers():
         logger.info("Shutting down workers...")
         for worker in workers:
             worker.stop()
 
-async def clean_proxies():
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_workers)
+    
+    metrics = MetricsServer(METRICS_PORT) if METRICS_PORT else None
+    if metrics:
+        await metrics.start()
+
+    # Start all workers
+    worker_tasks = [asyncio.create_task(worker.start()) for worker in workers]
+    try:
+        # Wait for all workers to complete, or stop them once the timeout expires
+        _, pending = await asyncio.wait(worker_tasks, timeout=timeout)
+        if pending:
+            logger.info("Timeout reached")
+            stop_workers()
+        await asyncio.gather(*worker_tasks, return_exceptions=True)
+    finally:
+        if metrics:
+            await metrics.stop()
+
+async def migrate_queue():
+    """Move tasks from the legacy list-based and single sorted-set queues into domain sub-queues"""
+    from src.storage.redis_client import RedisClient
+    redis_client = RedisClient()
+    result = await redis_client.migrate_legacy_queue()
+    logger.info(f"Queue migration completed: {result}")
+
+async def clean_proxies(timeout: float, concurrency: int):
     """Validate all proxies and keep only the working ones"""
+    from src.core.proxy_manager import ProxyManager
     proxy_manager = ProxyManager()
-    await proxy_manager.validate_proxies()
+    try:
+        result = await proxy_manager.validate_proxies(concurrency=concurrency, timeout=timeout)
+        logger.info(f"Proxy validation result: {result}")
+    finally:
+        await proxy_manager.close()
     logger.info("Proxy validation completed")
 
+async def reextract(archive_dir: str, sink: str, processes: int):
+    """Extract fields again from archived pages"""
+    from src.tasks.reextract import reextract as run_reextract
+    await run_reextract(archive_dir, sink, processes)
+
+async def bench(args):
+    """Run the end-to-end throughput benchmark against local stand-in services"""
+    from benchmarks.bench_e2e import run_benchmark
+    if not args.verbose:
+        logging.getLogger("src").setLevel(logging.WARNING)
+    await run_benchmark(
+        tasks=args.tasks,
+        workers=args.workers,
+        slots=args.slots,
+        latency=args.latency / 1000,
+        error_rate=args.error_rate,
+        pages_dir=args.pages,
+        page_size=args.page_size,
+        sink=args.sink,
+        fakes=args.fakes,
+        timeout=args.timeout,
+        output=args.output,
+        baseline=args.baseline,
+    )
+
+def serve(args):
+    """Run the API server
+
+    Uses uvloop and httptools when they are installed. With more than one
+    worker uvicorn forks that many processes sharing the listening socket.
+    Reload is for development only and always runs a single process.
+    """
+    import uvicorn
+
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    workers = 1 if args.reload else args.workers
+    logger.info(f"Serving API on http://{args.host}:{args.port} ({workers} worker(s), {loop}/{http})")
+    uvicorn.run(
+        "api:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        reload=args.reload,
+        loop=loop,
+        http=http,
+        log_level=args.log_level,
+        access_log=args.access_log,
+    )
+
 def create_parser():
     """Create the command line parser"""
     parser = argparse.ArgumentParser(
@@ -66,8 +172,14 @@ def create_parser():
             
             Example usage:
               %(prog)s generate                     # Generate sample scraping tasks
+              %(prog)s generate --urls-file seeds.gz  # Enqueue every URL in a seed file
               %(prog)s process --workers 4          # Process tasks with 4 workers
+              %(prog)s process --workers 8 --multiprocess  # One OS process per worker
               %(prog)s clean-proxies               # Validate and clean proxy list
+              %(prog)s migrate-queue               # Move tasks from older queue layouts into domain sub-queues
+              %(prog)s reextract --sink jsonl       # Extract again from archived pages
+              %(prog)s bench --fakes --tasks 2000  # Measure end-to-end throughput locally
+              %(prog)s serve --workers 4            # Serve the API from 4 processes
         '''),
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
@@ -77,12 +189,23 @@ def create_parser():
     
     # Generate command
     generate_parser = subparsers.add_parser('generate', help='Generate sample scraping tasks')
-    generate_parser.add_argument('--urls-file', type=str, help='Path to file containing URLs to scrape')
+    generate_parser.add_argument('--urls-file', type=str,
+                              help='Path to a text, JSONL or gzip file containing URLs to scrape')
+    generate_parser.add_argument('--priority', type=int, default=1,
+                              help='Priority for URLs that do not specify one (default: 1)')
+    generate_parser.add_argument('--batch-size', type=int,
+                              help='Number of URLs enqueued per Redis round trip')
+    generate_parser.add_argument('--recrawl-interval', type=float,
+                              help='Seconds between recrawls for URLs that do not specify one (0: crawl once)')
     
     # Process command
     process_parser = subparsers.add_parser('process', help='Process scraping tasks')
     process_parser.add_argument('--workers', type=int, default=2,
-                             help='Number of worker processes (default: 2)')
+                             help='Number of workers (default: 2)')
+    process_parser.add_argument('--slots', type=int, default=WORKER_SLOTS,
+                             help=f'Concurrent tasks per worker (default: {WORKER_SLOTS})')
+    process_parser.add_argument('--multiprocess', action='store_true',
+                             help='Run each worker in its own OS process under a supervisor')
     process_parser.add_argument('--timeout', type=int, default=3600,
                              help='Timeout in seconds for the entire process (default: 3600)')
     
@@ -90,6 +213,49 @@ def create_parser():
     clean_parser = subparsers.add_parser('clean-proxies', help='Validate and clean proxy list')
     clean_parser.add_argument('--timeout', type=int, default=10,
                            help='Timeout in seconds for each proxy check (default: 10)')
+    clean_parser.add_argument('--concurrency', type=int, default=200,
+                           help='Number of proxies checked at the same time (default: 200)')
+    
+    # Migrate queue command
+    subparsers.add_parser('migrate-queue', help='Migrate tasks from older queue layouts into domain sub-queues')
+    
+    # Re-extract command
+    reextract_parser = subparsers.add_parser('reextract', help='Extract fields again from archived pages')
+    reextract_parser.add_argument('--archive-dir', type=str, default=ARCHIVE_DIR,
+                               help=f'Directory of archive segments (default: {ARCHIVE_DIR})')
+    reextract_parser.add_argument('--sink', choices=['jsonl', 'parquet', 'mongo'], default=RESULT_SINK,
+                               help=f'Result sink (default: {RESULT_SINK})')
+    reextract_parser.add_argument('--processes', type=int,
+                               help='Extraction processes (default: one per CPU)')
+    
+    # Benchmark command
+    bench_parser = subparsers.add_parser('bench', help='Run the end-to-end throughput benchmark')
+    bench_parser.add_argument('--tasks', type=int, default=1000,
+                            help='Number of tasks to enqueue (default: 1000)')
+    bench_parser.add_argument('--workers', type=int, default=1,
+                            help='Number of in-process workers (default: 1)')
+    bench_parser.add_argument('--slots', type=int, default=WORKER_SLOTS,
+                            help=f'Concurrent tasks per worker (default: {WORKER_SLOTS})')
+    bench_parser.add_argument('--latency', type=float, default=50,
+                            help='Mean target response latency in milliseconds (default: 50)')
+    bench_parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Fraction of target responses that fail with HTTP 503 (default: 0)')
+    bench_parser.add_argument('--pages', type=str,
+                            help='Directory of recorded *.html product pages to serve')
+    bench_parser.add_argument('--page-size', type=int, default=200_000,
+                            help='Size in bytes of the synthetic page used without --pages')
+    bench_parser.add_argument('--sink', choices=['jsonl', 'parquet', 'mongo'], default='jsonl',
+                            help='Result sink (default: jsonl, in a temporary directory)')
+    bench_parser.add_argument('--fakes', action='store_true',
+                            help='Use in-process Redis and Mongo fakes instead of real servers')
+    bench_parser.add_argument('--timeout', type=float, default=600,
+                            help='Stop after this many seconds even if tasks remain (default: 600)')
+    bench_parser.add_argument('--output', type=str,
+                            help='Report path (default: benchmarks/results/e2e-<timestamp>.json)')
+    bench_parser.add_argument('--baseline', type=str,
+                            help='Earlier report to compare the results with')
+    bench_parser.add_argument('--verbose', action='store_true',
+                            help='Keep per-task worker logging')
     
     # Add API server command
     api_parser = subparsers.add_parser('serve', help='Start the FastAPI server')
@@ -97,9 +263,31 @@ def create_parser():
                           help='Host to bind the server to (default: localhost)')
     api_parser.add_argument('--port', type=int, default=8000,
                           help='Port to bind the server to (default: 8000)')
+    api_parser.add_argument('--workers', type=int, default=1,
+                          help='Number of server processes (default: 1)')
+    api_parser.add_argument('--reload', action='store_true',
+                          help='Restart on code changes; development only, implies one worker')
+    api_parser.add_argument('--log-level', choices=['critical', 'error', 'warning', 'info', 'debug'],
+                          default='info', help='Server log level (default: info)')
+    api_parser.add_argument('--no-access-log', dest='access_log', action='store_false',
+                          help='Disable per-request access logging')
     return parser
 
-async def main():
+async def run_command(args):
+    if args.command == 'generate':
+        await generate_tasks(args.urls_file, args.priority, args.batch_size, args.recrawl_interval)
+    elif args.command == 'process':
+        await process_tasks(args.workers, args.slots, args.timeout, args.multiprocess)
+    elif args.command == 'clean-proxies':
+        await clean_proxies(args.timeout, args.concurrency)
+    elif args.command == 'migrate-queue':
+        await migrate_queue()
+    elif args.command == 'reextract':
+        await reextract(args.archive_dir, args.sink, args.processes)
+    elif args.command == 'bench':
+        await bench(args)
+
+def main():
     parser = create_parser()
     args = parser.parse_args()
     
@@ -108,14 +296,11 @@ async def main():
         sys.exit(1)
     
     try:
-        if args.command == 'generate':
-            await generate_tasks()
-        elif args.command == 'process':
-            await process_tasks(args.workers)
-        elif args.command == 'clean-proxies':
-            await clean_proxies()
-        elif args.command == 'serve':
-            uvicorn.run("api:app", host=args.host, port=args.port, reload=True)
+        if args.command == 'serve':
+            # uvicorn runs its own event loop, so it must not be started from one
+            serve(args)
+        else:
+            asyncio.run(run_command(args))
     
     except KeyboardInterrupt:
         logger.info("\nOperation cancelled by user")
@@ -125,4 +310,4 @@ async def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
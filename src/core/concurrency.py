@@ -0,0 +1,160 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, List, Optional
+from config.settings import (
+    CONCURRENCY_WINDOW,
+    CONCURRENCY_BACKOFF,
+    CONCURRENCY_MAX_ERROR_RATE,
+    CONCURRENCY_LATENCY_TOLERANCE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Request outcomes reported to a limiter
+SUCCESS = "success"
+# Failures that say nothing about load, e.g. a page that could not be parsed
+ERROR = "error"
+# Timeouts and block responses: we are going too fast
+OVERLOAD = "overload"
+
+# How far the latency baseline may rise per window, so a target that
+# gets slower at any concurrency doesn't hold the limit down for good
+BASELINE_DRIFT = 0.05
+
+
+class AIMDLimiter:
+    """Concurrency limit with additive increase and multiplicative decrease
+
+    Request outcomes are evaluated in windows of `window` requests. The
+    limit grows by `increase` after a window whose error rate stays under
+    max_error_rate and whose p95 latency stays within latency_tolerance
+    times the lowest p95 seen so far, provided the limit was actually
+    reached. It is multiplied by `backoff` after an unhealthy window, and
+    straight away on an overload outcome (timeout, 403, 429, 503); like
+    TCP, only one overload decrease counts per round of requests, so a
+    burst of blocked requests that were sent together backs off once.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        max_limit: int,
+        min_limit: int = 1,
+        increase: float = 1.0,
+        backoff: float = CONCURRENCY_BACKOFF,
+        window: int = CONCURRENCY_WINDOW,
+        max_error_rate: float = CONCURRENCY_MAX_ERROR_RATE,
+        latency_tolerance: float = CONCURRENCY_LATENCY_TOLERANCE,
+        name: str = "global",
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.increase = increase
+        self.backoff = backoff
+        self.window = max(1, window)
+        self.max_error_rate = max_error_rate
+        self.latency_tolerance = latency_tolerance
+        self.name = name
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._latencies: List[float] = []
+        self._errors = 0
+        self._saturated = False
+        self._decreased_at = 0.0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def try_acquire(self) -> bool:
+        """Take a permit if one is free right now"""
+        if self.in_flight >= self.limit:
+            return False
+        self.in_flight += 1
+        if self.in_flight >= self.limit:
+            self._saturated = True
+        return True
+
+    async def acquire(self):
+        """Wait for a permit"""
+        while not self.try_acquire():
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Pass a wakeup we may have received on to the next waiter
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        free = self.limit - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def observe(self, outcome: str, latency: Optional[float] = None, started: Optional[float] = None):
+        """Report the outcome of a request
+
+        Args:
+            outcome: SUCCESS, ERROR or OVERLOAD
+            latency: Seconds the request took, for successes
+            started: time.monotonic() when the request was sent; overloads
+                of requests sent before the last decrease are not counted again
+        """
+        if outcome == OVERLOAD:
+            if started is None or started >= self._decreased_at:
+                self._decrease("overload")
+            self._errors += 1
+        elif outcome == ERROR:
+            self._errors += 1
+        elif latency is not None:
+            self._latencies.append(latency)
+
+        if len(self._latencies) + self._errors >= self.window:
+            self._evaluate()
+
+    def _evaluate(self):
+        samples = len(self._latencies) + self._errors
+        error_rate = self._errors / samples
+        p95 = None
+        if self._latencies:
+            self._latencies.sort()
+            p95 = self._latencies[min(len(self._latencies) - 1, int(len(self._latencies) * 0.95))]
+        saturated = self._saturated
+        self._latencies = []
+        self._errors = 0
+        self._saturated = self.in_flight >= self.limit
+
+        if error_rate > self.max_error_rate:
+            self._decrease(f"error rate {error_rate:.0%}")
+        elif p95 is not None and self.baseline is not None and p95 > self.baseline * self.latency_tolerance:
+            self._decrease(f"p95 latency {p95:.2f}s over baseline {self.baseline:.2f}s")
+        elif saturated and self._limit < self.max_limit:
+            self._limit = min(self.max_limit, self._limit + self.increase)
+            logger.debug(f"Concurrency limit {self.name} raised to {self.limit}")
+            self._wake()
+
+        if p95 is not None:
+            self.baseline = p95 if self.baseline is None else min(p95, self.baseline * (1 + BASELINE_DRIFT))
+
+    def _decrease(self, reason: str):
+        previous = self.limit
+        self._limit = max(self.min_limit, self._limit * self.backoff)
+        self._decreased_at = time.monotonic()
+        if self.limit != previous:
+            logger.debug(f"Concurrency limit {self.name} lowered to {self.limit} ({reason})")
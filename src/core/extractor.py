@@ -0,0 +1,270 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Set, Tuple, Union
+from lxml import etree
+from config.settings import EXTRACTION_PROCESSES
+
+# Declarative field schema: field name -> selector spec. Each spec has either
+# an "xpath" or a "css" selector and an optional "default". Selectors that
+# match an element yield its whitespace-normalized text, selectors that
+# match an attribute or text node yield the stripped string.
+DEFAULT_SCHEMA: Dict[str, Dict[str, Any]] = {
+    "title": {
+        "xpath": "//*[@id='productTitle']",
+        "default": "Title not found",
+    },
+    "price": {
+        "xpath": (
+            "(//*[@id='corePrice_feature_div' or @id='corePriceDisplay_desktop_feature_div']"
+            "//span[contains(concat(' ', normalize-space(@class), ' '), ' a-offscreen ')])[1]"
+        ),
+    },
+    "rating": {
+        "xpath": "//*[@id='acrPopover']/@title",
+    },
+    "availability": {
+        "xpath": "//*[@id='availability']",
+    },
+}
+
+
+def _compile(field: str, spec: Dict[str, Any]) -> etree.XPath:
+    if "xpath" in spec:
+        return etree.XPath(spec["xpath"])
+    if "css" in spec:
+        try:
+            from lxml.cssselect import CSSSelector
+        except ImportError:
+            raise ImportError(f"Field '{field}' uses a CSS selector, which requires the cssselect package")
+        # CSSSelector translates to XPath once, at compile time
+        return CSSSelector(spec["css"])
+    raise ValueError(f"Field '{field}' needs an 'xpath' or 'css' selector")
+
+
+def _value(match) -> Optional[str]:
+    if isinstance(match, etree._Element):
+        return " ".join("".join(match.itertext()).split()) or None
+    return str(match).strip() or None
+
+
+def _select(selector, root, is_complete=None) -> Tuple[bool, Optional[str]]:
+    """Evaluate a selector and return (resolved, value) for its first non-empty match
+
+    On a partially parsed document is_complete(match) says whether a match
+    can no longer change; the field stays unresolved at the first match
+    that still can, and when nothing matches yet.
+    """
+    matches = selector(root)
+    if not isinstance(matches, list):
+        # Scalar results (counts, booleans) are only final on the full document
+        if is_complete is not None:
+            return False, None
+        return True, _value(matches) if matches else None
+    for match in matches:
+        if is_complete is not None and not is_complete(match):
+            return False, None
+        value = _value(match)
+        if value is not None:
+            return True, value
+    return is_complete is None, None
+
+
+class Extractor:
+    """Extracts a declarative field schema from HTML with precompiled selectors
+
+    Pages are parsed with raw lxml, which is considerably cheaper than
+    building a BeautifulSoup tree, and every selector is compiled once when
+    the extractor is created.
+    """
+
+    def __init__(self, schema: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.schema = DEFAULT_SCHEMA if schema is None else schema
+        self._fields = [
+            (field, _compile(field, spec), spec.get("default"))
+            for field, spec in self.schema.items()
+        ]
+
+    def extract(self, html: Union[bytes, str], encoding: Optional[str] = None) -> Dict[str, Any]:
+        parser = etree.HTMLParser(encoding=encoding if isinstance(html, bytes) else None)
+        root = etree.fromstring(html, parser)
+        result = {}
+        for field, selector, default in self._fields:
+            value = _select(selector, root)[1] if root is not None else None
+            result[field] = default if value is None else value
+        return result
+
+    def stream(self, encoding: Optional[str] = None) -> "StreamingExtraction":
+        """Start an incremental extraction for a document fed chunk by chunk"""
+        return StreamingExtraction(self._fields, encoding)
+
+
+# Unresolved selectors are evaluated again once the document has grown by
+# this factor since the last evaluation. Each evaluation walks the whole
+# partial tree, so evaluating after every chunk would cost quadratic time
+# on pages where a field never matches; growing the interval geometrically
+# keeps the total linear in the page size.
+RESOLVE_GROWTH = 1.5
+
+
+class StreamingExtraction:
+    """Extracts fields from a document while it is still arriving
+
+    Chunks are fed into lxml's incremental HTML parser and the unresolved
+    selectors are evaluated on the partial tree after the first chunk and
+    then whenever the document has grown by RESOLVE_GROWTH. A match is
+    only accepted once it can no longer change, i.e. its element has been
+    closed, so feed() returns True as soon as every field is final and the
+    rest of the document can be skipped.
+
+    Selectors should only depend on the matched node and what precedes it
+    in the document; anything else (e.g. `last()`) resolves on close().
+    """
+
+    def __init__(self, fields, encoding: Optional[str] = None):
+        self._fields = fields
+        self._pending = list(fields)
+        self._parser = etree.HTMLPullParser(events=("start",), encoding=encoding)
+        self._root = None
+        self._values: Dict[str, Any] = {}
+        self._fed = 0
+        self._next_resolve = 0
+
+    @property
+    def done(self) -> bool:
+        return not self._pending
+
+    def feed(self, chunk: bytes) -> bool:
+        """Parse another chunk; returns True once every field is resolved"""
+        self._parser.feed(chunk)
+        self._fed += len(chunk)
+        for _, element in self._parser.read_events():
+            if self._root is None:
+                self._root = element.getroottree().getroot()
+        if self._root is not None and self._pending and self._fed >= self._next_resolve:
+            self._resolve(self._open_elements())
+            self._next_resolve = self._fed * RESOLVE_GROWTH
+        return self.done
+
+    def close(self) -> Dict[str, Any]:
+        """Finish parsing whatever was fed and return the extracted fields"""
+        try:
+            root = self._parser.close()
+        except etree.XMLSyntaxError:
+            root = None
+        if root is not None and self._pending:
+            self._root = root
+            self._resolve(None)
+        return {
+            field: self._values.get(field, default)
+            for field, _, default in self._fields
+        }
+
+    def _open_elements(self) -> Set[etree._Element]:
+        # Elements still being parsed are always on the root's last-child chain
+        open_elements = set()
+        node = self._root
+        while node is not None:
+            open_elements.add(node)
+            node = node[-1] if len(node) else None
+        return open_elements
+
+    def _resolve(self, open_elements: Optional[Set[etree._Element]]):
+        is_complete = None
+        if open_elements is not None:
+            def is_complete(match):
+                if isinstance(match, etree._Element):
+                    return match not in open_elements
+                if getattr(match, "is_attribute", False):
+                    return True
+                parent = match.getparent() if hasattr(match, "getparent") else None
+                return parent is not None and parent not in open_elements and (
+                    not match.is_tail or parent.getparent() not in open_elements
+                )
+
+        pending = []
+        for field in self._pending:
+            name, selector, default = field
+            resolved, value = _select(selector, self._root, is_complete)
+            if resolved:
+                if value is not None:
+                    self._values[name] = value
+            else:
+                pending.append(field)
+        self._pending = pending
+
+
+class InlineExtractor:
+    """Extraction stage that runs on the event loop; fine for small pages and tests"""
+
+    def __init__(self, schema: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.extractor = Extractor(schema)
+        self.schema = self.extractor.schema
+
+    async def extract(self, html: Union[bytes, str], encoding: Optional[str] = None) -> Dict[str, Any]:
+        return self.extractor.extract(html, encoding)
+
+    def stream(self, encoding: Optional[str] = None) -> StreamingExtraction:
+        return self.extractor.stream(encoding)
+
+    def close(self):
+        pass
+
+
+# Per-process extractor for ProcessPoolExtractor, built once by the pool initializer
+_process_extractor: Optional[Extractor] = None
+
+
+def _init_process(schema: Dict[str, Dict[str, Any]]):
+    global _process_extractor
+    _process_extractor = Extractor(schema)
+
+
+def _extract_in_process(html: Union[bytes, str], encoding: Optional[str]) -> Dict[str, Any]:
+    return _process_extractor.extract(html, encoding)
+
+
+class ProcessPoolExtractor:
+    """Extraction stage that parses pages in a process pool
+
+    Keeps multi-megabyte parses off the event loop (and off its GIL) so
+    other in-flight requests are not stalled. Each pool process compiles
+    the schema once at startup.
+    """
+
+    def __init__(self, schema: Optional[Dict[str, Dict[str, Any]]] = None, processes: int = EXTRACTION_PROCESSES):
+        self.schema = DEFAULT_SCHEMA if schema is None else schema
+        # Also used for streaming extraction, which happens chunk by chunk on
+        # the event loop; compiling here makes a bad schema fail fast
+        self._local = Extractor(self.schema)
+        self.processes = processes
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process,
+                initargs=(self.schema,),
+            )
+        return self._executor
+
+    async def extract(self, html: Union[bytes, str], encoding: Optional[str] = None) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), _extract_in_process, html, encoding)
+
+    def stream(self, encoding: Optional[str] = None) -> StreamingExtraction:
+        return self._local.stream(encoding)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+def create_extractor(schema: Optional[Dict[str, Dict[str, Any]]] = None, processes: int = EXTRACTION_PROCESSES):
+    """Process pool extraction stage, or an inline one when processes is 0"""
+    if processes > 0:
+        return ProcessPoolExtractor(schema, processes)
+    return InlineExtractor(schema)
@@ -0,0 +1,69 @@
+import logging
+from collections import deque
+from typing import Deque, Optional
+from config.settings import HEDGE_QUANTILE, HEDGE_MIN_DELAY, HEDGE_BUDGET
+
+logger = logging.getLogger(__name__)
+
+# Header times kept for the quantile, and how many are needed before hedging
+SAMPLE_WINDOW = 200
+MIN_SAMPLES = 20
+# The quantile is recomputed every this many samples
+RECOMPUTE_EVERY = 10
+# Unused budget saved up for bursts of slow requests, in hedges
+MAX_SAVED_HEDGES = 10.0
+
+
+class HedgePolicy:
+    """When to hedge a fetch, and whether there is budget left to
+
+    The hedge delay is the given quantile of recent times to first
+    response headers, so with the default p90 only the slowest tenth of
+    requests are hedged. Every request earns `budget` of a hedge and each
+    hedge spends one, which caps hedges at that fraction of requests no
+    matter how slow the proxies get.
+    """
+
+    def __init__(
+        self,
+        quantile: float = HEDGE_QUANTILE,
+        min_delay: float = HEDGE_MIN_DELAY,
+        budget: float = HEDGE_BUDGET,
+    ):
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.budget = budget
+        self._samples: Deque[float] = deque(maxlen=SAMPLE_WINDOW)
+        self._since_recompute = 0
+        self._delay: Optional[float] = None
+        self._tokens = 0.0
+
+    @property
+    def delay(self) -> Optional[float]:
+        """Seconds to wait for headers before hedging, None while there are too few samples"""
+        return self._delay
+
+    def observe_headers(self, seconds: float):
+        """Record a time to first headers, or the time waited so far for a primary cancelled without them"""
+        self._samples.append(seconds)
+        self._since_recompute += 1
+        if len(self._samples) >= MIN_SAMPLES and (self._delay is None or self._since_recompute >= RECOMPUTE_EVERY):
+            ordered = sorted(self._samples)
+            value = ordered[min(len(ordered) - 1, int(len(ordered) * self.quantile))]
+            self._delay = max(self.min_delay, value)
+            self._since_recompute = 0
+
+    def on_request(self):
+        """Earn budget for one request"""
+        self._tokens = min(MAX_SAVED_HEDGES, self._tokens + self.budget)
+
+    def try_spend(self) -> bool:
+        """Take budget for one hedge if there is enough"""
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def refund(self):
+        """Return budget taken for a hedge that could not be started"""
+        self._tokens += 1
@@ -1,98 +1,195 @@
-import random
+import time
+import asyncio
 import aiohttp
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-from config.settings import HEADERS
+from pymongo.errors import BulkWriteError
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from config.settings import (
+    PROXY_CHECK_URL,
+    PROXY_CHECK_TIMEOUT,
+    PROXY_CHECK_CONCURRENCY,
+    PROXY_WRITE_BATCH_SIZE,
+)
 from src.repositories.proxy_repo import ProxyRepository
 from src.models.proxy import ProxyCreate
+from src.core.session_manager import SessionManager
+
+# Called with running counts while a long operation makes progress
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
 
 class ProxyManager:
-    def __init__(self):
+    def __init__(self, session_manager: Optional[SessionManager] = None, check_url: str = PROXY_CHECK_URL):
         self.repo = ProxyRepository()
-    
+        self.check_url = check_url
+        # Only close the session manager on close() if we created it. Our own
+        # pool is unbounded since check_proxies already caps concurrency.
+        self._owns_sessions = session_manager is None
+        self.sessions = session_manager or SessionManager(limit=0)
+
+    async def close(self):
+        """Release pooled HTTP connections owned by this manager"""
+        if self._owns_sessions:
+            await self.sessions.close()
+
     async def get_proxies(self) -> List[str]:
         """Get the list of all active proxies"""
-        proxies = await self.repo.get_active_proxies()
-        return [proxy.url for proxy in proxies]
-    
-    async def check_proxy(self, proxy_url: str) -> tuple[bool, float]:
+        return await self.repo.get_active_urls()
+
+    async def check_proxy(self, proxy_url: str, timeout: float = PROXY_CHECK_TIMEOUT) -> tuple[bool, float]:
         """Check if the proxy is working using aiohttp and return status and response time"""
-        start_time = datetime.utcnow()
+        start_time = time.monotonic()
         try:
-            timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout) as session:
-                async with session.get(
-                    "https://httpbin.org/ip",
-                    proxy=proxy_url,
-                    ssl=False
-                ) as response:
-                    is_working = response.status == 200
-                    response_time = (datetime.utcnow() - start_time).total_seconds()
-                    return is_working, response_time
-        except:
+            session = self.sessions.get_session()
+            async with session.get(
+                self.check_url,
+                proxy=proxy_url,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                ssl=False
+            ) as response:
+                is_working = response.status == 200
+                response_time = time.monotonic() - start_time
+                return is_working, response_time
+        except Exception:
             return False, 0.0
 
-    async def validate_proxies(self) -> Dict[str, Any]:
+    async def check_proxies(
+        self,
+        proxy_urls: Iterable[str],
+        concurrency: int = PROXY_CHECK_CONCURRENCY,
+        timeout: float = PROXY_CHECK_TIMEOUT
+    ) -> AsyncIterator[Tuple[str, bool, float]]:
+        """Check proxies concurrently, yielding (url, is_working, response_time) as each finishes
+
+        A fixed set of `concurrency` checkers pulls from `proxy_urls`, so at
+        most that many checks (and results) are in flight at any time.
+        """
+        proxy_urls = iter(proxy_urls)
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def checker():
+            try:
+                for proxy_url in proxy_urls:
+                    is_working, response_time = await self.check_proxy(proxy_url, timeout)
+                    await results.put((proxy_url, is_working, response_time))
+            finally:
+                await results.put(None)
+
+        checkers = [asyncio.create_task(checker()) for _ in range(max(1, concurrency))]
+        remaining = len(checkers)
+        try:
+            while remaining:
+                result = await results.get()
+                if result is None:
+                    remaining -= 1
+                    continue
+                yield result
+        finally:
+            for task in checkers:
+                task.cancel()
+            await asyncio.gather(*checkers, return_exceptions=True)
+
+    async def validate_proxies(
+        self,
+        concurrency: int = PROXY_CHECK_CONCURRENCY,
+        timeout: float = PROXY_CHECK_TIMEOUT,
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
         """Validate all proxies and update their status in the database"""
-        proxies = await self.repo.find_many({})
-        if not proxies:
+        proxy_urls = await self.repo.get_all_urls()
+        if not proxy_urls:
             return {"message": "No proxies available in database", "working_proxies": 0}
-            
+
+        checked = 0
         working_count = 0
-        for proxy in proxies:
-            is_working, response_time = await self.check_proxy(proxy.url)
-            
-            if is_working:
-                await self.repo.record_success(proxy.id, response_time)
-                working_count += 1
-            else:
-                await self.repo.increment_failures(proxy.id, "Failed connection check")
-        
+        batch = []
+        async for proxy_url, is_working, response_time in self.check_proxies(proxy_urls, concurrency, timeout):
+            batch.append((proxy_url, is_working, response_time))
+            checked += 1
+            working_count += is_working
+            if progress:
+                await progress({"total": len(proxy_urls), "checked": checked, "working": working_count})
+            if len(batch) >= PROXY_WRITE_BATCH_SIZE:
+                await self.repo.bulk_record_checks(batch)
+                batch = []
+        if batch:
+            await self.repo.bulk_record_checks(batch)
+
         return {
             "message": "Proxy validation completed",
+            "total_checked": len(proxy_urls),
             "working_proxies": working_count
         }
 
-    async def migrate_from_file(self, file_path: str = "proxies.txt") -> Dict[str, Any]:
+    async def migrate_from_file(
+        self,
+        file_path: str = "proxies.txt",
+        concurrency: int = PROXY_CHECK_CONCURRENCY,
+        timeout: float = PROXY_CHECK_TIMEOUT,
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
         """Migrate proxies from text file to MongoDB"""
         try:
             with open(file_path, 'r') as f:
                 proxy_lines = f.readlines()
 
-            proxies = [line.strip() for line in proxy_lines if line.strip()]
+            proxies = []
+            for line in proxy_lines:
+                proxy_url = line.strip()
+                if not proxy_url:
+                    continue
+                if not proxy_url.startswith('http://'):
+                    proxy_url = f'http://{proxy_url}'
+                proxies.append(proxy_url)
+            proxies = list(dict.fromkeys(proxies))
+
             success_count = 0
             error_count = 0
-            
-            for proxy_url in proxies:
+            batch = []
+
+            async def flush():
+                nonlocal success_count, error_count
                 try:
-                    if not proxy_url.startswith('http://'):
-                        proxy_url = f'http://{proxy_url}'
-                    
-                    is_working, _ = await self.check_proxy(proxy_url)
-                    if not is_working:
-                        continue
-
-                    proxy = ProxyCreate(
-                        url=proxy_url,
-                        is_active=True,
-                        blacklisted=False,
-                        failures=0,
-                        last_checked=datetime.utcnow()
-                    )
-                    await self.repo.create(proxy)
-                    success_count += 1
-                    
-                except Exception as e:
-                    error_count += 1
+                    result = await self.repo.bulk_upsert(batch)
+                    success_count += result.upserted_count + result.matched_count
+                except BulkWriteError as e:
+                    success_count += e.details.get("nUpserted", 0) + e.details.get("nMatched", 0)
+                    error_count += len(e.details.get("writeErrors", []))
+                batch.clear()
+
+            checked = 0
+            working = 0
+            async for proxy_url, is_working, _ in self.check_proxies(proxies, concurrency, timeout):
+                checked += 1
+                working += is_working
+                if progress:
+                    await progress({
+                        "total": len(proxies),
+                        "checked": checked,
+                        "working": working,
+                        "saved": success_count,
+                        "errors": error_count,
+                    })
+                if not is_working:
                     continue
-            
+                batch.append(ProxyCreate(
+                    url=proxy_url,
+                    is_active=True,
+                    blacklisted=False,
+                    failures=0,
+                    last_checked=datetime.utcnow()
+                ))
+                if len(batch) >= PROXY_WRITE_BATCH_SIZE:
+                    await flush()
+            if batch:
+                await flush()
+
             return {
                 "message": "Migration completed",
                 "total_processed": len(proxies),
                 "success_count": success_count,
                 "error_count": error_count
             }
-                
+
         except FileNotFoundError:
             return {
                 "message": f"Error: File {file_path} not found",
@@ -106,4 +203,4 @@ class ProxyManager:
                 "total_processed": 0,
                 "success_count": 0,
                 "error_count": 0
-            }
\ No newline at end of file
+            }
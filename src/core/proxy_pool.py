@@ -0,0 +1,231 @@
+import time
+import heapq
+import random
+import asyncio
+import logging
+import itertools
+from typing import Dict, List, Optional, Tuple
+from config.settings import (
+    PROXY_POOL_REFRESH_INTERVAL,
+    PROXY_BREAKER_FAILURES,
+    PROXY_BREAKER_FORBIDDEN,
+    PROXY_BREAKER_COOLDOWN,
+    PROXY_BREAKER_MAX_COOLDOWN,
+    PROXY_EWMA_ALPHA,
+)
+from src.repositories.proxy_repo import ProxyRepository
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Latency assumed for proxies that have not served a request yet
+DEFAULT_LATENCY = 1.0
+
+
+class ProxyState:
+    """Per-proxy health and circuit breaker state"""
+
+    __slots__ = (
+        "url", "success_rate", "latency", "consecutive_failures",
+        "consecutive_forbidden", "breaker", "cooldown", "opened_at",
+        "slot", "removed",
+    )
+
+    def __init__(self, url: str):
+        self.url = url
+        self.success_rate = 1.0
+        self.latency = DEFAULT_LATENCY
+        self.consecutive_failures = 0
+        self.consecutive_forbidden = 0
+        self.breaker = CLOSED
+        self.cooldown = PROXY_BREAKER_COOLDOWN
+        self.opened_at = 0.0
+        # Index in ProxyPool._available, or None while the breaker is open
+        # or a half-open trial is in flight
+        self.slot: Optional[int] = None
+        self.removed = False
+
+    @property
+    def score(self) -> float:
+        return self.success_rate / (self.latency + 0.05)
+
+
+class ProxyPool:
+    """Process-local proxy pool with weighted O(1) selection and circuit breaking
+
+    Proxies are loaded from ProxyRepository and refreshed in the background,
+    so get_proxy never touches the database. Selection samples two available
+    proxies at random and keeps the one with the better success rate to
+    latency ratio, which favours healthy, fast proxies without sorting.
+
+    A proxy's breaker opens after PROXY_BREAKER_FAILURES consecutive
+    failures or PROXY_BREAKER_FORBIDDEN consecutive 403s, taking it out of
+    rotation. Once its cooldown elapses it is handed out for a single
+    half-open trial: success closes the breaker, failure reopens it with a
+    doubled cooldown.
+    """
+
+    def __init__(self, repo: Optional[ProxyRepository] = None, refresh_interval: float = PROXY_POOL_REFRESH_INTERVAL):
+        self.repo = repo or ProxyRepository()
+        self.refresh_interval = refresh_interval
+        self._proxies: Dict[str, ProxyState] = {}
+        self._available: List[ProxyState] = []
+        # Heap of (half-open at, tiebreak, state) for open breakers
+        self._open: List[Tuple[float, int, ProxyState]] = []
+        self._sequence = itertools.count()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._proxies)
+
+    async def start(self):
+        """Load the pool and keep refreshing it in the background"""
+        try:
+            await self.refresh()
+        except Exception as e:
+            # The background refresh keeps retrying
+            logger.error(f"Error loading proxy pool: {e}")
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing proxy pool: {e}")
+
+    async def refresh(self):
+        """Sync the pool with the active proxies in the database, keeping known proxies' state"""
+        urls = set(await self.repo.get_active_urls())
+        for url in list(self._proxies):
+            if url not in urls:
+                self._remove(self._proxies.pop(url))
+        for url in urls:
+            if url not in self._proxies:
+                state = ProxyState(url)
+                self._proxies[url] = state
+                self._make_available(state)
+        logger.debug(f"Proxy pool refreshed: {len(self._proxies)} proxies, {len(self._available)} available")
+
+    def get_proxy(self) -> Optional[str]:
+        """Pick a healthy proxy, or None if every breaker is open"""
+        self._release_cooled_down()
+        if not self._available:
+            return None
+
+        first = random.choice(self._available)
+        second = random.choice(self._available)
+        state = first if first.score >= second.score else second
+
+        if state.breaker == HALF_OPEN:
+            # Only one trial request at a time for a half-open proxy
+            self._make_unavailable(state)
+        return state.url
+
+    def release(self, url: str):
+        """Put back a proxy picked with get_proxy that was not used after all
+
+        Callers must release every pick they neither record a success nor a
+        failure for, since a half-open proxy stays out of rotation until
+        its trial is reported.
+        """
+        state = self._proxies.get(url)
+        if state is not None and state.breaker == HALF_OPEN and not state.removed:
+            self._make_available(state)
+
+    def has_available(self) -> bool:
+        """Whether get_proxy would return a proxy right now"""
+        self._release_cooled_down()
+        return bool(self._available)
+
+    def record_success(self, url: str, latency: float):
+        state = self._proxies.get(url)
+        if state is None:
+            return
+        state.success_rate += PROXY_EWMA_ALPHA * (1.0 - state.success_rate)
+        state.latency += PROXY_EWMA_ALPHA * (latency - state.latency)
+        state.consecutive_failures = 0
+        state.consecutive_forbidden = 0
+        if state.breaker != CLOSED:
+            state.breaker = CLOSED
+            state.cooldown = PROXY_BREAKER_COOLDOWN
+            self._make_available(state)
+
+    def record_failure(self, url: str, status: Optional[int] = None):
+        state = self._proxies.get(url)
+        if state is None:
+            return
+        state.success_rate -= PROXY_EWMA_ALPHA * state.success_rate
+        state.consecutive_failures += 1
+        state.consecutive_forbidden = state.consecutive_forbidden + 1 if status == 403 else 0
+
+        if state.breaker == HALF_OPEN:
+            self._open_breaker(state, min(state.cooldown * 2, PROXY_BREAKER_MAX_COOLDOWN))
+        elif state.breaker == CLOSED and (
+            state.consecutive_failures >= PROXY_BREAKER_FAILURES
+            or state.consecutive_forbidden >= PROXY_BREAKER_FORBIDDEN
+        ):
+            self._open_breaker(state, state.cooldown)
+
+    def snapshot(self) -> List[Dict]:
+        """Current per-proxy health, for monitoring"""
+        return [
+            {
+                "url": state.url,
+                "breaker": state.breaker,
+                "success_rate": round(state.success_rate, 4),
+                "latency": round(state.latency, 4),
+                "consecutive_failures": state.consecutive_failures,
+            }
+            for state in self._proxies.values()
+        ]
+
+    def _open_breaker(self, state: ProxyState, cooldown: float):
+        logger.info(f"Opening circuit breaker for proxy {state.url} for {cooldown:.0f}s")
+        self._make_unavailable(state)
+        state.breaker = OPEN
+        state.cooldown = cooldown
+        state.opened_at = time.monotonic()
+        heapq.heappush(self._open, (state.opened_at + cooldown, next(self._sequence), state))
+
+    def _release_cooled_down(self):
+        now = time.monotonic()
+        while self._open and self._open[0][0] <= now:
+            _, _, state = heapq.heappop(self._open)
+            if state.removed or state.breaker != OPEN:
+                continue
+            state.breaker = HALF_OPEN
+            self._make_available(state)
+
+    def _make_available(self, state: ProxyState):
+        if state.slot is None:
+            state.slot = len(self._available)
+            self._available.append(state)
+
+    def _make_unavailable(self, state: ProxyState):
+        # Swap-remove to keep this O(1)
+        if state.slot is None:
+            return
+        last = self._available.pop()
+        if last is not state:
+            self._available[state.slot] = last
+            last.slot = state.slot
+        state.slot = None
+
+    def _remove(self, state: ProxyState):
+        self._make_unavailable(state)
+        state.removed = True
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+from config.settings import PROXY_EWMA_ALPHA, PROXY_STATS_FLUSH_INTERVAL
+from src.repositories.proxy_repo import ProxyRepository
+
+logger = logging.getLogger(__name__)
+
+
+class ProxyOutcomes:
+    """Outcomes of one proxy's requests since the last flush"""
+
+    __slots__ = (
+        "successes", "failures", "forbidden", "failure_streak", "forbidden_streak",
+        "failure_reset", "forbidden_reset", "last_success", "last_failure", "last_forbidden",
+    )
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.forbidden = 0
+        # Streaks since the last success (or non-403 failure); while the
+        # reset flags are unset they continue the streaks already stored
+        self.failure_streak = 0
+        self.forbidden_streak = 0
+        self.failure_reset = False
+        self.forbidden_reset = False
+        self.last_success: Optional[datetime] = None
+        self.last_failure: Optional[datetime] = None
+        self.last_forbidden: Optional[datetime] = None
+
+    def merge(self, newer: "ProxyOutcomes"):
+        """Fold in outcomes recorded after these ones"""
+        self.successes += newer.successes
+        self.failures += newer.failures
+        self.forbidden += newer.forbidden
+        if newer.failure_reset:
+            self.failure_streak = newer.failure_streak
+            self.failure_reset = True
+        else:
+            self.failure_streak += newer.failure_streak
+        if newer.forbidden_reset:
+            self.forbidden_streak = newer.forbidden_streak
+            self.forbidden_reset = True
+        else:
+            self.forbidden_streak += newer.forbidden_streak
+        self.last_success = newer.last_success or self.last_success
+        self.last_failure = newer.last_failure or self.last_failure
+        self.last_forbidden = newer.last_forbidden or self.last_forbidden
+
+
+class ProxyStatsAggregator:
+    """Write-behind store for proxy request outcomes
+
+    Workers record every request outcome here, which only updates counters
+    in memory. A background task writes what was recorded for all proxies
+    as one bulk update every flush_interval seconds, so the database sees
+    one write per proxy per interval no matter how many requests were made.
+    The same write blacklists proxies whose failure or 403 streaks crossed
+    PROXY_BLACKLIST_FAILURES / PROXY_BLACKLIST_FORBIDDEN. Outcomes of a
+    failed write are kept and retried with the next flush.
+    """
+
+    def __init__(self, repo: Optional[ProxyRepository] = None, flush_interval: float = PROXY_STATS_FLUSH_INTERVAL):
+        self.repo = repo or ProxyRepository()
+        self.flush_interval = flush_interval
+        self._outcomes: Dict[str, ProxyOutcomes] = {}
+        # Latency EWMA per proxy, kept across flushes
+        self._latency: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """Proxies with outcomes not yet written"""
+        return len(self._outcomes)
+
+    def _get(self, url: str) -> ProxyOutcomes:
+        outcomes = self._outcomes.get(url)
+        if outcomes is None:
+            outcomes = self._outcomes[url] = ProxyOutcomes()
+        return outcomes
+
+    def record_success(self, url: str, latency: float):
+        outcomes = self._get(url)
+        outcomes.successes += 1
+        outcomes.failure_streak = 0
+        outcomes.forbidden_streak = 0
+        outcomes.failure_reset = True
+        outcomes.forbidden_reset = True
+        outcomes.last_success = datetime.utcnow()
+        previous = self._latency.get(url)
+        self._latency[url] = latency if previous is None else previous + PROXY_EWMA_ALPHA * (latency - previous)
+
+    def record_failure(self, url: str, status: Optional[int] = None):
+        outcomes = self._get(url)
+        outcomes.failures += 1
+        outcomes.failure_streak += 1
+        outcomes.last_failure = datetime.utcnow()
+        if status == 403:
+            outcomes.forbidden += 1
+            outcomes.forbidden_streak += 1
+            outcomes.last_forbidden = outcomes.last_failure
+        else:
+            outcomes.forbidden_streak = 0
+            outcomes.forbidden_reset = True
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and write what is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write the outcomes recorded so far
+
+        Returns:
+            Number of proxies written
+        """
+        if not self._outcomes:
+            return 0
+        batch, self._outcomes = self._outcomes, {}
+        try:
+            await self.repo.bulk_record_outcomes(
+                self._as_update(url, outcomes) for url, outcomes in batch.items()
+            )
+        except Exception as e:
+            logger.error(f"Error writing proxy stats: {e}")
+            # Keep them, with anything recorded meanwhile, for the next flush
+            for url, newer in self._outcomes.items():
+                if url in batch:
+                    batch[url].merge(newer)
+                else:
+                    batch[url] = newer
+            self._outcomes = batch
+            return 0
+        logger.debug(f"Wrote stats for {len(batch)} proxies")
+        return len(batch)
+
+    def _as_update(self, url: str, outcomes: ProxyOutcomes) -> Dict[str, Any]:
+        return {
+            "url": url,
+            "successes": outcomes.successes,
+            "failures": outcomes.failures,
+            "forbidden": outcomes.forbidden,
+            "failure_streak": outcomes.failure_streak,
+            "forbidden_streak": outcomes.forbidden_streak,
+            "failure_reset": outcomes.failure_reset,
+            "forbidden_reset": outcomes.forbidden_reset,
+            "latency": self._latency.get(url) if outcomes.successes else None,
+            "last_success": outcomes.last_success,
+            "last_failure": outcomes.last_failure,
+            "last_forbidden": outcomes.last_forbidden,
+        }
@@ -0,0 +1,168 @@
+import json
+import random
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from redis.asyncio import Redis
+from config.settings import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_DOMAIN_RPS,
+    RATE_LIMIT_DOMAIN_BURST,
+    RATE_LIMIT_PROXY_DOMAIN_RPS,
+    RATE_LIMIT_PROXY_DOMAIN_BURST,
+    RATE_LIMIT_DOMAIN_OVERRIDES,
+    RATE_LIMIT_PENALTY_TTL,
+    RATE_LIMIT_MAX_PENALTY,
+)
+
+logger = logging.getLogger(__name__)
+
+# Responses that mean we are going too fast for the target
+BLOCK_STATUSES = {403, 429, 503}
+
+# GCRA over several limits at once: a request is only admitted if every limit
+# admits it, and only then is each limit's theoretical arrival time advanced.
+# Each limit's interval and burst tolerance are scaled by its penalty factor.
+# KEYS: (tat key, penalty key) pairs
+# ARGV: (emission interval, burst tolerance) pairs, in seconds
+# Returns the number of seconds to wait, "0" when admitted.
+ACQUIRE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local wait = 0
+local updates = {}
+for i = 1, #KEYS, 2 do
+    local factor = tonumber(redis.call('GET', KEYS[i + 1]) or '1')
+    local interval = tonumber(ARGV[i]) * factor
+    local tolerance = tonumber(ARGV[i + 1]) * factor
+    local tat = math.max(tonumber(redis.call('GET', KEYS[i]) or now), now)
+    local allow_at = tat - tolerance
+    if allow_at > now then
+        wait = math.max(wait, allow_at - now)
+    end
+    updates[#updates + 1] = {KEYS[i], tat + interval}
+end
+
+if wait > 0 then
+    return tostring(wait)
+end
+for _, update in ipairs(updates) do
+    local ttl = math.ceil((update[2] - now) * 1000) + 1000
+    redis.call('SET', update[1], tostring(update[2]), 'PX', ttl)
+end
+return '0'
+"""
+
+# Double each penalty factor (up to a cap) and restart its expiry, so limits
+# stay slowed down while blocks keep coming and recover once they stop.
+# KEYS: penalty keys
+# ARGV: max factor, ttl seconds
+PENALIZE_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    local factor = tonumber(redis.call('GET', key) or '1')
+    factor = math.min(factor * 2, tonumber(ARGV[1]))
+    redis.call('SET', key, tostring(factor), 'EX', tonumber(ARGV[2]))
+end
+return 1
+"""
+
+
+class RateLimiter:
+    """Distributed per-domain and per-proxy-per-domain politeness limits
+
+    Limits are enforced with GCRA in Redis, so they hold across every worker
+    and node sharing the Redis instance. When a target starts answering
+    with 403/429/503 the limits for that domain (and proxy) are slowed
+    down exponentially until the blocks stop for RATE_LIMIT_PENALTY_TTL.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        domain_rps: float = RATE_LIMIT_DOMAIN_RPS,
+        domain_burst: int = RATE_LIMIT_DOMAIN_BURST,
+        proxy_domain_rps: float = RATE_LIMIT_PROXY_DOMAIN_RPS,
+        proxy_domain_burst: int = RATE_LIMIT_PROXY_DOMAIN_BURST,
+        domain_overrides: Optional[Dict[str, float]] = None,
+        enabled: bool = RATE_LIMIT_ENABLED,
+    ):
+        self.redis = redis
+        self.domain_rps = domain_rps
+        self.domain_burst = domain_burst
+        self.proxy_domain_rps = proxy_domain_rps
+        self.proxy_domain_burst = proxy_domain_burst
+        self.domain_overrides = json.loads(RATE_LIMIT_DOMAIN_OVERRIDES) if domain_overrides is None else domain_overrides
+        self.enabled = enabled
+        self._acquire = redis.register_script(ACQUIRE_SCRIPT)
+        self._penalize = redis.register_script(PENALIZE_SCRIPT)
+
+    @staticmethod
+    def _domain(url: str) -> str:
+        return (urlparse(url).hostname or "").lower()
+
+    @staticmethod
+    def _proxy_host(proxy: str) -> str:
+        parsed = urlparse(proxy)
+        return f"{parsed.hostname}:{parsed.port}" if parsed.port else (parsed.hostname or proxy)
+
+    def _limits(self, url: str, proxy: Optional[str]) -> List[Tuple[str, float, int]]:
+        """(key suffix, requests per second, burst) for every limit that applies"""
+        domain = self._domain(url)
+        limits = [(f"domain:{domain}", self.domain_overrides.get(domain, self.domain_rps), self.domain_burst)]
+        if proxy and self.proxy_domain_rps > 0:
+            limits.append((f"proxy:{self._proxy_host(proxy)}:{domain}", self.proxy_domain_rps, self.proxy_domain_burst))
+        return [limit for limit in limits if limit[1] > 0]
+
+    async def acquire(
+        self,
+        url: str,
+        proxy: Optional[str] = None,
+        on_wait: Optional[Callable[[float], Awaitable[None]]] = None,
+    ) -> float:
+        """Wait until a request to url through proxy is allowed
+
+        Waiting is a plain asyncio sleep, so other tasks on the event loop
+        keep running. on_wait is awaited with the number of seconds about
+        to be slept before every sleep, e.g. to extend a task lease.
+
+        Returns:
+            Total seconds spent waiting
+        """
+        if not self.enabled:
+            return 0.0
+        limits = self._limits(url, proxy)
+        if not limits:
+            return 0.0
+
+        keys, args = [], []
+        for suffix, rps, burst in limits:
+            interval = 1.0 / rps
+            keys.extend((f"scraper:ratelimit:{suffix}", f"scraper:ratelimit:penalty:{suffix}"))
+            args.extend((interval, interval * max(burst - 1, 0)))
+
+        waited = 0.0
+        while True:
+            wait = float(await self._acquire(keys=keys, args=args))
+            if wait <= 0:
+                return waited
+            # Jitter so workers woken at the same time don't collide again
+            wait *= random.uniform(1.0, 1.1)
+            if on_wait is not None:
+                await on_wait(wait)
+            waited += wait
+            await asyncio.sleep(wait)
+
+    async def report(self, url: str, proxy: Optional[str], status: Optional[int]):
+        """Feed a response status back; blocking statuses slow the matching limits down"""
+        if not self.enabled or status not in BLOCK_STATUSES:
+            return
+        keys = [f"scraper:ratelimit:penalty:{suffix}" for suffix, _, _ in self._limits(url, proxy)]
+        if not keys:
+            return
+        logger.info(f"Got HTTP {status} from {self._domain(url)}, backing off")
+        try:
+            await self._penalize(keys=keys, args=[RATE_LIMIT_MAX_PENALTY, RATE_LIMIT_PENALTY_TTL])
+        except Exception as e:
+            logger.error(f"Error recording rate limit penalty: {e}")
@@ -1,9 +1,73 @@
+import asyncio
 import aiohttp
-from bs4 import BeautifulSoup
 from aiohttp import ClientTimeout
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
+from src.core.extractor import InlineExtractor
+from src.storage.cache import FetchCache, content_hash
+from src.storage.archive import PageArchive
+from src.monitoring.metrics import stage
+from config.settings import MAX_BODY_SIZE, STREAM_CHUNK_SIZE
+
+
+class ScrapeError(Exception):
+    """A page could not be scraped; status is the HTTP status if the target responded
+
+    timeout is set when the request timed out.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, timeout: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.timeout = timeout
+
+
+# Used when the caller does not supply its own extraction stage
+_default_extractor = InlineExtractor()
+
+async def scrape_product(
+    url: str,
+    headers: dict,
+    timeout: int,
+    proxy: Optional[str] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    extractor=None,
+    stream: bool = False,
+    max_body_size: int = MAX_BODY_SIZE,
+    cache: Optional[FetchCache] = None,
+    on_headers: Optional[Callable[[], None]] = None,
+    archive: Optional[PageArchive] = None
+) -> Dict[str, Any]:
+    """Fetch a product page and extract its fields
+
+    Pass the worker's pooled session to reuse keep-alive connections; without
+    one a throwaway session is created for this request only. extractor is
+    the extraction stage (see src.core.extractor); by default pages are
+    parsed inline on the event loop.
+
+    With stream the body is parsed incrementally as it arrives and the
+    download is abandoned as soon as every field is extracted. That saves
+    bandwidth and memory, but the abandoned connection is closed rather
+    than returned to the pool. Bodies larger than max_body_size are
+    rejected in both modes.
+
+    With a cache, pages seen before are fetched conditionally. When the
+    target answers 304, or the body hashes the same as last time, the
+    previous result is returned without extracting again. Streamed bodies
+    are not hashed since they are usually only partially downloaded.
+
+    on_headers is called as soon as the response headers have arrived.
+
+    With an archive, every fully downloaded body is also kept there for
+    later re-extraction. Streamed bodies are not archived.
+    """
+    if session is None:
+        async with aiohttp.ClientSession() as session:
+            return await scrape_product(
+                url, headers, timeout, proxy, session, extractor, stream, max_body_size, cache, on_headers, archive
+            )
+
+    extractor = extractor or _default_extractor
 
-async def scrape_product(url: str, headers: dict, timeout: int, proxy: Optional[str] = None) -> Dict[str, Any]:
     timeout_obj = ClientTimeout(total=timeout)
     
     # Configure proxy with proper format
@@ -17,27 +81,93 @@ async def scrape_product(url: str, headers: dict, timeout: int, proxy: Optional[
                 password=auth_part.split(':')[1]
             )
     
+    cached = await cache.get(url) if cache is not None else None
+    if cached:
+        headers = {**headers, **FetchCache.conditional_headers(cached)}
+
     try:
-        async with aiohttp.ClientSession(headers=headers, timeout=timeout_obj) as session:
+        # Streamed pages are parsed while they download, so their parse time counts as fetch
+        with stage("fetch"):
             async with session.get(
                 url,
+                headers=headers,
+                timeout=timeout_obj,
                 proxy=proxy,
                 proxy_auth=proxy_auth,
                 ssl=False  
             ) as response:
+                if on_headers is not None:
+                    on_headers()
+                if response.status == 304 and cached:
+                    cache.stats["not_modified"] += 1
+                    return cached["result"]
                 if response.status == 403:
-                    raise Exception(f"{response.status}, message='Forbidden', url='{proxy}'")
+                    raise ScrapeError(f"{response.status}, message='Forbidden', url='{proxy}'", response.status)
                 elif response.status != 200:
-                    raise Exception(f"HTTP {response.status}: {response.reason}")
-                
-                html = await response.text()
-                soup = BeautifulSoup(html, "lxml")
-                
-                return {
-                    "title": soup.select_one("#productTitle").text.strip() if soup.select_one("#productTitle") else "Title not found",
+                    raise ScrapeError(f"HTTP {response.status}: {response.reason}", response.status)
+            
+                if response.content_length and response.content_length > max_body_size:
+                    raise ScrapeError(f"Response body of {response.content_length} bytes exceeds {max_body_size}")
+            
+                validators = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
                 }
+                if stream:
+                    result = await _extract_streaming(response, extractor, max_body_size)
+                    if cache is not None:
+                        await cache.set(url, result, **validators)
+                    return result
+                html = await _read_body(response, max_body_size)
+
+        if archive is not None:
+            await archive.put(url, html, response.charset, response.status)
+            
+        body_hash = None
+        if cache is not None:
+            body_hash = content_hash(html)
+            if cached and cached.get("content_hash") == body_hash:
+                cache.stats["unchanged"] += 1
+                await cache.set(url, cached["result"], body_hash=body_hash, **validators)
+                return cached["result"]
+
+        # The connection is back in the pool before we start parsing
+        with stage("parse"):
+            result = await extractor.extract(html, response.charset)
+        if cache is not None:
+            await cache.set(url, result, body_hash=body_hash, **validators)
+        return result
                 
     except aiohttp.ClientError as e:
-        raise Exception(f"Connection error with proxy {proxy}: {str(e)}")
+        raise ScrapeError(f"Connection error with proxy {proxy}: {str(e)}", timeout=isinstance(e, asyncio.TimeoutError))
     except Exception as e:
-        raise Exception(f"Error scraping with proxy {proxy}: {str(e)}")
\ No newline at end of file
+        raise ScrapeError(
+            f"Error scraping with proxy {proxy}: {str(e)}",
+            getattr(e, "status", None),
+            timeout=isinstance(e, asyncio.TimeoutError)
+        )
+
+
+async def _read_body(response: aiohttp.ClientResponse, max_body_size: int) -> bytes:
+    """Read the whole body, failing as soon as it grows past max_body_size"""
+    body = bytearray()
+    async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+        body += chunk
+        if len(body) > max_body_size:
+            raise ScrapeError(f"Response body exceeds {max_body_size} bytes")
+    return bytes(body)
+
+
+async def _extract_streaming(response: aiohttp.ClientResponse, extractor, max_body_size: int) -> Dict[str, Any]:
+    """Feed the body into an incremental parser and stop reading once every field is found"""
+    extraction = extractor.stream(response.charset)
+    received = 0
+    async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+        received += len(chunk)
+        if received > max_body_size:
+            raise ScrapeError(f"Response body exceeds {max_body_size} bytes")
+        if extraction.feed(chunk):
+            # Drop the rest of the download instead of draining it
+            response.close()
+            break
+    return extraction.close()
@@ -0,0 +1,78 @@
+import aiohttp
+from typing import Dict, Optional
+from config.settings import (
+    HEADERS,
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+)
+
+
+class SessionManager:
+    """Owns the pooled aiohttp session shared by every request of a process
+
+    aiohttp keys pooled connections by target and proxy, so a single
+    connector keeps a separate set of keep-alive connections per proxy while
+    sharing one DNS cache and one per-host connection limit.
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        limit: int = HTTP_POOL_LIMIT,
+        limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+        dns_cache_ttl: int = HTTP_DNS_CACHE_TTL,
+        keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+    ):
+        self.headers = HEADERS if headers is None else headers
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.stats = {"requests": 0, "connections_created": 0, "connections_reused": 0}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it on first use
+
+        Must be called from inside the event loop that will use the session.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                trace_configs=[self.trace_config()],
+            )
+        return self._session
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Trace hooks that count requests and new versus reused connections"""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.stats["requests"] += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.stats["connections_created"] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.stats["connections_reused"] += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    async def close(self):
+        """Close the session and every pooled connection"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
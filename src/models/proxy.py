@@ -10,6 +10,16 @@ class ProxyBase(BaseModel):
     failures: int = Field(default=0)
     last_checked: datetime = Field(default_factory=datetime.now)
     last_failure: Optional[datetime] = Field(default=None)
+    response_time: Optional[float] = Field(default=None)
+    # Outcome totals of requests made through the proxy, and the current
+    # streak of 403s (failures holds the current streak of failures)
+    success_count: int = Field(default=0)
+    failure_count: int = Field(default=0)
+    forbidden_count: int = Field(default=0)
+    consecutive_forbidden: int = Field(default=0)
+    last_success: Optional[datetime] = Field(default=None)
+    last_forbidden: Optional[datetime] = Field(default=None)
+    blacklisted_at: Optional[datetime] = Field(default=None)
 
     class Config:
         json_encoders = {
@@ -25,6 +35,9 @@ class ProxyUpdate(BaseModel):
     failures: Optional[int] = None
     last_checked: Optional[datetime] = None
     last_failure: Optional[datetime] = None
+    response_time: Optional[float] = None
+    consecutive_forbidden: Optional[int] = None
+    blacklisted_at: Optional[datetime] = None
 
 class ProxyInDB(ProxyBase):
     id: str = Field(alias="_id")
\ No newline at end of file
@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, Field
+
+
+class ResultBase(BaseModel):
+    url: str
+    data: Dict[str, Any] = Field(default_factory=dict)
+    worker_id: Optional[str] = Field(default=None)
+    proxy: Optional[str] = Field(default=None)
+    scraped_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Config:
+        json_encoders = {
+            datetime: lambda v: v.isoformat(),
+        }
+
+class ResultCreate(ResultBase):
+    pass
+
+class ResultUpdate(BaseModel):
+    data: Optional[Dict[str, Any]] = None
+
+class ResultInDB(ResultBase):
+    id: str = Field(alias="_id")
@@ -0,0 +1,349 @@
+import time
+import json
+import random
+import logging
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from config.settings import TRACE_SAMPLE_RATE, TRACE_BUFFER_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers everything from an in-memory proxy pick to a slow fetch
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class _Metric:
+    """A metric family; label values map to pre-aggregated children
+
+    Children are looked up once and can be kept by the caller, so recording
+    a sample is a couple of attribute updates with no I/O and no locking
+    (everything runs on one event loop per process).
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        (registry or REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def remove(self, *values: str):
+        self._children.pop(tuple(str(value) for value in values), None)
+
+    def clear(self):
+        if self.labelnames:
+            self._children.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].value += amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].value += amount
+
+    def dec(self, amount: float = 1.0):
+        self._children[()].value -= amount
+
+    def set(self, value: float):
+        self._children[()].value = value
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bucket plus the +Inf overflow; made cumulative on render
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """Bucketed distribution; buckets=() keeps only the sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional["Registry"] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def _render_child(self, values, child) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    """Holds every metric of the process and renders the Prometheus text format
+
+    Values that are expensive to keep current (queue depth, pool health)
+    are filled in by refresh callbacks that only run when metrics are
+    scraped.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._refreshers: List[Callable[[], Awaitable[None]]] = []
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def add_refresher(self, refresher: Callable[[], Awaitable[None]]):
+        self._refreshers.append(refresher)
+
+    def remove_refresher(self, refresher: Callable[[], Awaitable[None]]):
+        if refresher in self._refreshers:
+            self._refreshers.remove(refresher)
+
+    async def refresh(self):
+        for refresher in list(self._refreshers):
+            try:
+                await refresher()
+            except Exception as e:
+                logger.error(f"Error refreshing metrics: {e}")
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    async def collect(self) -> str:
+        """Run the refresh callbacks and render the current values"""
+        await self.refresh()
+        return self.render()
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Task pipeline
+TASKS = Counter("scraper_tasks_total", "Claimed tasks by outcome", ["outcome"])
+STAGE_SECONDS = Histogram("scraper_stage_seconds", "Time spent per task pipeline stage", ["stage"])
+IN_FLIGHT = Gauge("scraper_tasks_in_flight", "Tasks currently being processed in this process")
+TASKS_BUFFERED = Gauge("scraper_tasks_buffered", "Claimed tasks waiting in this process for a free slot")
+QUEUE_DEPTH = Gauge("scraper_queue_depth", "Tasks per queue state", ["state"])
+RESULTS_PENDING = Gauge("scraper_results_pending", "Results buffered and not yet written")
+RESULTS_WRITTEN = Counter("scraper_results_written_total", "Results written to the result sink")
+CONCURRENCY_LIMIT = Gauge("scraper_concurrency_limit", "Adaptive concurrency limit per worker", ["worker"])
+
+# Proxies
+PROXY_REQUESTS = Counter("scraper_proxy_requests_total", "Requests per proxy by outcome", ["proxy", "outcome"])
+PROXY_LATENCY = Histogram("scraper_proxy_request_seconds", "Latency of successful requests per proxy", ["proxy"], buckets=())
+PROXY_BREAKERS = Gauge("scraper_proxy_breakers", "Proxies per worker pool by circuit breaker state", ["worker", "breaker"])
+HEDGES = Counter("scraper_hedges_total", "Hedged fetch attempts by outcome", ["outcome"])
+HEDGE_DELAY = Gauge("scraper_hedge_delay_seconds", "Wait for response headers before hedging a fetch", ["worker"])
+PROXY_CONCURRENCY_LIMIT = Gauge("scraper_proxy_concurrency_limit", "Adaptive concurrency limit per worker and proxy", ["worker", "proxy"])
+
+
+class Trace:
+    """Detailed timing of a single sampled task"""
+
+    __slots__ = ("url", "started", "wall_started", "spans")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.spans: List[Tuple[str, float, float]] = []
+
+    def add(self, stage: str, started: float, elapsed: float):
+        self.spans.append((stage, started - self.started, elapsed))
+
+    def to_dict(self) -> Dict:
+        return {
+            "url": self.url,
+            "started_at": self.wall_started,
+            "total": time.perf_counter() - self.started,
+            "spans": [
+                {"stage": stage, "offset": round(offset, 6), "seconds": round(elapsed, 6)}
+                for stage, offset, elapsed in self.spans
+            ],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("scraper_trace", default=None)
+# Most recent completed traces, newest last
+TRACES: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+
+
+def start_trace(url: str, sample_rate: float = TRACE_SAMPLE_RATE) -> Optional[Trace]:
+    """Begin a trace for the current task if it is sampled"""
+    if sample_rate <= 0 or random.random() >= sample_rate:
+        return None
+    trace = Trace(url)
+    _current_trace.set(trace)
+    return trace
+
+
+def finish_trace(trace: Optional[Trace], outcome: str):
+    if trace is None:
+        return
+    _current_trace.set(None)
+    record = trace.to_dict()
+    record["outcome"] = outcome
+    TRACES.append(record)
+    logger.debug(f"Trace: {json.dumps(record)}")
+
+
+class stage:
+    """Time a pipeline stage into STAGE_SECONDS, and into the task's trace if sampled
+
+        with stage("fetch"):
+            ...
+    """
+
+    __slots__ = ("_child", "_name", "_started")
+
+    def __init__(self, name: str):
+        self._name = name
+        self._child = STAGE_SECONDS.labels(name)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._started
+        self._child.observe(elapsed)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(self._name, self._started, elapsed)
+        return False
+
+
+class MetricsServer:
+    """Per-process HTTP exporter serving /metrics and /traces for worker processes"""
+
+    def __init__(self, port: int, host: str = "0.0.0.0", registry: Registry = REGISTRY):
+        self.port = port
+        self.host = host
+        self.registry = registry
+        self._runner = None
+
+    async def start(self):
+        from aiohttp import web
+
+        async def metrics(request):
+            body = await self.registry.collect()
+            return web.Response(body=body.encode(), headers={"Content-Type": CONTENT_TYPE})
+
+        async def traces(request):
+            return web.json_response(list(TRACES))
+
+        app = web.Application()
+        app.router.add_get("/metrics", metrics)
+        app.router.add_get("/traces", traces)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            # Metrics are never worth taking a worker down for
+            logger.error(f"Could not start metrics exporter on port {self.port}: {e}")
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
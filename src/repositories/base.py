@@ -1,20 +1,114 @@
-from typing import Generic, TypeVar, Optional, List, Dict, Any
-from bson import ObjectId
+import base64
+from typing import Generic, TypeVar, Optional, List, Dict, Any, AsyncIterator, Tuple, Union
+from bson import ObjectId, json_util
 from motor.motor_asyncio import AsyncIOMotorCollection
 from pydantic import BaseModel
+from config.settings import DB_CURSOR_BATCH_SIZE
 
 ModelType = TypeVar("ModelType", bound=BaseModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+Projection = Optional[Union[List[str], Dict[str, Any]]]
+
+
+def encode_cursor(sort_value: Any, last_id: ObjectId) -> str:
+    """Opaque page cursor holding the sort key of the last document served"""
+    raw = json_util.dumps({"v": sort_value, "id": last_id})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        data = json_util.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return data["v"], data["id"]
+    except Exception:
+        raise ValueError(f"Invalid page cursor: {cursor}")
+
+
 class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, collection: AsyncIOMotorCollection):
         self.collection = collection
 
+    def _to_model(self, doc: Dict[str, Any]) -> ModelType:
+        if "_id" in doc:
+            doc["_id"] = str(doc["_id"])
+        return self.model(**doc)
+
     async def find_one(self, id: str) -> Optional[ModelType]:
         doc = await self.collection.find_one({"_id": ObjectId(id)})
-        return self.model(**doc) if doc else None
+        return self._to_model(doc) if doc else None
+
+    async def find_many(self, filter_dict: Dict = None, batch_size: int = DB_CURSOR_BATCH_SIZE) -> List[ModelType]:
+        cursor = self.collection.find(filter_dict or {}, batch_size=batch_size)
+        return [self._to_model(doc) async for doc in cursor]
+
+    async def iter_raw(
+        self,
+        filter_dict: Dict = None,
+        projection: Projection = None,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        batch_size: int = DB_CURSOR_BATCH_SIZE,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over matching documents as plain dicts
+
+        Skips pydantic validation entirely, and only batch_size documents are
+        held in memory at a time, so this is the read path for hot internal
+        callers and for streaming large collections.
+        """
+        cursor = self.collection.find(filter_dict or {}, projection, batch_size=batch_size)
+        if sort:
+            cursor = cursor.sort(sort)
+        async for doc in cursor:
+            yield doc
+
+    async def find_page(
+        self,
+        filter_dict: Dict = None,
+        after: Optional[str] = None,
+        limit: int = 100,
+        sort_field: str = "_id",
+        projection: Projection = None,
+        raw: bool = False,
+    ) -> Tuple[List[Union[ModelType, Dict[str, Any]]], Optional[str]]:
+        """One page of documents ordered by (sort_field, _id), using keyset pagination
+
+        Each page continues where the previous cursor left off instead of
+        skipping over earlier documents, so every page costs the same no
+        matter how deep it is. sort_field should be indexed together with
+        the filter. Projected documents are usually incomplete, so read
+        them with raw=True.
+
+        Returns:
+            The page, and the cursor of the next page or None on the last page
+        """
+        query = dict(filter_dict or {})
+        if after:
+            last_value, last_id = decode_cursor(after)
+            if sort_field == "_id":
+                keyset = {"_id": {"$gt": last_id}}
+            else:
+                keyset = {"$or": [
+                    {sort_field: {"$gt": last_value}},
+                    {sort_field: last_value, "_id": {"$gt": last_id}},
+                ]}
+            query = {"$and": [query, keyset]} if query else keyset
+
+        if projection is not None:
+            # The cursor is built from the sort key, so it has to be fetched
+            if isinstance(projection, dict):
+                projection = {**projection, sort_field: 1, "_id": 1}
+            else:
+                projection = list(projection) + [sort_field, "_id"]
+
+        sort = [(sort_field, 1)] if sort_field == "_id" else [(sort_field, 1), ("_id", 1)]
+        cursor = self.collection.find(query, projection, batch_size=limit).sort(sort).limit(limit)
+        docs = [doc async for doc in cursor]
 
-    async def find_many(self, filter_dict: Dict = None) -> List[ModelType]:
-        cursor = self.collection.find(filter_dict or {})
-        return [self.model(**doc) async for doc in cursor]
\ No newline at end of file
+        next_cursor = None
+        if len(docs) == limit:
+            last = docs[-1]
+            next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+        if raw:
+            return docs, next_cursor
+        return [self._to_model(doc) for doc in docs], next_cursor
@@ -1,6 +1,20 @@
-from typing import List
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from pymongo import UpdateMany, UpdateOne
+from pymongo.results import BulkWriteResult
 from src.models.proxy import ProxyCreate, ProxyUpdate, ProxyInDB
-from .base import BaseRepository
+from config.settings import (
+    DB_CURSOR_BATCH_SIZE,
+    PROXY_BLACKLIST_FAILURES,
+    PROXY_BLACKLIST_FORBIDDEN,
+)
+from .base import BaseRepository, Projection
+
+ACTIVE_FILTER = {"is_active": True, "blacklisted": False}
+
+# The only fields re-importing a known proxy overwrites; its health,
+# blacklist state and outcome stats are kept
+REFRESHED_FIELDS = ("url", "last_checked")
 
 class ProxyRepository(BaseRepository[ProxyInDB, ProxyCreate, ProxyUpdate]):
     def __init__(self):
@@ -11,17 +25,149 @@ class ProxyRepository(BaseRepository[ProxyInDB, ProxyCreate, ProxyUpdate]):
 
     async def get_active_proxies(self) -> List[ProxyInDB]:
         """Get all active, non-blacklisted proxies"""
-        return await self.find_many({
-            "is_active": True,
-            "blacklisted": False
-        })
+        return await self.find_many(ACTIVE_FILTER)
+
+    def iter_active(
+        self,
+        projection: Projection = None,
+        batch_size: int = DB_CURSOR_BATCH_SIZE,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream active, non-blacklisted proxies as plain dicts in _id order"""
+        return self.iter_raw(ACTIVE_FILTER, projection, sort=[("_id", 1)], batch_size=batch_size)
+
+    async def get_active_page(
+        self,
+        after: Optional[str] = None,
+        limit: int = 100,
+        sort_field: str = "_id",
+        projection: Projection = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One keyset page of active proxies as plain dicts, see BaseRepository.find_page"""
+        return await self.find_page(ACTIVE_FILTER, after, limit, sort_field, projection, raw=True)
+
+    async def get_active_urls(self) -> List[str]:
+        """Get the URLs of all active, non-blacklisted proxies without building full models"""
+        return [doc["url"] async for doc in self.iter_raw(ACTIVE_FILTER, {"_id": 0, "url": 1})]
+
+    async def get_all_urls(self) -> List[str]:
+        """Get the URL of every stored proxy without building full models"""
+        return [doc["url"] async for doc in self.iter_raw({}, {"_id": 0, "url": 1})]
 
     async def setup_indexes(self):
         """Setup required indexes"""
         await self.collection.create_index([("url", 1)], unique=True)
         await self.collection.create_index([("is_active", 1), ("blacklisted", 1)])
         await self.collection.create_index([("last_checked", 1)])
+        # Keyset pagination over active proxies
+        await self.collection.create_index([("is_active", 1), ("blacklisted", 1), ("_id", 1)])
+        await self.collection.create_index([("is_active", 1), ("blacklisted", 1), ("last_checked", 1), ("_id", 1)])
 
     async def create(self, proxy: ProxyCreate) -> ProxyInDB:
         """Create a new proxy"""
-        return await self.collection.insert_one(proxy.model_dump())
\ No newline at end of file
+        return await self.collection.insert_one(proxy.model_dump())
+
+    async def bulk_upsert(self, proxies: Iterable[ProxyCreate]) -> BulkWriteResult:
+        """Insert or refresh many proxies, keyed by URL, in one unordered bulk write
+
+        Proxies already stored only get last_checked refreshed, so a
+        blacklisted proxy listed again stays blacklisted.
+        """
+        operations = []
+        for proxy in proxies:
+            defaults = proxy.model_dump()
+            fields = {name: defaults.pop(name) for name in REFRESHED_FIELDS}
+            operations.append(UpdateOne(
+                {"url": proxy.url},
+                {"$set": fields, "$setOnInsert": defaults},
+                upsert=True
+            ))
+        return await self.collection.bulk_write(operations, ordered=False)
+
+    async def bulk_record_checks(self, results: Iterable[Tuple[str, bool, float]]) -> BulkWriteResult:
+        """Persist a batch of (url, is_working, response_time) health check results
+
+        Failed checks extend the failure streak, so they count towards
+        blacklisting like failed requests do.
+        """
+        now = datetime.utcnow()
+        operations = []
+        urls = []
+        for url, is_working, response_time in results:
+            if is_working:
+                update = {"$set": {
+                    "is_active": True,
+                    "failures": 0,
+                    "last_checked": now,
+                    "response_time": response_time
+                }}
+            else:
+                update = {
+                    "$set": {"is_active": False, "last_checked": now, "last_failure": now},
+                    "$inc": {"failures": 1}
+                }
+            operations.append(UpdateOne({"url": url}, update))
+            urls.append(url)
+        return await self._bulk_write_with_blacklist(operations, urls, now)
+
+    async def bulk_record_outcomes(self, outcomes: Iterable[Dict[str, Any]]) -> Optional[BulkWriteResult]:
+        """Apply a batch of aggregated request outcomes, one update per proxy
+
+        Each outcome has the proxy url, the successes, failures and 403s to
+        add, the failure and 403 streaks seen since the previous batch
+        (failure_reset / forbidden_reset tell whether they replace the
+        stored streaks or continue them), the latest latency and the times
+        of the last success, failure and 403. Proxies whose streaks now
+        cross the blacklist thresholds are blacklisted in the same write.
+        """
+        now = datetime.utcnow()
+        operations = []
+        urls = []
+        for outcome in outcomes:
+            increments = {
+                field: outcome[key]
+                for field, key in (("success_count", "successes"), ("failure_count", "failures"), ("forbidden_count", "forbidden"))
+                if outcome[key]
+            }
+            updates = {}
+            for field, streak, reset in (
+                ("failures", "failure_streak", "failure_reset"),
+                ("consecutive_forbidden", "forbidden_streak", "forbidden_reset"),
+            ):
+                if outcome[reset]:
+                    updates[field] = outcome[streak]
+                elif outcome[streak]:
+                    increments[field] = increments.get(field, 0) + outcome[streak]
+            if outcome["latency"] is not None:
+                updates["response_time"] = outcome["latency"]
+            for field in ("last_success", "last_failure", "last_forbidden"):
+                if outcome[field] is not None:
+                    updates[field] = outcome[field]
+
+            update = {}
+            if increments:
+                update["$inc"] = increments
+            if updates:
+                update["$set"] = updates
+            if update:
+                operations.append(UpdateOne({"url": outcome["url"]}, update))
+                urls.append(outcome["url"])
+        if not operations:
+            return None
+        return await self._bulk_write_with_blacklist(operations, urls, now)
+
+    async def _bulk_write_with_blacklist(self, operations: List, urls: List[str], now: datetime) -> BulkWriteResult:
+        """Run operations, then blacklist any of urls whose streaks crossed the thresholds
+
+        The write is ordered so the blacklist check sees the updated streaks.
+        """
+        crossed = []
+        if PROXY_BLACKLIST_FAILURES > 0:
+            crossed.append({"failures": {"$gte": PROXY_BLACKLIST_FAILURES}})
+        if PROXY_BLACKLIST_FORBIDDEN > 0:
+            crossed.append({"consecutive_forbidden": {"$gte": PROXY_BLACKLIST_FORBIDDEN}})
+        if crossed and urls:
+            operations = operations + [UpdateMany(
+                {"url": {"$in": urls}, "blacklisted": False, "$or": crossed},
+                {"$set": {"blacklisted": True, "is_active": False, "blacklisted_at": now}}
+            )]
+        return await self.collection.bulk_write(operations, ordered=True)
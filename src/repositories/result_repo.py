@@ -0,0 +1,40 @@
+import logging
+from typing import Any, Dict, List
+from pymongo.errors import BulkWriteError
+from src.models.result import ResultCreate, ResultUpdate, ResultInDB
+from .base import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+class ResultRepository(BaseRepository[ResultInDB, ResultCreate, ResultUpdate]):
+    def __init__(self):
+        from src.storage.mongo_client import MongoClient
+        self.mongo = MongoClient()
+        super().__init__(self.mongo.db.results)
+        self.model = ResultInDB
+
+    async def setup_indexes(self):
+        """Setup required indexes"""
+        await self.collection.create_index([("url", 1), ("scraped_at", -1)])
+        await self.collection.create_index([("scraped_at", 1)])
+
+    async def write_batch(self, results: List[Dict[str, Any]]) -> int:
+        """Insert a batch of result documents with one unordered insert_many
+
+        Returns:
+            Number of documents written; documents the server rejected are
+            not retried, so the writer counts them as dropped
+        """
+        if not results:
+            return 0
+        try:
+            inserted = await self.collection.insert_many(results, ordered=False)
+            return len(inserted.inserted_ids)
+        except BulkWriteError as e:
+            # Unordered, so everything but the failed documents was written
+            errors = e.details.get("writeErrors", [])
+            logger.error(f"{len(errors)} of {len(results)} results failed to insert")
+            return e.details.get("nInserted", 0)
+
+    async def close(self):
+        pass
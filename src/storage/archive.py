@@ -0,0 +1,226 @@
+import os
+import json
+import mmap
+import time
+import zlib
+import asyncio
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from config.settings import (
+    ARCHIVE_DIR,
+    ARCHIVE_SEGMENT_SIZE,
+    ARCHIVE_COMPRESSION_LEVEL,
+    ARCHIVE_MAX_PENDING,
+)
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".pages.gz"
+INDEX_SUFFIX = ".idx"
+# Pages compressed and appended per write
+WRITE_BATCH = 100
+# Bytes read at a time when a segment is scanned without its index
+SCAN_CHUNK_SIZE = 1024 * 1024
+
+# Queued by close() to tell the write loop to drain and exit
+_STOP = object()
+
+# (header, body); the header has url, fetched_at, status and charset
+ArchivedPage = Tuple[Dict[str, Any], bytes]
+
+
+def encode_page(header: Dict[str, Any], body: bytes, level: int = ARCHIVE_COMPRESSION_LEVEL) -> bytes:
+    """One page as a gzip member: a JSON header line followed by the raw body"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    data = json.dumps(header, separators=(",", ":")).encode() + b"\n" + body
+    return compressor.compress(data) + compressor.flush()
+
+
+def decode_page(data: bytes) -> ArchivedPage:
+    header, _, body = zlib.decompress(data, 31).partition(b"\n")
+    return json.loads(header), body
+
+
+class SegmentWriter:
+    """Appends pages to rotating segment files; blocking, run it in a thread
+
+    Each page is its own gzip member, so a segment is a valid .gz file
+    (zcat prints every page) and a page can be decompressed on its own.
+    Next to each segment an index lists offset, length and URL of every
+    page, one tab separated line each. Index lines are only written after
+    the pages they point to, so a reader following the index never sees
+    a page that is still being written.
+    """
+
+    def __init__(
+        self,
+        directory: str = ARCHIVE_DIR,
+        segment_size: int = ARCHIVE_SEGMENT_SIZE,
+        level: int = ARCHIVE_COMPRESSION_LEVEL,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_size = segment_size
+        self.level = level
+        # One series of segments per process so concurrent workers never share a file
+        self._prefix = f"pages-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self._sequence = 0
+        self._segment = None
+        self._index = None
+        self._offset = 0
+
+    def _open(self):
+        self._sequence += 1
+        path = os.path.join(self.directory, f"{self._prefix}-{self._sequence:05d}{SEGMENT_SUFFIX}")
+        self._segment = open(path, "ab")
+        self._index = open(path + INDEX_SUFFIX, "a", encoding="utf-8")
+        self._offset = self._segment.tell()
+
+    def append(self, pages: List[ArchivedPage]) -> int:
+        if self._segment is None:
+            self._open()
+        lines = []
+        for header, body in pages:
+            data = encode_page(header, body, self.level)
+            self._segment.write(data)
+            lines.append(f"{self._offset}\t{len(data)}\t{header['url']}\n")
+            self._offset += len(data)
+        self._segment.flush()
+        self._index.write("".join(lines))
+        self._index.flush()
+        if self._offset >= self.segment_size:
+            self.close()
+        return len(pages)
+
+    def close(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._index.close()
+            self._segment = None
+            self._index = None
+
+
+class PageArchive:
+    """Keeps the raw HTML of fetched pages so it can be extracted again later
+
+    put() only enqueues; a background task compresses and appends pages to
+    the current segment in a thread. Archiving is best effort: pages that
+    cannot be written are logged and dropped rather than failing the
+    scrape. Once max_pending pages are waiting, put() blocks.
+    """
+
+    def __init__(
+        self,
+        directory: str = ARCHIVE_DIR,
+        segment_size: int = ARCHIVE_SEGMENT_SIZE,
+        max_pending: int = ARCHIVE_MAX_PENDING,
+    ):
+        self.writer = SegmentWriter(directory, segment_size)
+        self.written = 0
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, url: str, body: bytes, charset: Optional[str] = None, status: int = 200):
+        header = {"url": url, "fetched_at": time.time(), "status": status, "charset": charset}
+        await self._queue.put((header, body))
+
+    async def close(self):
+        """Write everything that is queued and close the current segment"""
+        if self._task is not None:
+            await self._queue.put(_STOP)
+            await self._task
+            self._task = None
+        await asyncio.to_thread(self.writer.close)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [await self._queue.get()]
+            while len(batch) < WRITE_BATCH and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if _STOP in batch:
+                stopping = True
+                batch = [page for page in batch if page is not _STOP]
+            if batch:
+                await self._write(batch)
+
+    async def _write(self, batch: List[ArchivedPage]):
+        try:
+            self.written += await asyncio.to_thread(self.writer.append, batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            logger.error(f"Error archiving {len(batch)} pages: {e}")
+
+
+def list_segments(directory: str = ARCHIVE_DIR) -> List[str]:
+    """Segment files in the archive, oldest series first"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX)
+    )
+
+
+def read_index(path: str) -> Iterator[Tuple[int, int, str]]:
+    """(offset, length, url) of every page in a segment, from its index"""
+    with open(path + INDEX_SUFFIX, encoding="utf-8") as f:
+        for line in f:
+            offset, length, url = line.rstrip("\n").split("\t", 2)
+            yield int(offset), int(length), url
+
+
+def has_index(path: str) -> bool:
+    return os.path.exists(path + INDEX_SUFFIX)
+
+
+def read_pages(path: str, entries: List[Tuple[int, int, str]]) -> Iterator[ArchivedPage]:
+    """Pages at the given (offset, length, url) index entries of a memory-mapped segment"""
+    if not entries or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for offset, length, url in entries:
+            try:
+                yield decode_page(mapped[offset:offset + length])
+            except (zlib.error, ValueError) as e:
+                logger.error(f"Skipping unreadable page {url} in {path}: {e}")
+
+
+def iter_segment(path: str) -> Iterator[ArchivedPage]:
+    """Pages of a segment, read through its index when there is one
+
+    Without an index (e.g. it was lost or never written after a crash) the
+    segment is scanned member by member instead, stopping at a truncated
+    last page.
+    """
+    if has_index(path):
+        yield from read_pages(path, list(read_index(path)))
+    else:
+        yield from _scan_segment(path)
+
+
+def _scan_segment(path: str) -> Iterator[ArchivedPage]:
+    with open(path, "rb") as f:
+        pending = b""
+        while True:
+            decompressor = zlib.decompressobj(31)
+            parts = []
+            while not decompressor.eof:
+                data = pending or f.read(SCAN_CHUNK_SIZE)
+                pending = b""
+                if not data:
+                    if parts:
+                        logger.warning(f"Segment {path} ends in a truncated page")
+                    return
+                parts.append(decompressor.decompress(data))
+            pending = decompressor.unused_data
+            header, _, body = b"".join(parts).partition(b"\n")
+            yield json.loads(header), body
@@ -0,0 +1,122 @@
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from redis.asyncio import Redis
+from config.settings import FETCH_CACHE_LOCAL_SIZE, FETCH_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so trivially different spellings share a cache entry
+
+    Lowercases the scheme and host, drops default ports and fragments and
+    sorts query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class FetchCache:
+    """Two-tier cache of fetch validators and extraction results per canonical URL
+
+    Each entry holds the ETag / Last-Modified validators, a hash of the
+    body and the extracted result. Lookups hit a bounded in-process LRU
+    first and fall back to a shared Redis tier, so a page fetched by one
+    worker lets every other worker send a conditional request for it.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        local_size: int = FETCH_CACHE_LOCAL_SIZE,
+        ttl: int = FETCH_CACHE_TTL,
+    ):
+        self.redis = redis
+        self.local_size = local_size
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "unchanged": 0}
+        self._local: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        digest = hashlib.sha1(canonical_url(url).encode()).hexdigest()
+        return f"scraper:cache:{digest}"
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    async def get(self, url: str) -> Optional[Dict[str, Any]]:
+        key = self._key(url)
+        entry = self._local.get(key)
+        if entry is not None and time.time() - entry["stored_at"] < self.ttl:
+            self._local.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+        entry = None
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(key)
+                entry = json.loads(raw) if raw else None
+            except Exception as e:
+                logger.error(f"Error reading fetch cache: {e}")
+        if entry is None:
+            self._local.pop(key, None)
+            self.stats["misses"] += 1
+            return None
+        self._remember(key, entry)
+        self.stats["hits"] += 1
+        return entry
+
+    async def set(
+        self,
+        url: str,
+        result: Dict[str, Any],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        body_hash: Optional[str] = None,
+    ):
+        key = self._key(url)
+        entry = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": body_hash,
+            "result": result,
+            "stored_at": time.time(),
+        }
+        self._remember(key, entry)
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, json.dumps(entry), ex=self.ttl)
+            except Exception as e:
+                logger.error(f"Error writing fetch cache: {e}")
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a cached entry"""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
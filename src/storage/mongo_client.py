@@ -1,20 +1,24 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from src.utils.patterns.singleton import SingletonMeta
+from config.settings import MONGO_HOST, MONGO_PORT, MONGO_DB
 
 class MongoClient(metaclass=SingletonMeta):
-    def __init__(self, host='localhost', port=27017):
+    def __init__(self, host=MONGO_HOST, port=MONGO_PORT, database=MONGO_DB):
         if not hasattr(self, 'client'):
             self.client = AsyncIOMotorClient(host=host, port=port)
-            self.db = self.client['scraper']
+            self.db = self.client[database]
 
     async def init_db(self):
         """Initialize database with required indexes"""
         from src.repositories.proxy_repo import ProxyRepository
+        from src.repositories.result_repo import ResultRepository
         
         # Initialize repositories
         proxy_repo = ProxyRepository()
+        result_repo = ResultRepository()
         
         # Setup indexes for each collection
         await proxy_repo.setup_indexes()
+        await result_repo.setup_indexes()
         
         # Add other repository index setup here as needed
\ No newline at end of file
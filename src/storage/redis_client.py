@@ -1,52 +1,661 @@
 from redis.asyncio import Redis
 import json
+import logging
+import time
+import random
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import (
+    REDIS_HOST,
+    REDIS_PORT,
+    MAX_RETRIES,
+    TASK_LEASE_SECONDS,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    RETRY_BACKOFF_JITTER,
+    QUEUE_DEFAULT_WEIGHT,
+    QUEUE_AGING_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on delayed retries moved back into the queue per claim
+PROMOTE_BATCH_SIZE = 100
+
+# Upper bound on pending wakeup tokens; more than this many idle workers
+# still wake up within WORKER_IDLE_INTERVAL
+SIGNAL_MAX_TOKENS = 1000
+
+# Scripts that make tasks ready push one token per task onto the signal list
+# (a separate KEYS entry), so idle workers blocked in BLPOP wake up at once.
+SIGNAL_FUNCTION = """
+local function signal(key, count)
+    for _ = 1, math.min(count, %d) do
+        redis.call('LPUSH', key, '1')
+    end
+    if count > 0 then
+        redis.call('LTRIM', key, 0, %d)
+    end
+end
+""" % (SIGNAL_MAX_TOKENS, SIGNAL_MAX_TOKENS - 1)
+
+# Ready tasks live in one sorted set per domain (url -> score) and the
+# domains take turns by stride scheduling: the domains zset (a KEYS entry)
+# holds each domain with queued tasks scored by its virtual pass, the
+# lowest pass is served next and then advances by 1 / weight. A domain
+# that had nothing queued joins at the current virtual time, so idle
+# domains can't save up turns. Within a domain the score is the priority
+# minus queued_at / aging interval, which ranks a task that waited one
+# aging interval longer a priority level higher without ever rescoring.
+# Every dequeue is a few O(log n) sorted set operations however many
+# domains there are. The scripts derive the sub-queue, weight and state
+# keys themselves instead of receiving them in KEYS, which Redis Cluster
+# and proxies that check script keys reject: the queue needs a standalone
+# Redis (replicas are fine). enqueue() also writes KEYS[2], which must be
+# the task data hash.
+DOMAIN_QUEUE_PREFIX = "scraper:tasks:domain:"
+QUEUE_STATE_KEY = "scraper:tasks:state"
+DOMAIN_WEIGHTS_KEY = "scraper:tasks:weights"
+# The crawl frontier's seen zset (see src/tasks/frontier.py). Tasks it queues
+# carry the digest of their URL, which is dropped from the seen zset when the
+# task is dead-lettered so the URL can be queued again.
+FRONTIER_SEEN_KEY = "scraper:frontier:seen"
+
+QUEUE_FUNCTION = """
+local DOMAIN_QUEUE_PREFIX = '%s'
+local QUEUE_STATE_KEY = '%s'
+local DOMAIN_WEIGHTS_KEY = '%s'
+local DEFAULT_WEIGHT = %r
+local AGING_INTERVAL = %r
+""" % (DOMAIN_QUEUE_PREFIX, QUEUE_STATE_KEY, DOMAIN_WEIGHTS_KEY, QUEUE_DEFAULT_WEIGHT, QUEUE_AGING_INTERVAL) + """
+local function domain_of(url)
+    local authority = string.match(url, '^%a[%w+.-]*://([^/?#]*)') or ''
+    authority = string.gsub(authority, '^.*@', '')
+    authority = string.gsub(authority, ':%d*$', '')
+    return string.lower(authority)
+end
+
+local function task_score(task)
+    local priority = tonumber(task['priority']) or 0
+    if AGING_INTERVAL > 0 then
+        return priority - (tonumber(task['queued_at']) or 0) / AGING_INTERVAL
+    end
+    return priority
+end
+
+local function enqueue(domains, url, task)
+    if not task['queued_at'] then
+        local clock = redis.call('TIME')
+        task['queued_at'] = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+        redis.call('HSET', KEYS[2], url, cjson.encode(task))
+    end
+    local domain = domain_of(url)
+    if redis.call('ZADD', DOMAIN_QUEUE_PREFIX .. domain, task_score(task), url) == 1 then
+        redis.call('HINCRBY', QUEUE_STATE_KEY, 'queued', 1)
+    end
+    redis.call('ZADD', domains, 'NX', redis.call('HGET', QUEUE_STATE_KEY, 'vtime') or 0, domain)
+end
+
+local function remove_queued(domains, url)
+    local domain = domain_of(url)
+    local queue = DOMAIN_QUEUE_PREFIX .. domain
+    if redis.call('ZREM', queue, url) == 1 then
+        redis.call('HINCRBY', QUEUE_STATE_KEY, 'queued', -1)
+        if redis.call('EXISTS', queue) == 0 then
+            redis.call('ZREM', domains, domain)
+        end
+    end
+end
+
+local function dequeue(domains)
+    while true do
+        local head = redis.call('ZRANGE', domains, 0, 0, 'WITHSCORES')
+        if #head == 0 then
+            return nil
+        end
+        local domain, pass = head[1], tonumber(head[2])
+        local queue = DOMAIN_QUEUE_PREFIX .. domain
+        local popped = redis.call('ZPOPMAX', queue)
+        if #popped > 0 then
+            redis.call('HINCRBY', QUEUE_STATE_KEY, 'queued', -1)
+            redis.call('HSET', QUEUE_STATE_KEY, 'vtime', tostring(pass))
+            if redis.call('EXISTS', queue) == 1 then
+                local weight = tonumber(redis.call('HGET', DOMAIN_WEIGHTS_KEY, domain))
+                if not weight or weight <= 0 then
+                    weight = DEFAULT_WEIGHT
+                end
+                redis.call('ZADD', domains, pass + 1 / weight, domain)
+            else
+                redis.call('ZREM', domains, domain)
+            end
+            return popped[1]
+        end
+        -- A domain left behind without tasks, e.g. by a manual key deletion
+        redis.call('ZREM', domains, domain)
+    end
+end
+"""
+
+# Enqueue a task only if its URL is not already known to the dedup index.
+# KEYS: domains zset, task data hash, signal list
+# ARGV: url, priority (read from the task json), task json
+ADD_TASK_SCRIPT = SIGNAL_FUNCTION + QUEUE_FUNCTION + """
+if redis.call('HSETNX', KEYS[2], ARGV[1], ARGV[3]) == 1 then
+    enqueue(KEYS[1], ARGV[1], cjson.decode(ARGV[3]))
+    signal(KEYS[3], 1)
+    return 1
+end
+return 0
+"""
+
+# Bulk variant of ADD_TASK_SCRIPT, returns the number of tasks added.
+# KEYS: domains zset, task data hash, signal list
+# ARGV: url, priority, task json triples
+ADD_TASKS_SCRIPT = SIGNAL_FUNCTION + QUEUE_FUNCTION + """
+local added = 0
+for i = 1, #ARGV, 3 do
+    if redis.call('HSETNX', KEYS[2], ARGV[i], ARGV[i + 2]) == 1 then
+        enqueue(KEYS[1], ARGV[i], cjson.decode(ARGV[i + 2]))
+        added = added + 1
+    end
+end
+signal(KEYS[3], added)
+return added
+"""
+
+# Return the task that would be dequeued next without removing it.
+# KEYS: domains zset, task data hash
+PEEK_TASK_SCRIPT = QUEUE_FUNCTION + """
+local head = redis.call('ZRANGE', KEYS[1], 0, 0)
+if #head == 0 then
+    return false
+end
+local top = redis.call('ZREVRANGE', DOMAIN_QUEUE_PREFIX .. head[1], 0, 0)
+if #top == 0 then
+    return false
+end
+return redis.call('HGET', KEYS[2], top[1])
+"""
+
+# Atomically remove and return the next task.
+# KEYS: domains zset, task data hash
+POP_TASK_SCRIPT = QUEUE_FUNCTION + """
+local url = dequeue(KEYS[1])
+if not url then
+    return false
+end
+local task = redis.call('HGET', KEYS[2], url)
+redis.call('HDEL', KEYS[2], url)
+return task
+"""
+
+# Shared by NACK_TASK_SCRIPT and REAP_LEASES_SCRIPT: drop the lease on a task,
+# bump its retry counter and either schedule a delayed retry with exponential
+# backoff or move it to the dead-letter hash once max_retries is exceeded.
+# KEYS: domains zset, task data hash, in-flight zset, delayed zset, dead-letter hash
+RETRY_FUNCTION = QUEUE_FUNCTION + """
+local FRONTIER_SEEN_KEY = '%s'
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local function retry(url, err, max_retries, backoff_base, backoff_max, jitter)
+    redis.call('ZREM', KEYS[3], url)
+    local raw = redis.call('HGET', KEYS[2], url)
+    if not raw then
+        return {'missing', '0'}
+    end
+    local task = cjson.decode(raw)
+    local retries = (task['retries'] or task['retires'] or 0) + 1
+    task['retries'] = retries
+    task['retires'] = nil
+    task['last_error'] = err
+    if retries > max_retries then
+        task['failed_at'] = now
+        remove_queued(KEYS[1], url)
+        redis.call('ZREM', KEYS[4], url)
+        redis.call('HDEL', KEYS[2], url)
+        redis.call('HSET', KEYS[5], url, cjson.encode(task))
+        if task['digest'] then
+            redis.call('ZREM', FRONTIER_SEEN_KEY, task['digest'])
+        end
+        return {'dead', '0'}
+    end
+    local delay = math.min(backoff_base * 2 ^ (retries - 1), backoff_max) * (1 + jitter)
+    redis.call('HSET', KEYS[2], url, cjson.encode(task))
+    redis.call('ZADD', KEYS[4], now + delay, url)
+    return {'retry', tostring(delay)}
+end
+""" % FRONTIER_SEEN_KEY
+
+# Promote due delayed retries, then dequeue up to count tasks and lease them
+# to the caller until now + lease_seconds. Busy workers claim without waiting
+# for signals, so once the queue runs dry the tokens left over are dropped;
+# otherwise idle workers would wake on them for nothing.
+# KEYS: domains zset, task data hash, in-flight zset, delayed zset, signal list
+# ARGV: lease_seconds, max delayed tasks to promote, count
+CLAIM_TASKS_SCRIPT = QUEUE_FUNCTION + """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local due = redis.call('ZRANGEBYSCORE', KEYS[4], '-inf', now, 'LIMIT', 0, tonumber(ARGV[2]))
+for _, url in ipairs(due) do
+    redis.call('ZREM', KEYS[4], url)
+    local raw = redis.call('HGET', KEYS[2], url)
+    if raw then
+        enqueue(KEYS[1], url, cjson.decode(raw))
+    end
+end
+
+local tasks = {}
+for _ = 1, tonumber(ARGV[3]) do
+    local url = dequeue(KEYS[1])
+    if not url then
+        break
+    end
+    redis.call('ZADD', KEYS[3], now + tonumber(ARGV[1]), url)
+    tasks[#tasks + 1] = redis.call('HGET', KEYS[2], url)
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('DEL', KEYS[5])
+end
+return tasks
+"""
+
+# Finish a task: forget it everywhere, including the dedup index.
+# KEYS: domains zset, task data hash, in-flight zset, delayed zset
+ACK_TASK_SCRIPT = QUEUE_FUNCTION + """
+redis.call('ZREM', KEYS[3], ARGV[1])
+remove_queued(KEYS[1], ARGV[1])
+redis.call('ZREM', KEYS[4], ARGV[1])
+return redis.call('HDEL', KEYS[2], ARGV[1])
+"""
+
+# Push a lease deadline out to now + lease_seconds, if the task is still leased.
+# KEYS: in-flight zset
+# ARGV: url, lease_seconds
+# Returns 1 if the lease was extended, 0 if it was already reaped or finished
+EXTEND_LEASE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# Give claimed tasks back without counting an attempt, e.g. on shutdown.
+# Returns the number of tasks released.
+# KEYS: domains zset, task data hash, in-flight zset, delayed zset, signal list
+# ARGV: urls
+RELEASE_TASKS_SCRIPT = SIGNAL_FUNCTION + QUEUE_FUNCTION + """
+local released = 0
+for _, url in ipairs(ARGV) do
+    if redis.call('ZREM', KEYS[3], url) == 1 then
+        local raw = redis.call('HGET', KEYS[2], url)
+        if raw then
+            enqueue(KEYS[1], url, cjson.decode(raw))
+            released = released + 1
+        end
+    end
+end
+signal(KEYS[5], released)
+return released
+"""
+
+# ARGV: url, error, max_retries, backoff_base, backoff_max, jitter
+NACK_TASK_SCRIPT = RETRY_FUNCTION + """
+return retry(ARGV[1], ARGV[2], tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5]), tonumber(ARGV[6]))
+"""
+
+# Treat every lease past its deadline as a failed attempt.
+# ARGV: max leases to reap, max_retries, backoff_base, backoff_max, jitter
+REAP_LEASES_SCRIPT = RETRY_FUNCTION + """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now, 'LIMIT', 0, tonumber(ARGV[1]))
+for _, url in ipairs(expired) do
+    retry(url, 'Lease expired', tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5]))
+end
+return #expired
+"""
+
+# Move tasks from the single queue used before domain sub-queues into them.
+# KEYS: domains zset, task data hash, single queue zset, signal list
+# ARGV: max tasks
+# Returns the number of members taken off the single queue and of tasks moved
+# (members without task data are dropped)
+MIGRATE_SINGLE_QUEUE_SCRIPT = SIGNAL_FUNCTION + QUEUE_FUNCTION + """
+local popped = redis.call('ZPOPMAX', KEYS[3], tonumber(ARGV[1]))
+local moved = 0
+for i = 1, #popped, 2 do
+    local raw = redis.call('HGET', KEYS[2], popped[i])
+    if raw then
+        enqueue(KEYS[1], popped[i], cjson.decode(raw))
+        moved = moved + 1
+    end
+end
+signal(KEYS[4], moved)
+return {#popped / 2, moved}
+"""
+
 
 class RedisClient:
-    def __init__(self, host='localhost', port=6379, decode_responses=True):
+    def __init__(self, host=REDIS_HOST, port=REDIS_PORT, decode_responses=True):
         self.redisClient = Redis(host=host, port=port, decode_responses=decode_responses)
-        self.task_queue = "scraper:tasks"
-    
+        # Pre sorted-set deployments kept every task JSON in a single list
+        self.legacy_task_queue = "scraper:tasks"
+        # Deployments before domain sub-queues kept ready tasks in one sorted set of url -> priority
+        self.single_task_queue = "scraper:tasks:queue"
+        # Domains with ready tasks scored by their turn (see QUEUE_FUNCTION),
+        # plus a hash of url -> task JSON that doubles as the dedup index
+        self.task_queue = "scraper:tasks:domains"
+        self.task_data = "scraper:tasks:data"
+        self.queue_state = QUEUE_STATE_KEY
+        self.domain_weights = DOMAIN_WEIGHTS_KEY
+        # Leased tasks (url -> lease deadline), tasks waiting out a retry
+        # backoff (url -> ready time) and tasks that exhausted MAX_RETRIES
+        self.inflight_tasks = "scraper:tasks:inflight"
+        self.delayed_tasks = "scraper:tasks:delayed"
+        self.dead_tasks = "scraper:tasks:dead"
+        # One token per task made ready, for idle workers blocked in BLPOP
+        self.task_signal = "scraper:tasks:signal"
+
+        self._add_task = self.redisClient.register_script(ADD_TASK_SCRIPT)
+        self._add_tasks = self.redisClient.register_script(ADD_TASKS_SCRIPT)
+        self._peek_task = self.redisClient.register_script(PEEK_TASK_SCRIPT)
+        self._pop_task = self.redisClient.register_script(POP_TASK_SCRIPT)
+        self._claim_tasks = self.redisClient.register_script(CLAIM_TASKS_SCRIPT)
+        self._ack_task = self.redisClient.register_script(ACK_TASK_SCRIPT)
+        self._extend_lease = self.redisClient.register_script(EXTEND_LEASE_SCRIPT)
+        self._nack_task = self.redisClient.register_script(NACK_TASK_SCRIPT)
+        self._release_tasks = self.redisClient.register_script(RELEASE_TASKS_SCRIPT)
+        self._reap_leases = self.redisClient.register_script(REAP_LEASES_SCRIPT)
+        self._migrate_single_queue = self.redisClient.register_script(MIGRATE_SINGLE_QUEUE_SCRIPT)
+
+    @property
+    def _lifecycle_keys(self):
+        return [self.task_queue, self.task_data, self.inflight_tasks, self.delayed_tasks]
+
+    @property
+    def _retry_keys(self):
+        return self._lifecycle_keys + [self.dead_tasks]
+
+    @staticmethod
+    def _new_task(url: str, priority: int, digest: Optional[str] = None) -> str:
+        task = {
+            "url": url,
+            "priority": priority,
+            "retries": 0,
+            "queued_at": time.time()
+        }
+        if digest:
+            task["digest"] = digest
+        return json.dumps(task)
 
     async def add_task(self, url:str, priority:int):
         try:
-            existing_tasks = await self.redisClient.lrange(self.task_queue, 0, -1)
-            for task in existing_tasks:
-                task_data = json.loads(task)
-                if task_data["url"] == url:
-                    return False
-            task = json.dumps({
-                "url": url,
-                "priority": priority,
-                "retires": 0
-            })
-            await self.redisClient.lpush(self.task_queue, task)
-            return True
-        except Exception as e:
-            print(f"Error adding task: {e}")
+            added = await self._add_task(
+                keys=[self.task_queue, self.task_data, self.task_signal],
+                args=[url, priority, self._new_task(url, priority)]
+            )
+            return bool(added)
+        except Exception as e:
+            logger.error(f"Error adding task: {e}")
             return False
 
+    async def add_tasks(self, tasks: List[Tuple[str, int]]) -> int:
+        """Enqueue a batch of (url, priority) pairs in a single round trip
+
+        URLs already known to the dedup index are skipped.
+
+        Returns:
+            Number of tasks actually added
+        """
+        args = []
+        for url, priority in tasks:
+            args.extend((url, priority, self._new_task(url, priority)))
+        if not args:
+            return 0
+        return await self._add_tasks(keys=[self.task_queue, self.task_data, self.task_signal], args=args)
+
     async def get_task(self):
+        """Return the next task without removing it from the queue"""
         try:
-            tasks = await self.redisClient.lrange(self.task_queue, 0, -1)
-            if tasks:
-                tasks = [json.loads(task) for task in tasks]
-                task = max(tasks, key=lambda x: x["priority"])
-                return task
+            task = await self._peek_task(keys=[self.task_queue, self.task_data])
+            return json.loads(task) if task else None
+        except Exception as e:
+            logger.error(f"Error getting task: {e}")
             return None
+
+    async def pop_task(self):
+        """Atomically remove and return the next task"""
+        try:
+            task = await self._pop_task(keys=[self.task_queue, self.task_data])
+            return json.loads(task) if task else None
         except Exception as e:
-            print(f"Error getting task: {e}")
+            logger.error(f"Error popping task: {e}")
             return None
 
+    async def claim_task(self, lease_seconds: float = TASK_LEASE_SECONDS):
+        """Atomically dequeue the next task and lease it to the caller
+
+        The task stays in the in-flight set until it is acked or nacked. If
+        neither happens before the lease expires, requeue_expired_leases
+        treats it as a failed attempt.
+
+        Args:
+            lease_seconds: How long the caller may work on the task
+        """
+        tasks = await self.claim_tasks(1, lease_seconds)
+        return tasks[0] if tasks else None
+
+    async def claim_tasks(self, count: int, lease_seconds: float = TASK_LEASE_SECONDS) -> List[Dict]:
+        """Claim up to count tasks in one round trip
+
+        Domains take turns in proportion to their weight (see
+        set_domain_weights); within a domain the highest priority task goes
+        first, with tasks gaining a priority level for every
+        QUEUE_AGING_INTERVAL seconds they waited. Every task is leased from
+        the moment it is claimed, so keep count small enough that the last
+        one is started well within the lease.
+        """
+        try:
+            tasks = await self._claim_tasks(
+                keys=self._lifecycle_keys + [self.task_signal],
+                args=[lease_seconds, PROMOTE_BATCH_SIZE, max(1, count)]
+            )
+            return [json.loads(task) for task in tasks if task]
+        except Exception as e:
+            logger.error(f"Error claiming tasks: {e}")
+            return []
+
+    async def wait_for_tasks(self, timeout: float) -> bool:
+        """Block until a task is signalled as ready or timeout seconds pass
+
+        Returns:
+            True if woken by a signal
+        """
+        # BLPOP only accepts whole seconds on older servers
+        return await self.redisClient.blpop([self.task_signal], timeout=max(1, int(timeout))) is not None
+
+    async def extend_lease(self, task, lease_seconds: float = TASK_LEASE_SECONDS) -> bool:
+        """Keep a claimed task leased for lease_seconds from now, e.g. while it waits on a rate limit
+
+        Returns:
+            False if the lease was already reaped or the task finished
+        """
+        return bool(await self._extend_lease(keys=[self.inflight_tasks], args=[task["url"], lease_seconds]))
+
+    async def ack_task(self, task):
+        """Mark a claimed task as done"""
+        try:
+            await self._ack_task(keys=self._lifecycle_keys, args=[task["url"]])
+        except Exception as e:
+            logger.error(f"Error acking task: {e}")
+
+    async def nack_task(self, task, error: str = ""):
+        """Mark a claimed task as failed
+
+        The task is retried after an exponential backoff, or moved to the
+        dead-letter hash once it has been retried MAX_RETRIES times.
+
+        Returns:
+            Dict with the outcome ("retry", "dead" or "missing") and the retry delay
+        """
+        try:
+            status, delay = await self._nack_task(
+                keys=self._retry_keys,
+                args=[task["url"], error, *self._retry_args()]
+            )
+            return {"status": status, "delay": float(delay)}
+        except Exception as e:
+            logger.error(f"Error nacking task: {e}")
+            return {"status": "error", "delay": 0.0}
+
+    async def release_task(self, task) -> bool:
+        """Return a claimed task to the queue without counting it as a failed attempt"""
+        return bool(await self.release_tasks([task]))
+
+    async def release_tasks(self, tasks: List[Dict]) -> int:
+        """Return claimed tasks to the queue in one round trip, e.g. a worker's prefetch buffer
+
+        Returns:
+            Number of tasks released
+        """
+        if not tasks:
+            return 0
+        try:
+            return await self._release_tasks(
+                keys=self._lifecycle_keys + [self.task_signal],
+                args=[task["url"] for task in tasks]
+            )
+        except Exception as e:
+            logger.error(f"Error releasing tasks: {e}")
+            return 0
+
+    async def requeue_expired_leases(self, limit: int = 1000) -> int:
+        """Retry tasks whose lease expired, e.g. because their worker died
+
+        Safe to call from every worker; each expired lease is reaped once.
+
+        Returns:
+            Number of expired leases that were reaped
+        """
+        try:
+            return await self._reap_leases(
+                keys=self._retry_keys,
+                args=[limit, *self._retry_args()]
+            )
+        except Exception as e:
+            logger.error(f"Error reaping expired leases: {e}")
+            return 0
+
+    def _retry_args(self):
+        return [MAX_RETRIES, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX, random.uniform(0, RETRY_BACKOFF_JITTER)]
+
     async def remove_task(self, obj=None, url=None):
         try:
-            if obj:
-                await self.redisClient.lrem(self.task_queue, 0, json.dumps(obj))
-            elif url:
-                tasks = await self.redisClient.lrange(self.task_queue, 0, -1)
-                for task in tasks:
-                    task_data = json.loads(task)
-                    if task_data["url"] == url:
-                        await self.redisClient.lrem(self.task_queue, 0, task)
-                        break
-        except Exception as e:
-            print(f"Error removing task: {e}")
\ No newline at end of file
+            url = obj["url"] if obj else url
+            if not url:
+                return
+            await self._ack_task(keys=self._lifecycle_keys, args=[url])
+        except Exception as e:
+            logger.error(f"Error removing task: {e}")
+
+    async def set_domain_weights(self, weights: Dict[str, float]):
+        """Set the share of claims each domain gets, relative to QUEUE_DEFAULT_WEIGHT
+
+        A domain with weight 4 is served four times as often as one with
+        weight 1 while both have tasks queued. Weights are shared by all
+        workers and take effect on the next claim.
+        """
+        invalid = [domain for domain, weight in weights.items() if weight <= 0]
+        if invalid:
+            raise ValueError(f"Domain weights must be positive: {', '.join(invalid)}")
+        if weights:
+            await self.redisClient.hset(
+                self.domain_weights, mapping={domain.lower(): weight for domain, weight in weights.items()}
+            )
+
+    async def queue_size(self) -> int:
+        """Number of tasks waiting in the queue"""
+        return int(await self.redisClient.hget(self.queue_state, "queued") or 0)
+
+    async def dead_letter_size(self) -> int:
+        """Number of tasks that exhausted their retries"""
+        return await self.redisClient.hlen(self.dead_tasks)
+
+    async def queue_stats(self) -> Dict[str, int]:
+        """Number of tasks in each queue state, in a single round trip"""
+        async with self.redisClient.pipeline(transaction=False) as pipe:
+            pipe.hget(self.queue_state, "queued")
+            pipe.zcard(self.inflight_tasks)
+            pipe.zcard(self.delayed_tasks)
+            pipe.hlen(self.dead_tasks)
+            queued, inflight, delayed, dead = await pipe.execute()
+        return {"queued": int(queued or 0), "inflight": inflight, "delayed": delayed, "dead": dead}
+
+    async def migrate_legacy_queue(self, batch_size: int = 1000):
+        """Move tasks from the old list-based and single sorted-set queues into domain sub-queues
+
+        The legacy list is read in batches and only deleted once every batch
+        has been enqueued, so an interrupted migration can simply be re-run:
+        tasks that already made it across are skipped by the dedup index.
+        Tasks of the single sorted-set queue are moved atomically a batch at
+        a time.
+
+        Args:
+            batch_size: Number of legacy tasks to read and enqueue per round trip
+        """
+        result = {"migrated": 0, "duplicates": 0, "invalid": 0, "requeued": 0}
+        if await self.redisClient.type(self.legacy_task_queue) == "list":
+            result.update(await self._migrate_legacy_list(batch_size))
+
+        # The single queue is a sorted set too; its members are URLs, not domains
+        while await self.redisClient.type(self.single_task_queue) == "zset":
+            popped, moved = await self._migrate_single_queue(
+                keys=[self.task_queue, self.task_data, self.single_task_queue, self.task_signal],
+                args=[batch_size]
+            )
+            if not popped:
+                break
+            result["requeued"] += moved
+        if result["requeued"]:
+            logger.info(f"Moved {result['requeued']} queued tasks into domain sub-queues")
+        return result
+
+    async def _migrate_legacy_list(self, batch_size: int) -> Dict[str, int]:
+        migrated = duplicates = invalid = 0
+        start = 0
+        while True:
+            raw_tasks = await self.redisClient.lrange(
+                self.legacy_task_queue, start, start + batch_size - 1
+            )
+            if not raw_tasks:
+                break
+            start += len(raw_tasks)
+
+            async with self.redisClient.pipeline(transaction=False) as pipe:
+                for raw in raw_tasks:
+                    try:
+                        task = json.loads(raw)
+                        url, priority = task["url"], task["priority"]
+                    except (ValueError, KeyError, TypeError):
+                        invalid += 1
+                        continue
+                    await self._add_task(
+                        keys=[self.task_queue, self.task_data, self.task_signal],
+                        args=[url, priority, json.dumps(task)],
+                        client=pipe
+                    )
+                results = await pipe.execute()
+
+            added = sum(1 for result in results if result)
+            migrated += added
+            duplicates += len(results) - added
+
+        await self.redisClient.delete(self.legacy_task_queue)
+        logger.info(
+            f"Migrated {migrated} legacy tasks "
+            f"({duplicates} duplicates, {invalid} invalid)"
+        )
+        return {"migrated": migrated, "duplicates": duplicates, "invalid": invalid}
@@ -0,0 +1,211 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from config.settings import (
+    RESULT_SINK,
+    RESULT_DIR,
+    RESULT_BATCH_SIZE,
+    RESULT_FLUSH_INTERVAL,
+    RESULT_MAX_PENDING,
+    RESULT_MAX_RETRY_DELAY,
+)
+from src.monitoring.metrics import RESULTS_WRITTEN, stage
+
+logger = logging.getLogger(__name__)
+
+# Queued by close() to tell the flush loop to drain and exit
+_STOP = object()
+
+
+class JsonlResultSink:
+    """Appends results to a per-process JSON Lines file, for environments without Mongo"""
+
+    def __init__(self, directory: str = RESULT_DIR):
+        os.makedirs(directory, exist_ok=True)
+        # One file per process so concurrent workers never interleave writes
+        self.path = os.path.join(directory, f"results-{os.getpid()}.jsonl")
+
+    def _append(self, lines: str):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+    async def write_batch(self, results: List[Dict[str, Any]]) -> int:
+        lines = "".join(json.dumps(result, default=str) + "\n" for result in results)
+        await asyncio.to_thread(self._append, lines)
+        return len(results)
+
+    async def close(self):
+        pass
+
+
+class ParquetResultSink:
+    """Writes results as row groups of a per-process Parquet file (requires pyarrow)
+
+    Extracted fields are stored as a JSON string column since their set
+    depends on the extraction schema.
+    """
+
+    def __init__(self, directory: str = RESULT_DIR):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("The parquet result sink requires the pyarrow package")
+        self._pa = pa
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"results-{os.getpid()}.parquet")
+        self._schema = pa.schema([
+            ("url", pa.string()),
+            ("worker_id", pa.string()),
+            ("proxy", pa.string()),
+            ("scraped_at", pa.timestamp("us")),
+            ("data", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(self.path, self._schema)
+
+    def _write(self, results: List[Dict[str, Any]]):
+        table = self._pa.Table.from_pylist([
+            {
+                "url": result.get("url"),
+                "worker_id": result.get("worker_id"),
+                "proxy": result.get("proxy"),
+                "scraped_at": result.get("scraped_at"),
+                "data": json.dumps(result.get("data"), default=str),
+            }
+            for result in results
+        ], schema=self._schema)
+        self._writer.write_table(table)
+
+    async def write_batch(self, results: List[Dict[str, Any]]) -> int:
+        await asyncio.to_thread(self._write, results)
+        return len(results)
+
+    async def close(self):
+        await asyncio.to_thread(self._writer.close)
+
+
+def create_result_sink(kind: str = RESULT_SINK):
+    """Result sink for the RESULT_SINK setting: "mongo", "jsonl" or "parquet" """
+    if kind == "mongo":
+        from src.repositories.result_repo import ResultRepository
+        return ResultRepository()
+    if kind == "jsonl":
+        return JsonlResultSink()
+    if kind == "parquet":
+        return ParquetResultSink()
+    raise ValueError(f"Unknown result sink: {kind}")
+
+
+class BufferedResultWriter:
+    """Buffers results in memory and writes them to a sink in batches
+
+    put() only enqueues, so workers never wait on a database round trip.
+    A background task flushes a batch whenever batch_size results are
+    buffered or flush_interval seconds have passed. Failed writes are
+    retried with backoff while the buffer keeps filling; results the sink
+    rejects one by one count as dropped. Once max_pending results are
+    waiting, put() blocks, which slows workers down to the speed of the
+    sink instead of growing memory without bound.
+    """
+
+    def __init__(
+        self,
+        sink=None,
+        batch_size: int = RESULT_BATCH_SIZE,
+        flush_interval: float = RESULT_FLUSH_INTERVAL,
+        max_pending: int = RESULT_MAX_PENDING,
+    ):
+        self.sink = sink if sink is not None else create_result_sink()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @property
+    def pending(self) -> int:
+        """Results buffered and not yet handed to the sink"""
+        return self._queue.qsize()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, result: Dict[str, Any]):
+        """Hand off a result; only waits when the buffer is full"""
+        await self._queue.put(result)
+
+    async def close(self):
+        """Flush everything that is buffered and close the sink"""
+        if self._task is not None:
+            self._closing = True
+            await self._queue.put(_STOP)
+            await self._task
+            self._task = None
+        await self.sink.close()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+        # Drain whatever is left after close() was called
+        batch = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                batch.append(item)
+            if len(batch) >= self.batch_size:
+                await self._write(batch)
+                batch = []
+        if batch:
+            await self._write(batch)
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        delay = 0.5
+        attempts = 0
+        while True:
+            try:
+                with stage("persist"):
+                    written = await self.sink.write_batch(batch)
+                self.written += written
+                RESULTS_WRITTEN.inc(written)
+                # The sink rejected the rest, e.g. documents Mongo refused;
+                # retrying them would fail the same way
+                self.dropped += len(batch) - written
+                return
+            except Exception as e:
+                attempts += 1
+                # Keep retrying while running; give up after a few tries on shutdown
+                if self._closing and attempts >= 3:
+                    self.dropped += len(batch)
+                    logger.error(f"Dropping {len(batch)} results after {attempts} failed writes: {e}")
+                    return
+                logger.warning(f"Error writing {len(batch)} results, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RESULT_MAX_RETRY_DELAY)
@@ -0,0 +1,220 @@
+import re
+import time
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from src.storage.redis_client import RedisClient, SIGNAL_FUNCTION, QUEUE_FUNCTION, FRONTIER_SEEN_KEY
+from src.storage.cache import canonical_url
+from config.settings import (
+    FRONTIER_SEEN_TTL,
+    FRONTIER_RECRAWL_INTERVAL,
+    FRONTIER_SCHEDULE_BATCH,
+)
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "ref", "ref_", "spm"}
+TRACKING_PREFIXES = ("utm_",)
+
+# amazon.com, smile.amazon.co.uk, m.amazon.de, ... -> the marketplace TLD
+AMAZON_HOST = re.compile(r"^(?:(?:www|smile|m)\.)?amazon\.((?:com?\.)?[a-z]{2,3})$")
+# /dp/<ASIN>, /<slug>/dp/<ASIN>/ref=..., /gp/product/<ASIN>, /gp/aw/d/<ASIN>, ...
+AMAZON_ASIN = re.compile(
+    r"/(?:dp|gp/product|gp/aw/d|exec/obidos/asin|o/asin|product)/([a-z0-9]{10})(?:[/?]|$)",
+    re.IGNORECASE,
+)
+
+# Seen-set members are the first 64 bits of the SHA1 of the canonical URL,
+# scored with the time they expire. A URL that is still seen is skipped;
+# one with a recrawl interval is also put on the recrawl schedule. Tasks
+# carry the digest so RETRY_FUNCTION can forget URLs that are dead-lettered.
+# KEYS: domains zset, task data hash, signal list, seen zset, recrawl zset, item hash
+# ARGV: now, seen ttl, then (url, priority, task JSON, recrawl interval, digest) per task
+# Returns the number of tasks added to the queue
+FRONTIER_ADD_SCRIPT = SIGNAL_FUNCTION + QUEUE_FUNCTION + """
+local now = tonumber(ARGV[1])
+local seen_ttl = tonumber(ARGV[2])
+local added = 0
+for i = 3, #ARGV, 5 do
+    local url = ARGV[i]
+    local digest = ARGV[i + 4]
+    local expires = tonumber(redis.call('ZSCORE', KEYS[4], digest) or '0')
+    if expires <= now then
+        local interval = tonumber(ARGV[i + 3])
+        if interval > 0 then
+            redis.call('ZADD', KEYS[4], now + interval, digest)
+            redis.call('ZADD', KEYS[5], now + interval, url)
+            redis.call('HSET', KEYS[6], url, cjson.encode({priority = tonumber(ARGV[i + 1]), interval = interval, digest = digest}))
+        else
+            redis.call('ZADD', KEYS[4], now + seen_ttl, digest)
+        end
+        if redis.call('HSETNX', KEYS[2], url, ARGV[i + 2]) == 1 then
+            enqueue(KEYS[1], url, cjson.decode(ARGV[i + 2]))
+            added = added + 1
+        end
+    end
+end
+signal(KEYS[3], added)
+
+-- Forget a few expired URLs per call so the seen set never needs a sweep
+local expired = redis.call('ZRANGEBYSCORE', KEYS[4], '-inf', now, 'LIMIT', 0, 100)
+if #expired > 0 then
+    redis.call('ZREM', KEYS[4], unpack(expired))
+end
+return added
+"""
+
+# Queue the recrawls that are due and schedule their next one. Items still
+# queued or in flight are not queued twice.
+# KEYS: domains zset, task data hash, signal list, seen zset, recrawl zset, item hash
+# ARGV: now, max items
+# Returns the number of tasks added to the queue
+FRONTIER_SCHEDULE_SCRIPT = SIGNAL_FUNCTION + QUEUE_FUNCTION + """
+local now = tonumber(ARGV[1])
+local due = redis.call('ZRANGEBYSCORE', KEYS[5], '-inf', now, 'LIMIT', 0, tonumber(ARGV[2]))
+local added = 0
+for _, url in ipairs(due) do
+    local raw = redis.call('HGET', KEYS[6], url)
+    if raw then
+        local item = cjson.decode(raw)
+        redis.call('ZADD', KEYS[5], now + item['interval'], url)
+        redis.call('ZADD', KEYS[4], now + item['interval'], item['digest'])
+        local task = {url = url, priority = item['priority'], retries = 0, queued_at = now, digest = item['digest']}
+        if redis.call('HSETNX', KEYS[2], url, cjson.encode(task)) == 1 then
+            enqueue(KEYS[1], url, task)
+            added = added + 1
+        end
+    else
+        redis.call('ZREM', KEYS[5], url)
+    end
+end
+signal(KEYS[3], added)
+return added
+"""
+
+
+def canonicalize(url: str) -> Optional[str]:
+    """The one spelling of a URL the frontier knows it by, or None if it is not http(s)
+
+    Amazon product URLs in any of their forms (/dp/, /gp/product/, with a
+    slug, a ref path segment or query parameters) become
+    https://www.amazon.<tld>/dp/<ASIN>. Other URLs are normalized as for
+    the fetch cache, with tracking parameters dropped.
+    """
+    url = url.strip()
+    if not url.lower().startswith(("http://", "https://")):
+        return None
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+
+    marketplace = AMAZON_HOST.match(host)
+    if marketplace:
+        asin = AMAZON_ASIN.search(parts.path)
+        if asin:
+            return f"https://www.amazon.{marketplace.group(1)}/dp/{asin.group(1).upper()}"
+
+    query = [
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name not in TRACKING_PARAMS and not name.startswith(TRACKING_PREFIXES)
+    ]
+    return canonical_url(urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), "")))
+
+
+class Frontier:
+    """Decides what gets crawled: canonical URLs, a seen-set and a recrawl schedule
+
+    Every URL is canonicalized before it reaches the queue, so spellings
+    of the same page collapse into one task. A URL queued once is
+    remembered for seen_ttl seconds and skipped when seeded again in that
+    time, unless its task is dead-lettered: a URL that could not be
+    crawled is forgotten so it can be seeded again. URLs with a recrawl interval are re-queued by schedule_due()
+    each time the interval has passed, and skipped when seeded before
+    that. The seen-set holds a fixed 16 character hash per URL, whatever
+    its length; only URLs with a recrawl interval are stored in full.
+    """
+
+    def __init__(self, redis_client: Optional[RedisClient] = None, seen_ttl: int = FRONTIER_SEEN_TTL):
+        self.redis_client = redis_client or RedisClient()
+        self.seen_ttl = seen_ttl
+        self.seen = FRONTIER_SEEN_KEY
+        self.recrawl = "scraper:frontier:recrawl"
+        self.items = "scraper:frontier:items"
+        redis = self.redis_client.redisClient
+        self._add = redis.register_script(FRONTIER_ADD_SCRIPT)
+        self._schedule = redis.register_script(FRONTIER_SCHEDULE_SCRIPT)
+
+    @property
+    def _keys(self) -> List[str]:
+        return [
+            self.redis_client.task_queue,
+            self.redis_client.task_data,
+            self.redis_client.task_signal,
+            self.seen,
+            self.recrawl,
+            self.items,
+        ]
+
+    async def add(self, url: str, priority: int, recrawl_interval: float = FRONTIER_RECRAWL_INTERVAL) -> bool:
+        """Queue a URL unless it was seen recently
+
+        Returns:
+            True if a task was added
+        """
+        return await self.add_many([(url, priority, recrawl_interval)]) == 1
+
+    async def add_many(self, items: Iterable[Tuple[str, int, float]]) -> int:
+        """Queue a batch of (url, priority, recrawl interval) in one round trip
+
+        Invalid URLs and repeats of a URL within the batch (after
+        canonicalization, first one wins) are dropped before reaching Redis.
+
+        Returns:
+            Number of tasks actually added
+        """
+        batch: Dict[str, Tuple[int, float]] = {}
+        for url, priority, interval in items:
+            canonical = canonicalize(url) if url else None
+            if canonical and canonical not in batch:
+                batch[canonical] = (priority, interval or 0)
+        if not batch:
+            return 0
+
+        args = [time.time(), self.seen_ttl]
+        for url, (priority, interval) in batch.items():
+            digest = self._digest(url)
+            args.extend((url, priority, RedisClient._new_task(url, priority, digest), interval, digest))
+        return await self._add(keys=self._keys, args=args)
+
+    async def schedule_due(self, limit: int = FRONTIER_SCHEDULE_BATCH) -> int:
+        """Queue up to limit recrawls that are due
+
+        Returns:
+            Number of tasks added to the queue
+        """
+        return await self._schedule(keys=self._keys, args=[time.time(), limit])
+
+    async def forget(self, url: str):
+        """Drop a URL from the seen-set and the recrawl schedule"""
+        canonical = canonicalize(url)
+        if not canonical:
+            return
+        redis = self.redis_client.redisClient
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.seen, self._digest(canonical))
+            pipe.zrem(self.recrawl, canonical)
+            pipe.hdel(self.items, canonical)
+            await pipe.execute()
+
+    async def stats(self) -> Dict[str, int]:
+        redis = self.redis_client.redisClient
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.zcard(self.seen)
+            pipe.zcard(self.recrawl)
+            seen, scheduled = await pipe.execute()
+        return {"seen": seen, "scheduled": scheduled}
+
+    @staticmethod
+    def _digest(url: str) -> str:
+        return hashlib.sha1(url.encode()).hexdigest()[:16]
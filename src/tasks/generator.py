@@ -1,34 +1,148 @@
 import os
 import sys
+import gzip
+import json
+import time
 import logging
+from typing import Iterator, List, Optional, Tuple
 
 # Add project root to Python path
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.append(project_root)
 
-from src.storage.redis_client import RedisClient
+from src.tasks.frontier import Frontier
+from config.settings import URL_BATCH_SIZE, INGEST_PROGRESS_INTERVAL, FRONTIER_RECRAWL_INTERVAL
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def open_url_file(path: str):
+    """Open a seed file as text, transparently decompressing gzip files"""
+    with open(path, 'rb') as f:
+        is_gzip = f.read(2) == b'\x1f\x8b'
+    if is_gzip:
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+SeedItem = Tuple[Optional[str], int, float]
+
+
+def iter_urls(path: str, default_priority: int = 1, default_recrawl: float = FRONTIER_RECRAWL_INTERVAL) -> Iterator[SeedItem]:
+    """Lazily yield (url, priority, recrawl interval) from a seed file
+
+    Plain text files hold one URL per line; blank lines and lines starting
+    with '#' are skipped. JSONL lines look like
+    {"url": ..., "priority": ..., "recrawl_interval": ...} where priority
+    and the recrawl interval (seconds, 0 to crawl once) are optional. Both
+    formats may be gzip compressed. Lines that cannot be parsed yield a
+    url of None.
+    """
+    with open_url_file(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('{'):
+                try:
+                    record = json.loads(line)
+                    yield (
+                        record['url'],
+                        int(record.get('priority', default_priority)),
+                        float(record.get('recrawl_interval', default_recrawl)),
+                    )
+                except (ValueError, KeyError, TypeError):
+                    yield None, default_priority, default_recrawl
+            else:
+                yield line, default_priority, default_recrawl
+
+
+def iter_batches(items: Iterator[SeedItem], batch_size: int) -> Iterator[List[SeedItem]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 class Generator:
     def __init__(self):
-        self.redisClient = RedisClient()
+        # URLs go through the frontier, which canonicalizes them and skips
+        # the ones already queued or crawled recently
+        self.frontier = Frontier()
 
 
-    async def add_url(self, url:str, priority:int):
+    async def add_url(self, url:str, priority:int, recrawl_interval: float = FRONTIER_RECRAWL_INTERVAL):
         try:
             if not url.strip().startswith(("http://", "https://")):
                 logger.info(f"Invalid URL: {url}. Skipping.")
                 return
-            success = await self.redisClient.add_task(url, priority)
+            success = await self.frontier.add(url, priority, recrawl_interval)
 
             if success:
                 logger.info(f"Added URL: {url}")
             else:
-                logger.info(f"URL already exists: {url}")
+                logger.info(f"URL already queued or recently crawled: {url}")
             return success
         except Exception as e:
             logger.error(f"Error adding URL: {url}. Error: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+
+    async def add_urls_from_file(
+        self,
+        path: str,
+        priority: int = 1,
+        batch_size: int = URL_BATCH_SIZE,
+        recrawl_interval: float = FRONTIER_RECRAWL_INTERVAL,
+    ):
+        """Stream a seed file into the task queue in bulk
+
+        The file is read lazily one batch at a time and each batch is
+        enqueued with a single Redis round trip, so memory stays flat
+        regardless of file size.
+
+        Args:
+            path: Plain text, JSONL or gzip compressed seed file
+            priority: Priority for URLs that do not specify one
+            batch_size: Number of URLs sent to Redis per round trip
+            recrawl_interval: Seconds between recrawls for URLs that do not
+                specify one; 0 crawls them once
+        """
+        stats = {"read": 0, "added": 0, "duplicates": 0, "invalid": 0}
+        started = time.monotonic()
+        next_report = started + INGEST_PROGRESS_INTERVAL
+
+        for batch in iter_batches(iter_urls(path, priority, recrawl_interval), batch_size):
+            stats["read"] += len(batch)
+            tasks = []
+            for url, url_priority, url_recrawl in batch:
+                url = url.strip() if url else ''
+                if not url.startswith(("http://", "https://")):
+                    stats["invalid"] += 1
+                    continue
+                tasks.append((url, url_priority, url_recrawl))
+
+            # Duplicates within the batch are collapsed by the frontier
+            added = await self.frontier.add_many(tasks)
+            stats["added"] += added
+            stats["duplicates"] += len(tasks) - added
+
+            if time.monotonic() >= next_report:
+                self._log_progress(stats, started)
+                next_report = time.monotonic() + INGEST_PROGRESS_INTERVAL
+
+        self._log_progress(stats, started)
+        stats["elapsed"] = round(time.monotonic() - started, 3)
+        return stats
+
+    def _log_progress(self, stats, started):
+        elapsed = max(time.monotonic() - started, 1e-9)
+        logger.info(
+            f"Read {stats['read']} URLs ({stats['read'] / elapsed:.0f}/s): "
+            f"{stats['added']} added, {stats['duplicates']} duplicates, "
+            f"{stats['invalid']} invalid"
+        )
@@ -0,0 +1,198 @@
+import json
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from redis.asyncio import Redis
+from config.settings import (
+    JOB_MAX_CONCURRENT,
+    JOB_LOCK_TTL,
+    JOB_PROGRESS_INTERVAL,
+    JOB_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+# Reported for running jobs whose process stopped sending heartbeats
+ABANDONED = "abandoned"
+
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+JobFunction = Callable[[ProgressCallback], Awaitable[Dict[str, Any]]]
+
+# Delete a coalescing lock only if it still belongs to the given job
+# KEYS: lock key
+# ARGV: job id
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class JobStore:
+    """Job state in Redis, so any API process can report on any job
+
+    Each job is a hash at scraper:jobs:<id>. Coalesced job kinds also hold
+    a lock at scraper:jobs:active:<kind> with the running job's id; the lock
+    expires unless the job keeps heartbeating, so a crashed process never
+    blocks new runs for long.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._release_lock = redis.register_script(RELEASE_LOCK_SCRIPT)
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"scraper:jobs:{job_id}"
+
+    @staticmethod
+    def _lock_key(kind: str) -> str:
+        return f"scraper:jobs:active:{kind}"
+
+    async def create(self, kind: str, coalesce: bool = False) -> Tuple[str, bool]:
+        """Register a new queued job
+
+        Returns:
+            (job id, created); with coalesce, the id of the job of this kind
+            that is already queued or running and created=False
+        """
+        job_id = uuid.uuid4().hex
+        if coalesce:
+            acquired = await self.redis.set(self._lock_key(kind), job_id, nx=True, ex=JOB_LOCK_TTL)
+            if not acquired:
+                existing = await self.redis.get(self._lock_key(kind))
+                if existing:
+                    return existing, False
+                # The lock expired between SET and GET; try once more
+                return await self.create(kind, coalesce)
+
+        now = time.time()
+        try:
+            await self.redis.hset(self._key(job_id), mapping={
+                "id": job_id,
+                "kind": kind,
+                "status": QUEUED,
+                "coalesce": int(coalesce),
+                "created_at": now,
+                "updated_at": now,
+            })
+        except Exception:
+            # Don't leave later requests coalescing into a job that never existed
+            if coalesce:
+                await self._release_lock(keys=[self._lock_key(kind)], args=[job_id])
+            raise
+        return job_id, True
+
+    async def update(self, job_id: str, kind: str, coalesce: bool, **fields):
+        """Store job fields (dicts as JSON) and extend the coalescing lock"""
+        mapping = {
+            name: json.dumps(value) if isinstance(value, (dict, list)) else value
+            for name, value in fields.items()
+        }
+        mapping["updated_at"] = time.time()
+        await self.redis.hset(self._key(job_id), mapping=mapping)
+        if coalesce:
+            await self.redis.expire(self._lock_key(kind), JOB_LOCK_TTL)
+
+    async def finish(self, job_id: str, kind: str, coalesce: bool, **fields):
+        await self.update(job_id, kind, False, finished_at=time.time(), **fields)
+        await self.redis.expire(self._key(job_id), JOB_TTL)
+        if coalesce:
+            await self._release_lock(keys=[self._lock_key(kind)], args=[job_id])
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        data = await self.redis.hgetall(self._key(job_id))
+        if not data:
+            return None
+        job: Dict[str, Any] = dict(data)
+        for name in ("progress", "result"):
+            if name in job:
+                job[name] = json.loads(job[name])
+        for name in ("created_at", "updated_at", "started_at", "finished_at"):
+            if name in job:
+                job[name] = float(job[name])
+        job["coalesce"] = job.get("coalesce") == "1"
+        if job["status"] in (QUEUED, RUNNING) and time.time() - job["updated_at"] > JOB_LOCK_TTL:
+            job["status"] = ABANDONED
+        return job
+
+
+class JobRunner:
+    """Runs long operations in the background of the current process
+
+    At most max_concurrent jobs run at once, later ones wait their turn in
+    the queued state. Progress reported by a job is written to the store
+    at most every JOB_PROGRESS_INTERVAL seconds, and a heartbeat keeps
+    the job (and its coalescing lock) alive while it runs.
+    """
+
+    def __init__(self, store: JobStore, max_concurrent: int = JOB_MAX_CONCURRENT):
+        self.store = store
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, kind: str, func: JobFunction, coalesce: bool = False) -> Tuple[str, bool]:
+        """Start func in the background
+
+        Returns:
+            (job id, created); created is False when the request was
+            coalesced into a job of the same kind that is already active
+        """
+        job_id, created = await self.store.create(kind, coalesce)
+        if created:
+            task = asyncio.create_task(self._run(job_id, kind, func, coalesce))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return job_id, created
+
+    async def _run(self, job_id: str, kind: str, func: JobFunction, coalesce: bool):
+        latest: Dict[str, Any] = {}
+        last_write = 0.0
+
+        async def progress(counts: Dict[str, Any]):
+            nonlocal last_write
+            latest.clear()
+            latest.update(counts)
+            now = time.monotonic()
+            if now - last_write >= JOB_PROGRESS_INTERVAL:
+                last_write = now
+                await self.store.update(job_id, kind, coalesce, progress=latest)
+
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(JOB_LOCK_TTL / 3)
+                try:
+                    await self.store.update(job_id, kind, coalesce)
+                except Exception as e:
+                    # Keep beating: a missed heartbeat or two is fine, a dead one reports the job abandoned
+                    logger.error(f"Error sending heartbeat for job {job_id} ({kind}): {e}")
+
+        heartbeat_task = asyncio.create_task(heartbeat())
+        try:
+            async with self._semaphore:
+                await self.store.update(job_id, kind, coalesce, status=RUNNING, started_at=time.time())
+                logger.info(f"Job {job_id} ({kind}) started")
+                result = await func(progress)
+            await self.store.finish(job_id, kind, coalesce, status=SUCCEEDED, progress=latest, result=result)
+            logger.info(f"Job {job_id} ({kind}) succeeded: {result}")
+        except asyncio.CancelledError:
+            await self.store.finish(job_id, kind, coalesce, status=FAILED, progress=latest, error="Cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind}) failed: {e}")
+            await self.store.finish(job_id, kind, coalesce, status=FAILED, progress=latest, error=str(e))
+        finally:
+            heartbeat_task.cancel()
+
+    async def close(self):
+        """Cancel running jobs and record them as failed"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
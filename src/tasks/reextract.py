@@ -0,0 +1,134 @@
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.core.extractor import DEFAULT_SCHEMA, _init_process, _extract_in_process
+from src.storage.archive import ArchivedPage, has_index, iter_segment, list_segments, read_index, read_pages
+from src.storage.result_writer import BufferedResultWriter, create_result_sink
+from config.settings import ARCHIVE_DIR, RESULT_SINK
+
+logger = logging.getLogger(__name__)
+
+# Written as the worker_id of re-extracted results
+WORKER_ID = "reextract"
+# Pages per job; segments are split into jobs of this many index entries
+JOB_PAGES = 50
+# Jobs submitted to the pool per process at a time
+JOBS_PER_PROCESS = 2
+
+# A segment path with the index entries to extract, or None for the whole
+# segment when it has no index
+Job = Tuple[str, Optional[List[Tuple[int, int, str]]]]
+
+
+def _extract_job(job: Job) -> List[Dict[str, Any]]:
+    """Extract the pages of one job; runs in a pool process"""
+    path, entries = job
+    pages = read_pages(path, entries) if entries is not None else iter_segment(path)
+    return [result for result in map(_as_result, pages) if result is not None]
+
+
+def _as_result(page: ArchivedPage) -> Optional[Dict[str, Any]]:
+    header, body = page
+    try:
+        data = _extract_in_process(body, header.get("charset"))
+    except Exception as e:
+        logger.error(f"Error extracting {header['url']}: {e}")
+        return None
+    return {
+        "url": header["url"],
+        "data": data,
+        "worker_id": WORKER_ID,
+        "proxy": None,
+        "scraped_at": datetime.utcfromtimestamp(header["fetched_at"]),
+    }
+
+
+def iter_jobs(segments: List[str], pages_per_job: int = JOB_PAGES) -> Iterator[Job]:
+    """Split segments into jobs of up to pages_per_job pages each
+
+    Indexes are read lazily, so only the entries of the jobs taken so far
+    are held in memory. A segment without an index can only be read front
+    to back, so it becomes a single job.
+    """
+    for path in segments:
+        if not has_index(path):
+            yield path, None
+            continue
+        entries = read_index(path)
+        while True:
+            chunk = list(islice(entries, pages_per_job))
+            if not chunk:
+                break
+            yield path, chunk
+
+
+async def reextract(
+    directory: str = ARCHIVE_DIR,
+    sink: str = RESULT_SINK,
+    processes: Optional[int] = None,
+    schema: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """Run extraction again over every archived page and write the results
+
+    Segments are split into slices of their index and the slices spread
+    over a process pool, so all cores parse at once however few segments
+    there are. Each process memory-maps the segment of its slice and
+    decompresses only that slice's pages. Slices are planned as the pool
+    takes them, at most JOBS_PER_PROCESS per process ahead, so memory
+    does not grow with the size of the archive. Results keep the time the
+    page was fetched as scraped_at and go to the result sink like a
+    worker's.
+
+    Returns:
+        Dictionary with the number of segments, jobs and results and the time taken
+    """
+    segments = list_segments(directory)
+    if not segments:
+        logger.warning(f"No archived pages in {directory}")
+        return {"segments": 0, "jobs": 0, "results": 0, "seconds": 0.0}
+
+    jobs = iter_jobs(segments)
+    processes = processes or os.cpu_count() or 1
+    started = time.monotonic()
+    writer = BufferedResultWriter(create_result_sink(sink))
+    loop = asyncio.get_running_loop()
+    done = 0
+    executor = ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_process,
+        initargs=(DEFAULT_SCHEMA if schema is None else schema,),
+    )
+    await writer.start()
+    try:
+        pending = set()
+        while True:
+            for job in islice(jobs, processes * JOBS_PER_PROCESS - len(pending)):
+                pending.add(loop.run_in_executor(executor, _extract_job, job))
+            if not pending:
+                break
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in finished:
+                for result in future.result():
+                    await writer.put(result)
+                done += 1
+                if done % 100 == 0:
+                    logger.info(f"Re-extracted {done} jobs")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        await writer.close()
+
+    stats = {
+        "segments": len(segments),
+        "jobs": done,
+        "results": writer.written,
+        "seconds": round(time.monotonic() - started, 2),
+    }
+    logger.info(f"Re-extraction completed: {stats}")
+    return stats
@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+import uuid
+import signal
+import asyncio
+import logging
+import multiprocessing
+from typing import Dict, Optional
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(project_root)
+
+from config.settings import WORKER_SLOTS, WORKER_DRAIN_TIMEOUT, SUPERVISOR_MAX_RESTART_DELAY, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker_process(worker_id: str, slots: int, drain_timeout: float, metrics_port: int = 0):
+    """Entry point of a worker child process: one event loop, one Worker"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(_serve_worker(worker_id, slots, drain_timeout, metrics_port))
+
+
+async def _serve_worker(worker_id: str, slots: int, drain_timeout: float, metrics_port: int = 0):
+    from src.tasks.worker import Worker
+    from src.monitoring.metrics import MetricsServer
+
+    worker = Worker(worker_id, slots=slots, drain_timeout=drain_timeout)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+    metrics = MetricsServer(metrics_port) if metrics_port else None
+    if metrics:
+        await metrics.start()
+    try:
+        await worker.start()
+    finally:
+        if metrics:
+            await metrics.stop()
+
+
+class Supervisor:
+    """Runs each Worker in its own OS process and keeps them alive
+
+    Children are spawned (not forked) so none of them inherit the parent's
+    event loop or connections. A child that exits while the supervisor is
+    running is restarted with exponential backoff. On SIGTERM/SIGINT, or
+    once the timeout passes, every child is sent SIGTERM so it can drain
+    its in-flight tasks, and is killed if it is still alive after the drain
+    timeout plus a grace period.
+    """
+
+    def __init__(
+        self,
+        num_processes: int,
+        slots: int = WORKER_SLOTS,
+        drain_timeout: float = WORKER_DRAIN_TIMEOUT,
+        max_restart_delay: float = SUPERVISOR_MAX_RESTART_DELAY,
+        metrics_port: int = METRICS_PORT,
+    ):
+        self.num_processes = num_processes
+        self.slots = slots
+        self.drain_timeout = drain_timeout
+        self.max_restart_delay = max_restart_delay
+        # Child i exports its metrics on metrics_port + i
+        self.metrics_port = metrics_port
+        self._context = multiprocessing.get_context("spawn")
+        self._children: Dict[int, multiprocessing.Process] = {}
+        self._restarts: Dict[int, int] = {}
+        self._started_at: Dict[int, float] = {}
+        self._stopping: Optional[asyncio.Event] = None
+
+    def _spawn(self, index: int):
+        worker_id = f"worker_{index}_{uuid.uuid4().hex[:8]}"
+        process = self._context.Process(
+            target=run_worker_process,
+            args=(worker_id, self.slots, self.drain_timeout, self.metrics_port + index if self.metrics_port else 0),
+            name=worker_id,
+        )
+        process.start()
+        self._children[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info(f"Supervisor: Started {worker_id} (pid {process.pid})")
+
+    def stop(self):
+        if self._stopping is not None and not self._stopping.is_set():
+            logger.info("Supervisor: Stopping workers...")
+            self._stopping.set()
+
+    async def run(self, timeout: Optional[float] = None):
+        """Start the worker processes and supervise them until stopped or timed out"""
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stop)
+        deadline = loop.time() + timeout if timeout else None
+
+        for index in range(self.num_processes):
+            self._spawn(index)
+
+        try:
+            while not self._stopping.is_set():
+                if deadline is not None and loop.time() >= deadline:
+                    logger.info("Supervisor: Timeout reached")
+                    break
+                await self._restart_exited(loop)
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=1)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(sig)
+            await self._shutdown()
+
+    async def _restart_exited(self, loop):
+        for index, process in list(self._children.items()):
+            if process.is_alive():
+                continue
+            # A child that ran for a while before exiting starts a fresh backoff
+            if time.monotonic() - self._started_at[index] > 2 * self.max_restart_delay:
+                self._restarts[index] = 0
+            restarts = self._restarts.get(index, 0)
+            delay = min(2 ** restarts, self.max_restart_delay)
+            logger.warning(
+                f"Supervisor: {process.name} exited with code {process.exitcode}, "
+                f"restarting in {delay:.0f}s"
+            )
+            process.close()
+            del self._children[index]
+            self._restarts[index] = restarts + 1
+            loop.call_later(delay, self._respawn, index)
+
+    def _respawn(self, index: int):
+        if not self._stopping.is_set() and index not in self._children:
+            self._spawn(index)
+
+    async def _shutdown(self):
+        for process in self._children.values():
+            if process.is_alive():
+                process.terminate()
+
+        # Workers drain for up to drain_timeout, give them a little longer
+        grace = self.drain_timeout + 10
+        await asyncio.gather(*(
+            asyncio.to_thread(process.join, grace) for process in self._children.values()
+        ))
+        for process in self._children.values():
+            if process.is_alive():
+                logger.warning(f"Supervisor: {process.name} did not drain in time, killing it")
+                process.kill()
+                process.join()
+        self._children.clear()
+        logger.info("Supervisor: All workers stopped")
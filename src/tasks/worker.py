@@ -1,65 +1,681 @@
+import json
 import asyncio
 import logging
-from typing import Dict, Any
+import time
+from datetime import datetime
+from functools import partial
+from typing import Dict, Any, Optional, Tuple
 
 from src.storage.redis_client import RedisClient
-from src.core.scraper import scrape_product
+from src.storage.result_writer import BufferedResultWriter
+from src.storage.cache import FetchCache
+from src.storage.archive import PageArchive
+from src.tasks.frontier import Frontier
+from src.core.scraper import scrape_product, ScrapeError
 from src.core.proxy_manager import ProxyManager
-from config.settings import HEADERS
+from src.core.proxy_pool import ProxyPool, CLOSED, HALF_OPEN, OPEN
+from src.core.proxy_stats import ProxyStatsAggregator
+from src.core.rate_limiter import RateLimiter, BLOCK_STATUSES
+from src.core.concurrency import AIMDLimiter, SUCCESS, ERROR, OVERLOAD
+from src.core.hedging import HedgePolicy
+from src.core.session_manager import SessionManager
+from src.core.extractor import create_extractor
+from src.monitoring.metrics import (
+    REGISTRY,
+    TASKS,
+    IN_FLIGHT,
+    QUEUE_DEPTH,
+    TASKS_BUFFERED,
+    RESULTS_PENDING,
+    PROXY_REQUESTS,
+    PROXY_LATENCY,
+    PROXY_BREAKERS,
+    CONCURRENCY_LIMIT,
+    PROXY_CONCURRENCY_LIMIT,
+    HEDGES,
+    HEDGE_DELAY,
+    stage,
+    start_trace,
+    finish_trace,
+)
+from config.settings import (
+    HEADERS,
+    REQUEST_TIMEOUT,
+    LEASE_REAPER_INTERVAL,
+    FRONTIER_SCHEDULE_INTERVAL,
+    USE_PROXY,
+    WORKER_SLOTS,
+    WORKER_DRAIN_TIMEOUT,
+    WORKER_IDLE_INTERVAL,
+    WORKER_PREFETCH,
+    STREAM_EXTRACTION,
+    FETCH_CACHE_ENABLED,
+    ARCHIVE_ENABLED,
+    ADAPTIVE_CONCURRENCY,
+    CONCURRENCY_INITIAL_LIMIT,
+    CONCURRENCY_WINDOW,
+    CONCURRENCY_PER_PROXY,
+    CONCURRENCY_PROXY_INITIAL_LIMIT,
+    CONCURRENCY_PROXY_MAX_LIMIT,
+    HEDGE_ENABLED,
+    QUEUE_DOMAIN_WEIGHTS,
+    TASK_LEASE_SECONDS,
+)
 
 logger = logging.getLogger(__name__)
 
+# Proxies passed over for being at their concurrency limit before waiting on one
+PROXY_PICK_ATTEMPTS = 3
+# Seconds the claimer waits before checking again while no proxy is available
+NO_PROXY_WAIT = 1.0
+# Share of a lease kept for the fetch itself; a rate limit wait that would
+# cut into it extends the lease first
+LEASE_FETCH_SHARE = 0.5
+
+
+class LeaseLost(Exception):
+    """The lease on a task ran out while it waited, so it may be running elsewhere"""
+
+
+class RateLimitUnavailable(Exception):
+    """The shared rate limiter could not be asked, which is neither the task's nor the proxy's fault"""
+
+
 class Worker:
-    def __init__(self, worker_id: str):
+    def __init__(
+        self,
+        worker_id: str,
+        slots: int = WORKER_SLOTS,
+        drain_timeout: float = WORKER_DRAIN_TIMEOUT,
+        prefetch: int = WORKER_PREFETCH,
+    ):
         """Initialize a worker process
         
         Args:
             worker_id: Unique identifier for this worker
+            slots: Number of tasks this worker processes concurrently; with
+                ADAPTIVE_CONCURRENCY the most the adaptive limit can reach
+            drain_timeout: Seconds in-flight tasks get to finish after stop()
+            prefetch: Claimed tasks kept buffered beyond the busy slots
         """
         self.worker_id = worker_id
+        self.slots = max(1, slots)
+        self.drain_timeout = drain_timeout
+        self.prefetch = max(0, prefetch)
         self.redis_client = RedisClient()
-        self.proxy_manager = ProxyManager()
+        self.frontier = Frontier(self.redis_client)
+        # One connection pool per worker, shared by scrapes and proxy checks
+        self.sessions = SessionManager()
+        self.proxy_manager = ProxyManager(self.sessions)
+        self.proxy_pool = ProxyPool(self.proxy_manager.repo)
+        # Request outcomes per proxy, written to Mongo in periodic batches
+        self.proxy_stats = ProxyStatsAggregator(self.proxy_manager.repo)
+        self.rate_limiter = RateLimiter(self.redis_client.redisClient)
+        # Pages are parsed in a process pool so big parses don't stall the loop
+        self.extractor = create_extractor()
+        # Unchanged pages are answered from the cache shared by all workers
+        self.cache = FetchCache(self.redis_client.redisClient) if FETCH_CACHE_ENABLED else None
+        # Results are buffered and written in batches off the task path
+        self.results = BufferedResultWriter()
+        # Raw pages are kept for re-extraction when archiving is enabled
+        self.archive = PageArchive() if ARCHIVE_ENABLED else None
+        # Concurrency follows fetch latency and error rates, globally and
+        # optionally per proxy
+        self.limiter = AIMDLimiter(
+            min(CONCURRENCY_INITIAL_LIMIT, self.slots), self.slots, name=worker_id
+        ) if ADAPTIVE_CONCURRENCY else None
+        self.proxy_limiters: Optional[Dict[str, AIMDLimiter]] = {} if CONCURRENCY_PER_PROXY else None
+        # Fetches slow to return headers get a second attempt through another proxy
+        self.hedging = HedgePolicy() if HEDGE_ENABLED else None
         self.running = False
+        self.in_flight = 0
+        self._next_reap = 0.0
+        self._next_schedule = 0.0
+        # url -> time.monotonic() by which the lease on a claimed task runs out
+        self._lease_deadlines: Dict[str, float] = {}
+        self._stopping: Optional[asyncio.Event] = None
+        # Claimed tasks waiting for a free slot, and a flag raised whenever a
+        # slot frees up so the claimer can top the buffer up
+        self._buffer: Optional[asyncio.Queue] = None
+        self._space: Optional[asyncio.Event] = None
         
     async def process_task(self, task: Dict[str, Any]) -> bool:
+        """Scrape a claimed task and ack or nack it depending on the outcome"""
+        proxy = None
+        proxy_limiter = None
+        started = None
+        trace = start_trace(task['url'])
         try:
             url = task['url']
             priority = task['priority']
             
-            # Get a proxy from the proxy manager
-            proxy = self.proxy_manager.get_proxy()
+            # Get a proxy from the in-memory pool
+            with stage("proxy_select"):
+                proxy, proxy_limiter = await self._select_proxy()
+            if proxy is None and USE_PROXY:
+                # Not the task's fault: hand it back without counting an attempt
+                logger.debug(f"Worker {self.worker_id}: No healthy proxy available, released {url}")
+                await self._hand_back(task, trace)
+                return False
             
-            # Process the task using our scraper
-            result = await scrape_product(
-                url=url,
-                headers=HEADERS,
-                timeout=30,
-                proxy=proxy
-            )
+            # Respect the per-domain and per-proxy limits shared by all workers
+            keep_leased = partial(self._keep_leased, task)
+            with stage("rate_limit"):
+                await self._wait_for_rate_limit(url, proxy, keep_leased)
             
-            logger.info(f"Worker {self.worker_id}: Task completed. Result: {result}")
-            await self.redis_client.remove_task(obj=task)
-            return True
+            # Process the task using our scraper
+            started = time.monotonic()
+            result, winner, latency = await self._fetch(url, proxy, keep_leased)
+            # When a hedge through another proxy won, the proxy we picked lost the race
+            self._observe(SUCCESS, time.monotonic() - started, started, proxy_limiter if winner == proxy else None)
+            proxy = winner
+            if proxy:
+                self._record_proxy_success(proxy, latency)
             
+        except asyncio.CancelledError:
+            # Shutdown cut the task short: hand it back for another worker
+            if proxy:
+                self.proxy_pool.release(proxy)
+            await self._hand_back(task, trace)
+            raise
+        except RateLimitUnavailable as e:
+            # Like a missing proxy, hand it back without counting an attempt
+            if proxy:
+                self.proxy_pool.release(proxy)
+            logger.error(f"Worker {self.worker_id}: {e}, released {task['url']}")
+            await self._hand_back(task, trace)
+            return False
+        except LeaseLost as e:
+            # Another worker may have it by now, so it is neither acked nor nacked
+            if proxy:
+                self.proxy_pool.release(proxy)
+            logger.warning(f"Worker {self.worker_id}: {e}")
+            TASKS.labels("lost").inc()
+            finish_trace(trace, "lost")
+            return False
         except Exception as e:
+            status = getattr(e, "status", None)
+            if started is not None:
+                self._observe(self._outcome_of(e), None, started, proxy_limiter)
+            await self._record_proxy_failure(task['url'], proxy, status)
             logger.error(f"Worker {self.worker_id}: Error processing task: {e}")
+            outcome = await self.redis_client.nack_task(task, str(e))
+            if outcome["status"] == "retry":
+                logger.info(f"Worker {self.worker_id}: Retrying {task['url']} in {outcome['delay']:.1f}s")
+            elif outcome["status"] == "dead":
+                logger.warning(f"Worker {self.worker_id}: {task['url']} exhausted its retries")
+            TASKS.labels(outcome["status"]).inc()
+            finish_trace(trace, outcome["status"])
             return False
+        finally:
+            self._lease_deadlines.pop(task['url'], None)
+            if proxy_limiter is not None:
+                proxy_limiter.release()
+
+        logger.debug(f"Worker {self.worker_id}: Task completed. Result: {result}")
+        with stage("result_enqueue"):
+            await self.results.put({
+                "url": task['url'],
+                "data": result,
+                "worker_id": self.worker_id,
+                "proxy": proxy,
+                "scraped_at": datetime.utcnow()
+            })
+        with stage("ack"):
+            await self.redis_client.ack_task(task)
+        TASKS.labels("succeeded").inc()
+        finish_trace(trace, "succeeded")
+        return True
+
+    async def _hand_back(self, task: Dict[str, Any], trace):
+        """Return a claimed task to the queue without counting an attempt"""
+        await self.redis_client.release_task(task)
+        TASKS.labels("released").inc()
+        finish_trace(trace, "released")
+
+    async def _wait_for_rate_limit(self, url: str, proxy: Optional[str], on_wait=None):
+        """Acquire the shared rate limits for a fetch, see RateLimiter.acquire
+
+        Raises:
+            LeaseLost: If on_wait found the lease gone
+            RateLimitUnavailable: If the limiter or the lease extension failed
+        """
+        try:
+            await self.rate_limiter.acquire(url, proxy, on_wait=on_wait)
+        except LeaseLost:
+            raise
+        except Exception as e:
+            raise RateLimitUnavailable(f"Rate limiter unavailable: {e}") from e
+
+    async def _attempt(self, url: str, proxy: Optional[str], on_headers=None) -> Dict[str, Any]:
+        return await scrape_product(
+            url=url,
+            headers=HEADERS,
+            timeout=REQUEST_TIMEOUT,
+            proxy=proxy,
+            session=self.sessions.get_session(),
+            extractor=self.extractor,
+            stream=STREAM_EXTRACTION,
+            cache=self.cache,
+            on_headers=on_headers,
+            archive=self.archive
+        )
+
+    async def _fetch(self, url: str, proxy: Optional[str], on_wait=None) -> Tuple[Dict[str, Any], Optional[str], float]:
+        """Scrape url through proxy, hedging through a second proxy when headers are slow
+
+        With hedging, an attempt that has no response headers after the
+        policy's delay gets a second attempt through another healthy proxy,
+        budget permitting. The first attempt to succeed wins and the other
+        one is cancelled; the task only fails if both do. on_wait is
+        passed to the rate limiter when a hedge has to wait on it.
+
+        Returns:
+            The result, the proxy of the attempt that produced it and that
+            attempt's latency
+        """
+        started = time.monotonic()
+        if self.hedging is None or proxy is None:
+            result = await self._attempt(url, proxy)
+            return result, proxy, time.monotonic() - started
+
+        self.hedging.on_request()
+        headers = asyncio.Event()
+
+        def on_headers():
+            self.hedging.observe_headers(time.monotonic() - started)
+            headers.set()
+
+        primary = asyncio.create_task(self._attempt(url, proxy, on_headers))
+        # attempt -> (proxy, started, per-proxy limiter of a hedge)
+        attempts = {primary: (proxy, started, None)}
+        try:
+            delay = self.hedging.delay
+            if delay is not None:
+                header_wait = asyncio.create_task(headers.wait())
+                await asyncio.wait([primary, header_wait], timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                header_wait.cancel()
+            hedge = None
+            if delay is not None and not primary.done() and not headers.is_set():
+                hedge = self._start_hedge(url, proxy, on_wait)
+            if hedge is None:
+                result = await primary
+                return result, proxy, time.monotonic() - started
+            attempts[hedge[0]] = hedge[1:]
+            return await self._race(url, primary, attempts)
+        finally:
+            unfinished = [attempt for attempt in attempts if not attempt.done()]
+            if primary in unfinished and not headers.is_set():
+                # Its headers would have come later than this, so the time so far
+                # is a lower bound; without it hedging would only learn from
+                # the fast primaries and its delay would keep shrinking
+                self.hedging.observe_headers(time.monotonic() - started)
+            for attempt in unfinished:
+                attempt.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+            for attempt, (attempt_proxy, _, limiter) in attempts.items():
+                # A cancelled attempt has no outcome to report for its proxy
+                if attempt in unfinished:
+                    self.proxy_pool.release(attempt_proxy)
+                if limiter is not None:
+                    limiter.release()
+
+    def _start_hedge(self, url: str, exclude: str, on_wait=None):
+        """Start a hedge attempt through a proxy other than exclude, if budget and proxies allow"""
+        if not self.hedging.try_spend():
+            HEDGES.labels("no_budget").inc()
+            return None
+        for _ in range(PROXY_PICK_ATTEMPTS):
+            candidate = self.proxy_pool.get_proxy()
+            if candidate is None:
+                break
+            if candidate == exclude:
+                continue
+            limiter = None
+            if self.proxy_limiters is not None:
+                limiter = self._proxy_limiter(candidate)
+                if not limiter.try_acquire():
+                    self.proxy_pool.release(candidate)
+                    continue
+            HEDGES.labels("started").inc()
+
+            async def attempt():
+                await self._wait_for_rate_limit(url, candidate, on_wait)
+                return await self._attempt(url, candidate)
+
+            return asyncio.create_task(attempt()), candidate, time.monotonic(), limiter
+        self.hedging.refund()
+        HEDGES.labels("no_proxy").inc()
+        return None
+
+    async def _race(self, url: str, primary: asyncio.Task, attempts: Dict) -> Tuple[Dict[str, Any], Optional[str], float]:
+        """Wait for the first attempt to succeed; failures of the others are recorded here"""
+        pending = set(attempts)
+        primary_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            succeeded = [attempt for attempt in done if attempt.exception() is None]
+            for attempt in done:
+                error = attempt.exception()
+                if error is None:
+                    continue
+                if isinstance(error, LeaseLost):
+                    raise error
+                attempt_proxy, attempt_started, limiter = attempts[attempt]
+                if isinstance(error, RateLimitUnavailable):
+                    # The hedge never fetched, so its proxy has no outcome to report
+                    HEDGES.labels("failed").inc()
+                    self.proxy_pool.release(attempt_proxy)
+                    continue
+                if limiter is not None:
+                    limiter.observe(self._outcome_of(error), None, attempt_started)
+                if attempt is primary:
+                    primary_error = error
+                else:
+                    HEDGES.labels("failed").inc()
+                    await self._record_proxy_failure(url, attempt_proxy, getattr(error, "status", None))
+            if not succeeded:
+                continue
+
+            winner = succeeded[0]
+            winner_proxy, winner_started, limiter = attempts[winner]
+            latency = time.monotonic() - winner_started
+            if limiter is not None:
+                limiter.observe(SUCCESS, latency, winner_started)
+            HEDGES.labels("lost" if winner is primary else "won").inc()
+            if primary_error is not None:
+                await self._record_proxy_failure(url, attempts[primary][0], getattr(primary_error, "status", None))
+            # A primary that lost to a hedge started later is too slow: route around it
+            if primary in pending:
+                self.proxy_pool.record_failure(attempts[primary][0])
+            return winner.result(), winner_proxy, latency
+        raise primary_error
+
+    def _record_proxy_success(self, proxy: str, latency: float):
+        self.proxy_pool.record_success(proxy, latency)
+        self.proxy_stats.record_success(proxy, latency)
+        PROXY_REQUESTS.labels(proxy, "success").inc()
+        PROXY_LATENCY.labels(proxy).observe(latency)
+
+    async def _record_proxy_failure(self, url: str, proxy: Optional[str], status: Optional[int]):
+        if proxy:
+            self.proxy_pool.record_failure(proxy, status)
+            self.proxy_stats.record_failure(proxy, status)
+            PROXY_REQUESTS.labels(proxy, "failure").inc()
+        await self.rate_limiter.report(url, proxy, status)
+
+    @staticmethod
+    def _outcome_of(error: Exception) -> str:
+        """Whether a failed fetch means we are going too fast"""
+        if getattr(error, "status", None) in BLOCK_STATUSES or getattr(error, "timeout", False):
+            return OVERLOAD
+        return ERROR
+
+    async def _keep_leased(self, task: Dict[str, Any], wait: float):
+        """Extend the lease of a task about to wait `wait` seconds if the wait would cut into its fetch time"""
+        now = time.monotonic()
+        deadline = self._lease_deadlines.get(task['url'], now + TASK_LEASE_SECONDS)
+        if now + wait <= deadline - TASK_LEASE_SECONDS * LEASE_FETCH_SHARE:
+            return
+        lease = wait + TASK_LEASE_SECONDS
+        if not await self.redis_client.extend_lease(task, lease):
+            raise LeaseLost(f"Lease on {task['url']} expired while waiting for the rate limit")
+        self._lease_deadlines[task['url']] = now + lease
+
+    async def _select_proxy(self) -> Tuple[Optional[str], Optional[AIMDLimiter]]:
+        """Pick a proxy from the pool, and with per-proxy limits a permit for it
+
+        Proxies at their limit are passed over for another pick a few times
+        before waiting for a permit on the last one.
+        """
+        proxy = self.proxy_pool.get_proxy()
+        if proxy is None or self.proxy_limiters is None:
+            return proxy, None
+        for _ in range(PROXY_PICK_ATTEMPTS):
+            limiter = self._proxy_limiter(proxy)
+            if limiter.try_acquire():
+                return proxy, limiter
+            candidate = self.proxy_pool.get_proxy()
+            if candidate is not None and candidate != proxy:
+                # The proxy passed over may be a half-open trial
+                self.proxy_pool.release(proxy)
+                proxy = candidate
+        limiter = self._proxy_limiter(proxy)
+        try:
+            await limiter.acquire()
+        except asyncio.CancelledError:
+            self.proxy_pool.release(proxy)
+            raise
+        return proxy, limiter
+
+    def _proxy_limiter(self, proxy: str) -> AIMDLimiter:
+        limiter = self.proxy_limiters.get(proxy)
+        if limiter is None:
+            # A proxy sees a fraction of the worker's requests, so it adjusts
+            # on smaller windows
+            limiter = self.proxy_limiters[proxy] = AIMDLimiter(
+                CONCURRENCY_PROXY_INITIAL_LIMIT,
+                CONCURRENCY_PROXY_MAX_LIMIT,
+                window=max(5, CONCURRENCY_WINDOW // 4),
+                name=proxy,
+            )
+        return limiter
+
+    def _observe(self, outcome: str, latency: Optional[float], started: float, proxy_limiter: Optional[AIMDLimiter]):
+        """Feed a fetch outcome to the concurrency limiters"""
+        if self.limiter is not None:
+            self.limiter.observe(outcome, latency, started)
+        if proxy_limiter is not None:
+            proxy_limiter.observe(outcome, latency, started)
+
+    async def schedule_recrawls(self):
+        """Queue frontier recrawls that are due, at most once per FRONTIER_SCHEDULE_INTERVAL"""
+        now = time.monotonic()
+        if now < self._next_schedule:
+            return
+        self._next_schedule = now + FRONTIER_SCHEDULE_INTERVAL
+        scheduled = await self.frontier.schedule_due()
+        if scheduled:
+            logger.info(f"Worker {self.worker_id}: Queued {scheduled} due recrawls")
+
+    async def reap_expired_leases(self):
+        """Requeue tasks abandoned by crashed workers, at most once per LEASE_REAPER_INTERVAL"""
+        now = time.monotonic()
+        if now < self._next_reap:
+            return
+        self._next_reap = now + LEASE_REAPER_INTERVAL
+        reaped = await self.redis_client.requeue_expired_leases()
+        if reaped:
+            logger.info(f"Worker {self.worker_id}: Requeued {reaped} expired leases")
     
     async def start(self):
-        """Start the worker process"""
-        logger.info(f"Worker {self.worker_id}: Starting...")
+        """Start the worker process
+
+        A single claimer keeps `slots` processing loops on this event loop
+        supplied with tasks, and the call returns once stop() has been
+        called and in-flight tasks are drained.
+        """
+        logger.info(f"Worker {self.worker_id}: Starting with {self.slots} slots...")
         self.running = True
+        self._stopping = asyncio.Event()
+        self._buffer = asyncio.Queue()
+        self._space = asyncio.Event()
+        slots = []
+        claimer = None
         
+        REGISTRY.add_refresher(self.refresh_metrics)
+        try:
+            await self.redis_client.set_domain_weights(json.loads(QUEUE_DOMAIN_WEIGHTS))
+            await self.proxy_pool.start()
+            await self.proxy_stats.start()
+            await self.results.start()
+            if self.archive is not None:
+                await self.archive.start()
+            slots = [asyncio.create_task(self._run_slot(i)) for i in range(self.slots)]
+            claimer = asyncio.create_task(self._claim_loop())
+            await self._stopping.wait()
+
+            # Stop claiming and hand buffered tasks straight back to the queue
+            await asyncio.wait([claimer], timeout=self.drain_timeout)
+            await self._release_buffered()
+            for _ in slots:
+                self._buffer.put_nowait(None)
+            
+            # Let in-flight tasks finish, then cancel (and release) the rest
+            if self.in_flight:
+                logger.info(f"Worker {self.worker_id}: Draining {self.in_flight} in-flight tasks...")
+            _, pending = await asyncio.wait(slots, timeout=self.drain_timeout)
+            if pending:
+                logger.warning(f"Worker {self.worker_id}: Drain timed out, releasing {len(pending)} tasks")
+        finally:
+            tasks = slots + ([claimer] if claimer else [])
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._release_buffered()
+            await self.proxy_pool.stop()
+            await self.proxy_stats.stop()
+            await self.results.close()
+            if self.archive is not None:
+                await self.archive.close()
+            await self.sessions.close()
+            self.extractor.close()
+            REGISTRY.remove_refresher(self.refresh_metrics)
+            for breaker in (CLOSED, HALF_OPEN, OPEN):
+                PROXY_BREAKERS.remove(self.worker_id, breaker)
+            CONCURRENCY_LIMIT.remove(self.worker_id)
+            HEDGE_DELAY.remove(self.worker_id)
+            for proxy in self.proxy_limiters or {}:
+                PROXY_CONCURRENCY_LIMIT.remove(self.worker_id, proxy)
+            logger.info(f"Worker {self.worker_id}: Stopped")
+
+    async def refresh_metrics(self):
+        """Fill in gauges that are only computed when metrics are scraped"""
+        for state, count in (await self.redis_client.queue_stats()).items():
+            QUEUE_DEPTH.labels(state).set(count)
+        RESULTS_PENDING.set(self.results.pending)
+        TASKS_BUFFERED.set(self._buffer.qsize() if self._buffer else 0)
+        breakers = {CLOSED: 0, HALF_OPEN: 0, OPEN: 0}
+        for proxy in self.proxy_pool.snapshot():
+            breakers[proxy["breaker"]] += 1
+        for breaker, count in breakers.items():
+            PROXY_BREAKERS.labels(self.worker_id, breaker).set(count)
+        if self.limiter is not None:
+            CONCURRENCY_LIMIT.labels(self.worker_id).set(self.limiter.limit)
+        if self.hedging is not None:
+            HEDGE_DELAY.labels(self.worker_id).set(self.hedging.delay or 0)
+        for proxy, limiter in (self.proxy_limiters or {}).items():
+            PROXY_CONCURRENCY_LIMIT.labels(self.worker_id, proxy).set(limiter.limit)
+
+    async def _claim_loop(self):
+        """Keep the buffer stocked with claimed tasks, sleeping in BLPOP while the queue is empty
+
+        Tasks are claimed in batches of up to `prefetch` beyond the busy
+        slots, so a busy worker pays one round trip per batch rather than
+        per task. An idle one is woken by the signal that enqueueing pushes.
+        Nothing is claimed while every proxy's breaker is open.
+        """
         while self.running:
-            task = await self.redis_client.get_task()
-            if task:
-                logger.info(f"Worker {self.worker_id}: Processing task: {task}")
-                await self.process_task(task)
-            else:
-                logger.info(f"Worker {self.worker_id}: No tasks available. Waiting...")
-                await asyncio.sleep(5)  # Wait before checking again
+            try:
+                await self.reap_expired_leases()
+                await self.schedule_recrawls()
+                if USE_PROXY and not self.proxy_pool.has_available():
+                    # Claimed tasks could only be released again until a breaker half-opens
+                    logger.debug(f"Worker {self.worker_id}: No healthy proxy available. Waiting...")
+                    await self._idle(NO_PROXY_WAIT)
+                    continue
+                concurrency = self.limiter.limit if self.limiter is not None else self.slots
+                wanted = concurrency + self.prefetch - self.in_flight - self._buffer.qsize()
+                starving = self._buffer.empty() and self.in_flight < concurrency
+                if wanted <= 0 or (wanted < self.prefetch and not starving):
+                    self._space.clear()
+                    await self._until_stopped(self._space.wait())
+                    continue
+
+                # Leases start when the claim runs, a little after this
+                leased_until = time.monotonic() + TASK_LEASE_SECONDS
+                with stage("queue_pop"):
+                    tasks = await self.redis_client.claim_tasks(wanted, TASK_LEASE_SECONDS)
+                for task in tasks:
+                    self._lease_deadlines[task['url']] = leased_until
+                    self._buffer.put_nowait(task)
+                if not tasks:
+                    logger.debug(f"Worker {self.worker_id}: No tasks available. Waiting...")
+                    await self._until_stopped(self.redis_client.wait_for_tasks(WORKER_IDLE_INTERVAL))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Worker {self.worker_id}: Error claiming tasks: {e}")
+                await self._idle(1)
+
+    async def _run_slot(self, slot: int):
+        """One processing loop; a worker runs `slots` of these concurrently
+
+        With adaptive concurrency a slot only takes a task once it holds a
+        permit, so slots above the current limit wait without holding one.
+        """
+        while True:
+            if self.limiter is not None:
+                await self.limiter.acquire()
+            try:
+                task = await self._buffer.get()
+                if task is None:
+                    return
+                logger.debug(f"Worker {self.worker_id}[{slot}]: Processing task: {task}")
+                self.in_flight += 1
+                IN_FLIGHT.inc()
+                try:
+                    await self.process_task(task)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Worker {self.worker_id}[{slot}]: Unexpected error: {e}")
+                finally:
+                    self.in_flight -= 1
+                    IN_FLIGHT.dec()
+                    self._space.set()
+            finally:
+                if self.limiter is not None:
+                    self.limiter.release()
+
+    async def _release_buffered(self):
+        """Return claimed tasks that never reached a slot to the queue"""
+        tasks = []
+        while self._buffer is not None and not self._buffer.empty():
+            task = self._buffer.get_nowait()
+            if task is not None:
+                self._lease_deadlines.pop(task['url'], None)
+                tasks.append(task)
+        if tasks:
+            released = await self.redis_client.release_tasks(tasks)
+            logger.info(f"Worker {self.worker_id}: Released {released} prefetched tasks")
+
+    async def _until_stopped(self, awaitable):
+        """Await awaitable, but give up as soon as the worker is stopped"""
+        waiter = asyncio.ensure_future(awaitable)
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        try:
+            await asyncio.wait([waiter, stopping], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for future in (waiter, stopping):
+                future.cancel()
+            await asyncio.gather(waiter, stopping, return_exceptions=True)
+
+    async def _idle(self, seconds: float):
+        """Sleep, but wake up immediately when the worker is stopped"""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
     
     def stop(self):
-        """Stop the worker process"""
+        """Stop the worker process
+
+        Slots stop claiming new tasks, in-flight tasks get drain_timeout
+        seconds to finish, and the worker's HTTP connection pool is closed
+        on the way out of start().
+        """
         logger.info(f"Worker {self.worker_id}: Stopping...")
-        self.running = False
\ No newline at end of file
+        self.running = False
+        if self._stopping is not None:
+            self._stopping.set()
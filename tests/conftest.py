@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.storage import redis_client as redis_client_module
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    """A RedisClient on an empty in-process fakeredis server (runs the Lua scripts with lupa)"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_client_module, "Redis", lambda host=None, port=None, **kwargs: redis)
+    return redis_client_module.RedisClient()
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """The shared MongoClient pointed at an empty mongomock-motor database"""
+    mongomock = pytest.importorskip("mongomock")
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from config.settings import MONGO_DB
+    from src.storage.mongo_client import MongoClient
+
+    # mongomock's bulk builder predates the sort option pymongo passes for UpdateOne
+    add_update = mongomock.collection.BulkOperationBuilder.add_update
+
+    def add_update_without_sort(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.BulkOperationBuilder, "add_update", add_update_without_sort)
+    client = MongoClient()
+    fake = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(client, "client", fake)
+    monkeypatch.setattr(client, "db", fake[MONGO_DB])
+    return client
@@ -0,0 +1,91 @@
+import os
+import json
+import asyncio
+
+from src.storage.archive import SegmentWriter, PageArchive, iter_segment, list_segments, read_index, INDEX_SUFFIX
+from src.storage.result_writer import JsonlResultSink
+from src.tasks import reextract as reextract_module
+from src.tasks.reextract import iter_jobs
+
+PAGE = b"<html><body><span id='productTitle'> Item %d </span><div id='corePrice_feature_div'><span class='a-offscreen'>$%d.99</span></div></body></html>"
+
+
+def write_pages(directory, count, segment_size=10 * 1024 * 1024):
+    writer = SegmentWriter(str(directory), segment_size)
+    for start in range(0, count, 25):
+        writer.append([
+            ({"url": f"https://a.com/{i}", "fetched_at": 1700000000 + i, "status": 200, "charset": "utf-8"}, PAGE % (i, i))
+            for i in range(start, min(count, start + 25))
+        ])
+    writer.close()
+    return list_segments(str(directory))
+
+
+def test_pages_round_trip_with_and_without_index(tmp_path):
+    [segment] = write_pages(tmp_path, 60)
+    pages = list(iter_segment(segment))
+    assert [header["url"] for header, _ in pages] == [f"https://a.com/{i}" for i in range(60)]
+    assert pages[7][1] == PAGE % (7, 7)
+    assert [url for _, _, url in read_index(segment)] == [header["url"] for header, _ in pages]
+
+    # A lost index falls back to scanning the gzip members
+    os.remove(segment + INDEX_SUFFIX)
+    assert list(iter_segment(segment)) == pages
+
+
+def test_truncated_segment_keeps_complete_pages(tmp_path):
+    [segment] = write_pages(tmp_path, 10)
+    os.remove(segment + INDEX_SUFFIX)
+    with open(segment, "r+b") as f:
+        f.truncate(os.path.getsize(segment) - 5)
+    assert [header["url"] for header, _ in iter_segment(segment)] == [f"https://a.com/{i}" for i in range(9)]
+
+
+def test_segments_rotate_at_their_size(tmp_path):
+    segments = write_pages(tmp_path, 100, segment_size=1)
+    assert len(segments) == 4
+    assert sum(1 for path in segments for _ in iter_segment(path)) == 100
+
+
+def test_archive_writes_queued_pages_on_close(tmp_path):
+    async def scenario():
+        archive = PageArchive(str(tmp_path))
+        await archive.start()
+        for i in range(30):
+            await archive.put(f"https://a.com/{i}", PAGE % (i, i), "utf-8")
+        await archive.close()
+        return archive
+
+    archive = asyncio.run(scenario())
+    assert (archive.written, archive.dropped) == (30, 0)
+    [segment] = list_segments(str(tmp_path))
+    assert len(list(iter_segment(segment))) == 30
+
+
+def test_jobs_slice_indexes_lazily(tmp_path):
+    indexed = write_pages(tmp_path / "indexed", 120)
+    unindexed = write_pages(tmp_path / "unindexed", 30)
+    os.remove(unindexed[0] + INDEX_SUFFIX)
+
+    jobs = iter_jobs(indexed + unindexed, pages_per_job=50)
+    path, entries = next(jobs)
+    assert path == indexed[0] and [url for _, _, url in entries] == [f"https://a.com/{i}" for i in range(50)]
+    assert [(path, len(entries) if entries else None) for path, entries in jobs] == [
+        (indexed[0], 50), (indexed[0], 20), (unindexed[0], None),
+    ]
+
+
+def test_reextract_writes_every_archived_page(tmp_path, monkeypatch):
+    write_pages(tmp_path / "archive", 120)
+    monkeypatch.setattr(reextract_module, "JOBS_PER_PROCESS", 1)
+    monkeypatch.setattr(reextract_module, "create_result_sink", lambda kind: JsonlResultSink(str(tmp_path / "results")))
+
+    stats = asyncio.run(reextract_module.reextract(str(tmp_path / "archive"), "jsonl", processes=2))
+    assert (stats["segments"], stats["jobs"], stats["results"]) == (1, 3, 120)
+    [results] = os.listdir(tmp_path / "results")
+    with open(tmp_path / "results" / results) as f:
+        rows = {row["url"]: row for row in map(json.loads, f)}
+    assert len(rows) == 120
+    assert rows["https://a.com/3"]["data"]["title"] == "Item 3"
+    assert rows["https://a.com/3"]["data"]["price"] == "$3.99"
+    assert rows["https://a.com/3"]["worker_id"] == "reextract"
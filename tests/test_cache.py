@@ -0,0 +1,99 @@
+import asyncio
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.core.extractor import InlineExtractor
+from src.core.scraper import scrape_product
+from src.storage.cache import FetchCache, canonical_url
+
+PAGE = b"<html><body><span id='productTitle'>Widget</span></body></html>"
+
+
+def test_canonical_url():
+    assert canonical_url(" HTTPS://Example.COM:443/p?b=2&a=1#reviews ") == "https://example.com/p?a=1&b=2"
+    assert canonical_url("http://example.com:8080") == "http://example.com:8080/"
+
+
+def test_entries_are_shared_through_redis_and_evicted_locally(queue):
+    async def scenario():
+        first = FetchCache(queue.redisClient, local_size=2)
+        await first.set("https://a.com/1", {"title": "one"}, etag='"v1"')
+        await first.set("https://a.com/2", {"title": "two"})
+        await first.set("https://a.com/3", {"title": "three"})
+        assert len(first._local) == 2
+
+        second = FetchCache(queue.redisClient)
+        entry = await second.get("https://A.com/1")
+        assert entry["result"] == {"title": "one"}
+        assert FetchCache.conditional_headers(entry) == {"If-None-Match": '"v1"'}
+        assert await second.get("https://a.com/4") is None
+        assert second.stats["hits"] == 1 and second.stats["misses"] == 1
+
+    asyncio.run(scenario())
+
+
+class CountingExtractor(InlineExtractor):
+    calls = 0
+
+    async def extract(self, html, encoding=None):
+        self.calls += 1
+        return await super().extract(html, encoding)
+
+
+async def serve(handler):
+    app = web.Application()
+    app.router.add_get("/p", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+async def fetch(server, cache, extractor):
+    async with aiohttp.ClientSession() as session:
+        return await scrape_product(str(server.make_url("/p")), {}, 5, session=session, extractor=extractor, cache=cache)
+
+
+def test_not_modified_reuses_the_cached_result(queue):
+    async def scenario():
+        seen = []
+
+        async def handler(request):
+            seen.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return web.Response(status=304)
+            return web.Response(body=PAGE, content_type="text/html", headers={"ETag": '"v1"'})
+
+        server = await serve(handler)
+        cache, extractor = FetchCache(queue.redisClient), CountingExtractor()
+        try:
+            assert await fetch(server, cache, extractor) == {"title": "Widget", "price": None, "rating": None, "availability": None}
+            assert (await fetch(server, cache, extractor))["title"] == "Widget"
+        finally:
+            await server.close()
+        assert seen == [None, '"v1"']
+        assert extractor.calls == 1
+        assert cache.stats["not_modified"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_unchanged_body_skips_extraction(queue):
+    async def scenario():
+        pages = [PAGE, PAGE, PAGE.replace(b"Widget", b"Gadget")]
+
+        async def handler(request):
+            return web.Response(body=pages.pop(0), content_type="text/html")
+
+        server = await serve(handler)
+        cache, extractor = FetchCache(queue.redisClient), CountingExtractor()
+        try:
+            titles = [(await fetch(server, cache, extractor))["title"] for _ in range(3)]
+        finally:
+            await server.close()
+        assert titles == ["Widget", "Widget", "Gadget"]
+        assert extractor.calls == 2
+        assert cache.stats["unchanged"] == 1
+
+    asyncio.run(scenario())
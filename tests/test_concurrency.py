@@ -0,0 +1,109 @@
+import time
+import asyncio
+
+import pytest
+
+from src.core.concurrency import AIMDLimiter, SUCCESS, ERROR, OVERLOAD
+
+
+def saturate(limiter):
+    while limiter.try_acquire():
+        pass
+
+
+def drain(limiter):
+    while limiter.in_flight:
+        limiter.release()
+
+
+def healthy_window(limiter, latency=0.1):
+    saturate(limiter)
+    drain(limiter)
+    for _ in range(limiter.window):
+        limiter.observe(SUCCESS, latency)
+
+
+def test_grows_after_healthy_saturated_windows():
+    limiter = AIMDLimiter(2, 4, window=10)
+    healthy_window(limiter)
+    assert limiter.limit == 3
+    healthy_window(limiter)
+    healthy_window(limiter)
+    assert limiter.limit == 4
+
+
+def test_does_not_grow_while_below_the_limit():
+    limiter = AIMDLimiter(4, 10, window=10)
+    for _ in range(30):
+        assert limiter.try_acquire()
+        limiter.release()
+        limiter.observe(SUCCESS, 0.1)
+    assert limiter.limit == 4
+
+
+def test_backs_off_on_errors_and_latency():
+    limiter = AIMDLimiter(8, 8, window=10, backoff=0.5, max_error_rate=0.2)
+    for outcome in [ERROR] * 3 + [SUCCESS] * 7:
+        limiter.observe(outcome, 0.1)
+    assert limiter.limit == 4
+
+    # The latency baseline is the lowest p95 seen; twice as slow is unhealthy
+    limiter = AIMDLimiter(8, 8, window=10, backoff=0.5, latency_tolerance=1.5)
+    healthy_window(limiter, 0.1)
+    healthy_window(limiter, 0.2)
+    assert limiter.limit == 4
+
+
+def test_overloads_sent_together_back_off_once():
+    limiter = AIMDLimiter(8, 8, window=100, backoff=0.5)
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.observe(OVERLOAD, None, started)
+    assert limiter.limit == 4
+    limiter.observe(OVERLOAD, None, time.monotonic())
+    assert limiter.limit == 2
+    for _ in range(5):
+        limiter.observe(OVERLOAD)
+    assert limiter.limit == 1
+
+
+def test_waiters_get_permits_in_order():
+    async def scenario():
+        limiter = AIMDLimiter(1, 1)
+        assert limiter.try_acquire()
+        order = []
+
+        async def waiter(name):
+            await limiter.acquire()
+            order.append(name)
+
+        tasks = [asyncio.create_task(waiter(name)) for name in "abc"]
+        await asyncio.sleep(0)
+        tasks[1].cancel()
+        for _ in range(2):
+            limiter.release()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert order == ["a", "c"]
+        assert limiter.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_passes_its_wakeup_on():
+    async def scenario():
+        limiter = AIMDLimiter(1, 1)
+        assert limiter.try_acquire()
+        first = asyncio.create_task(limiter.acquire())
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release()
+        # first is woken but cancelled before it runs
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await asyncio.wait_for(second, 1)
+        assert limiter.in_flight == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,67 @@
+from src.core.extractor import Extractor, StreamingExtraction
+
+HEAD = (
+    b"<html><head><meta charset='utf-8'></head><body>"
+    b"<span id='productTitle'>  Widget   Pro </span>"
+    b"<span id='acrPopover' title='4.5 out of 5 stars'></span>"
+    b"<div id='corePrice_feature_div'><span class='a-offscreen'>$9.99</span></div>"
+    b"<div id='availability'><span> In Stock </span></div>"
+)
+FILLER = b"<div class='row'><ul>" + b"<li><a href='/dp/x'>Related</a></li>" * 20 + b"</ul></div>"
+PAGE = HEAD + FILLER * 200 + b"</body></html>"
+
+
+def chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_extracts_the_default_schema():
+    assert Extractor().extract(PAGE) == {
+        "title": "Widget Pro",
+        "price": "$9.99",
+        "rating": "4.5 out of 5 stars",
+        "availability": "In Stock",
+    }
+    assert Extractor().extract(b"<html><body></body></html>") == {
+        "title": "Title not found", "price": None, "rating": None, "availability": None,
+    }
+
+
+def test_streaming_matches_full_extraction_and_stops_early():
+    expected = Extractor().extract(PAGE)
+    for size in (7, 256, 4096):
+        stream = Extractor().stream()
+        parts = chunks(PAGE, size)
+        fed = 0
+        for part in parts:
+            fed += 1
+            if stream.feed(part):
+                break
+        assert stream.close() == expected
+        # Everything after the fields is skipped
+        assert fed < len(parts) / 2
+
+
+def test_open_elements_are_not_final():
+    stream = Extractor({"title": {"xpath": "//*[@id='productTitle']"}}).stream()
+    assert not stream.feed(b"<html><body><span id='productTitle'>Wid")
+    assert not stream.feed(b"get</span>")
+    assert stream.feed(b"<p>next</p>" * 100)
+    assert stream.close() == {"title": "Widget"}
+
+
+def test_missing_fields_are_evaluated_on_a_geometric_schedule(monkeypatch):
+    calls = []
+    resolve = StreamingExtraction._resolve
+
+    def counting(self, open_elements):
+        calls.append(self._fed)
+        resolve(self, open_elements)
+
+    monkeypatch.setattr(StreamingExtraction, "_resolve", counting)
+    stream = Extractor({"missing": {"xpath": "//*[@id='nothing']", "default": "n/a"}}).stream()
+    parts = chunks(PAGE, 100)
+    for part in parts:
+        assert not stream.feed(part)
+    assert len(calls) < 30 < len(parts)
+    assert stream.close() == {"missing": "n/a"}
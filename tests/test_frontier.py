@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.storage import redis_client as redis_client_module
+from src.tasks import frontier as frontier_module
+from src.tasks.frontier import Frontier, canonicalize
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.amazon.com/dp/B08N5WRWNW",
+    "https://amazon.com/Echo-Dot/dp/b08n5wrwnw/ref=sr_1_1?keywords=echo&qid=1",
+    "http://smile.amazon.com/gp/product/B08N5WRWNW?psc=1",
+    "https://m.amazon.com/gp/aw/d/B08N5WRWNW",
+    "https://www.amazon.com/exec/obidos/ASIN/B08N5WRWNW/",
+])
+def test_amazon_product_urls_collapse_to_the_asin(url):
+    assert canonicalize(url) == "https://www.amazon.com/dp/B08N5WRWNW"
+
+
+def test_canonicalize_other_urls():
+    assert canonicalize("https://www.amazon.co.uk/Widget/dp/B000000001") == "https://www.amazon.co.uk/dp/B000000001"
+    # Amazon pages that are not products are normalized like any other URL
+    assert canonicalize("https://www.amazon.com/s?k=echo&ref=nb") == "https://www.amazon.com/s?k=echo"
+    assert canonicalize(" HTTPS://Shop.example.com:443/p?utm_source=x&b=2&a=1&gclid=y#top ") == "https://shop.example.com/p?a=1&b=2"
+    assert canonicalize("ftp://example.com/file") is None
+    assert canonicalize("not a url") is None
+
+
+def test_spellings_of_one_url_are_queued_once(queue):
+    async def scenario():
+        frontier = Frontier(queue)
+        added = await frontier.add_many([
+            ("https://amazon.com/x/dp/B08N5WRWNW?ref=a", 1, 0),
+            ("https://www.amazon.com/dp/B08N5WRWNW", 1, 0),
+            ("mailto:someone@example.com", 1, 0),
+            ("https://a.com/1?utm_medium=email", 1, 0),
+        ])
+        assert added == 2
+        assert not await frontier.add("https://A.com/1", 5, 0)
+        claimed = sorted(task["url"] for task in await queue.claim_tasks(5))
+        assert claimed == ["https://a.com/1", "https://www.amazon.com/dp/B08N5WRWNW"]
+
+    asyncio.run(scenario())
+
+
+def test_recrawls_are_queued_when_due(queue, monkeypatch):
+    clock = SimpleNamespace(now=1_000_000.0)
+    clock.time = lambda: clock.now
+    monkeypatch.setattr(frontier_module, "time", clock)
+
+    async def scenario():
+        frontier = Frontier(queue)
+        assert await frontier.add("https://a.com/1", 1, 3600)
+        await queue.ack_task(await queue.claim_task())
+        assert await frontier.schedule_due() == 0
+        assert not await frontier.add("https://a.com/1", 1, 3600)
+
+        clock.now += 3600
+        assert await frontier.schedule_due() == 1
+        # Not queued twice while the recrawl is still in the queue
+        clock.now += 3600
+        assert await frontier.schedule_due() == 0
+        assert await queue.queue_size() == 1
+        # Recrawls carry the digest too, so a dead-lettered one is forgotten
+        assert (await queue.claim_task())["digest"] == Frontier._digest("https://a.com/1")
+
+        await frontier.forget("https://a.com/1")
+        assert await frontier.stats() == {"seen": 0, "scheduled": 0}
+
+    asyncio.run(scenario())
+
+
+def test_dead_lettered_url_can_be_queued_again(queue, monkeypatch):
+    monkeypatch.setattr(redis_client_module, "MAX_RETRIES", 0)
+
+    async def scenario():
+        frontier = Frontier(queue)
+        assert await frontier.add("https://a.com/1?utm_source=x", 1, 0)
+        task = await queue.claim_task()
+        assert task["url"] == "https://a.com/1"
+        # Still seen while it is queued, in flight or waiting to retry
+        assert not await frontier.add("https://a.com/1", 1, 0)
+
+        assert (await queue.nack_task(task, "boom"))["status"] == "dead"
+        assert await frontier.add("https://a.com/1", 1, 0)
+        assert await queue.queue_size() == 1
+
+    asyncio.run(scenario())
+
+
+def test_acked_url_stays_seen(queue):
+    async def scenario():
+        frontier = Frontier(queue)
+        assert await frontier.add("https://a.com/1", 1, 0)
+        await queue.ack_task(await queue.claim_task())
+        assert not await frontier.add("https://a.com/1", 1, 0)
+        assert (await frontier.stats())["seen"] == 1
+
+    asyncio.run(scenario())
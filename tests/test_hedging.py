@@ -0,0 +1,48 @@
+from src.core.hedging import HedgePolicy, MIN_SAMPLES, RECOMPUTE_EVERY
+
+
+def test_no_delay_until_enough_samples():
+    policy = HedgePolicy(quantile=0.9, min_delay=0.01)
+    for _ in range(MIN_SAMPLES - 1):
+        policy.observe_headers(1.0)
+    assert policy.delay is None
+    policy.observe_headers(1.0)
+    assert policy.delay == 1.0
+
+
+def test_delay_follows_the_quantile_with_a_floor():
+    policy = HedgePolicy(quantile=0.9, min_delay=0.05)
+    for i in range(100):
+        policy.observe_headers(i / 100)
+    assert policy.delay == 0.9
+
+    fast = HedgePolicy(quantile=0.9, min_delay=0.05)
+    for _ in range(MIN_SAMPLES):
+        fast.observe_headers(0.001)
+    assert fast.delay == 0.05
+
+
+def test_delay_is_recomputed_every_few_samples():
+    policy = HedgePolicy(quantile=0.5, min_delay=0.0)
+    for _ in range(MIN_SAMPLES):
+        policy.observe_headers(1.0)
+    for _ in range(RECOMPUTE_EVERY - 1):
+        policy.observe_headers(5.0)
+    assert policy.delay == 1.0
+    for _ in range(2 * RECOMPUTE_EVERY):
+        policy.observe_headers(5.0)
+    assert policy.delay == 5.0
+
+
+def test_budget_caps_hedges_per_request():
+    policy = HedgePolicy(budget=0.25)
+    spent = 0
+    for _ in range(20):
+        policy.on_request()
+        spent += policy.try_spend()
+    assert spent == 5
+
+    assert not policy.try_spend()
+    policy.on_request()
+    policy.refund()
+    assert policy.try_spend()
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from src.tasks import jobs as jobs_module
+from src.tasks.jobs import JobRunner, JobStore, FAILED, RUNNING, SUCCEEDED
+
+
+@pytest.fixture
+def store(queue):
+    return JobStore(queue.redisClient)
+
+
+def test_coalesced_jobs_share_one_id_until_finished(store):
+    async def scenario():
+        job_id, created = await store.create("clean", coalesce=True)
+        assert created
+        assert await store.create("clean", coalesce=True) == (job_id, False)
+        # Other kinds and uncoalesced jobs are not affected
+        assert (await store.create("migrate", coalesce=True))[1]
+        assert (await store.create("clean"))[1]
+
+        await store.finish(job_id, "clean", True, status=SUCCEEDED)
+        next_id, created = await store.create("clean", coalesce=True)
+        assert created and next_id != job_id
+
+    asyncio.run(scenario())
+
+
+def test_failed_create_releases_the_lock(store, monkeypatch):
+    async def scenario():
+        hset = store.redis.hset
+
+        async def broken(*args, **kwargs):
+            raise ConnectionError("Redis went away")
+
+        monkeypatch.setattr(store.redis, "hset", broken)
+        with pytest.raises(ConnectionError):
+            await store.create("clean", coalesce=True)
+        monkeypatch.setattr(store.redis, "hset", hset)
+        assert (await store.create("clean", coalesce=True))[1]
+
+    asyncio.run(scenario())
+
+
+def test_runner_reports_progress_and_result(store):
+    async def scenario():
+        runner = JobRunner(store)
+        release = asyncio.Event()
+
+        async def job(progress):
+            await progress({"checked": 1})
+            await release.wait()
+            return {"checked": 2}
+
+        job_id, created = await runner.submit("clean", job, coalesce=True)
+        assert created
+        assert await runner.submit("clean", job, coalesce=True) == (job_id, False)
+        await asyncio.sleep(0.01)
+        running = await store.get(job_id)
+        assert running["status"] == RUNNING and running["progress"] == {"checked": 1}
+
+        release.set()
+        await asyncio.gather(*runner._tasks)
+        done = await store.get(job_id)
+        assert done["status"] == SUCCEEDED and done["result"] == {"checked": 2}
+        assert (await runner.submit("clean", job, coalesce=True))[0] != job_id
+        await runner.close()
+        assert (await store.get(job_id))["status"] == SUCCEEDED
+
+    asyncio.run(scenario())
+
+
+def test_failed_jobs_record_the_error(store):
+    async def scenario():
+        runner = JobRunner(store)
+
+        async def job(progress):
+            raise ValueError("bad file")
+
+        job_id, _ = await runner.submit("migrate", job)
+        await asyncio.gather(*runner._tasks)
+        job = await store.get(job_id)
+        assert job["status"] == FAILED and job["error"] == "bad file"
+
+    asyncio.run(scenario())
+
+
+def test_heartbeat_survives_store_errors(store, monkeypatch):
+    monkeypatch.setattr(jobs_module, "JOB_LOCK_TTL", 0.03)
+
+    async def scenario():
+        runner = JobRunner(store)
+        update = store.update
+        beats = []
+
+        async def flaky_update(job_id, kind, coalesce, **fields):
+            if not fields:
+                beats.append(len(beats))
+                if len(beats) <= 2:
+                    raise ConnectionError("Redis went away")
+            await update(job_id, kind, coalesce, **fields)
+
+        monkeypatch.setattr(store, "update", flaky_update)
+
+        async def job(progress):
+            await asyncio.sleep(0.1)
+            return {}
+
+        job_id, _ = await runner.submit("clean", job)
+        await asyncio.gather(*runner._tasks)
+        assert len(beats) >= 4
+        assert (await store.get(job_id))["status"] == SUCCEEDED
+
+    asyncio.run(scenario())
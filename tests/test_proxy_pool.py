@@ -0,0 +1,114 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import proxy_pool as proxy_pool_module
+from src.core.proxy_pool import ProxyPool, CLOSED, HALF_OPEN, OPEN
+
+
+class StaticRepo:
+    def __init__(self, urls):
+        self.urls = list(urls)
+
+    async def get_active_urls(self):
+        return self.urls
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    clock.monotonic = lambda: clock.now
+    monkeypatch.setattr(proxy_pool_module, "time", clock)
+    return clock
+
+
+def make_pool(*urls):
+    pool = ProxyPool(StaticRepo(urls))
+    asyncio.run(pool.refresh())
+    return pool
+
+
+def breakers(pool):
+    return {state["url"]: state["breaker"] for state in pool.snapshot()}
+
+
+def test_failures_open_the_breaker(clock):
+    pool = make_pool("http://a", "http://b")
+    for _ in range(proxy_pool_module.PROXY_BREAKER_FAILURES - 1):
+        pool.record_failure("http://a")
+    assert breakers(pool)["http://a"] == CLOSED
+    pool.record_failure("http://a")
+    assert breakers(pool)["http://a"] == OPEN
+    assert {pool.get_proxy() for _ in range(50)} == {"http://b"}
+
+
+def test_forbidden_streak_opens_the_breaker_sooner(clock):
+    pool = make_pool("http://a")
+    for _ in range(proxy_pool_module.PROXY_BREAKER_FORBIDDEN):
+        pool.record_failure("http://a", 403)
+    assert breakers(pool)["http://a"] == OPEN
+    assert pool.get_proxy() is None
+    assert not pool.has_available()
+
+
+def open_breaker(pool, url):
+    for _ in range(proxy_pool_module.PROXY_BREAKER_FAILURES):
+        pool.record_failure(url)
+
+
+def test_half_open_trial_closes_on_success(clock):
+    pool = make_pool("http://a")
+    open_breaker(pool, "http://a")
+    clock.now += proxy_pool_module.PROXY_BREAKER_COOLDOWN
+    assert pool.get_proxy() == "http://a"
+    assert breakers(pool)["http://a"] == HALF_OPEN
+    # One trial at a time
+    assert pool.get_proxy() is None
+
+    pool.record_success("http://a", 0.1)
+    assert breakers(pool)["http://a"] == CLOSED
+    assert pool.get_proxy() == "http://a"
+
+
+def test_failed_trial_doubles_the_cooldown(clock):
+    pool = make_pool("http://a")
+    cooldown = proxy_pool_module.PROXY_BREAKER_COOLDOWN
+    open_breaker(pool, "http://a")
+    clock.now += cooldown
+    pool.record_failure(pool.get_proxy())
+    assert breakers(pool)["http://a"] == OPEN
+
+    clock.now += cooldown
+    assert pool.get_proxy() is None
+    clock.now += cooldown
+    assert pool.get_proxy() == "http://a"
+
+
+def test_released_trial_goes_back_into_rotation(clock):
+    pool = make_pool("http://a")
+    open_breaker(pool, "http://a")
+    clock.now += proxy_pool_module.PROXY_BREAKER_COOLDOWN
+    assert pool.get_proxy() == "http://a"
+    pool.release("http://a")
+    assert pool.get_proxy() == "http://a"
+
+
+def test_selection_favours_healthy_fast_proxies(clock):
+    pool = make_pool("http://fast", "http://slow")
+    for _ in range(10):
+        pool.record_success("http://fast", 0.1)
+        pool.record_success("http://slow", 3.0)
+    picks = [pool.get_proxy() for _ in range(1000)]
+    # Power of two choices: the worse proxy only wins when drawn twice
+    assert 150 < picks.count("http://slow") < 350
+
+
+def test_refresh_drops_removed_proxies_and_keeps_state(clock):
+    pool = make_pool("http://a", "http://b")
+    open_breaker(pool, "http://a")
+    pool.repo.urls = ["http://a", "http://c"]
+    asyncio.run(pool.refresh())
+    assert breakers(pool) == {"http://a": OPEN, "http://c": CLOSED}
+    assert {pool.get_proxy() for _ in range(50)} == {"http://c"}
+    assert len(pool) == 2
@@ -0,0 +1,41 @@
+import asyncio
+from datetime import datetime
+
+from src.models.proxy import ProxyCreate
+from src.repositories.proxy_repo import ProxyRepository
+
+
+def test_upsert_keeps_blacklist_and_health_of_known_proxies(mongo):
+    async def scenario():
+        repo = ProxyRepository()
+        blacklisted_at = datetime(2024, 1, 1)
+        await repo.collection.insert_one({
+            **ProxyCreate(url="http://1.1.1.1:80").model_dump(),
+            "is_active": False,
+            "blacklisted": True,
+            "blacklisted_at": blacklisted_at,
+            "failures": 7,
+            "consecutive_forbidden": 3,
+            "success_count": 12,
+        })
+
+        checked_at = datetime(2024, 2, 1)
+        result = await repo.bulk_upsert([
+            ProxyCreate(url="http://1.1.1.1:80", last_checked=checked_at),
+            ProxyCreate(url="http://2.2.2.2:80", last_checked=checked_at),
+        ])
+        assert (result.matched_count, result.upserted_count) == (1, 1)
+
+        known = await repo.collection.find_one({"url": "http://1.1.1.1:80"})
+        assert known["blacklisted"] is True
+        assert known["blacklisted_at"] == blacklisted_at
+        assert known["is_active"] is False
+        assert (known["failures"], known["consecutive_forbidden"], known["success_count"]) == (7, 3, 12)
+        assert known["last_checked"] == checked_at
+
+        new = await repo.collection.find_one({"url": "http://2.2.2.2:80"})
+        assert new["blacklisted"] is False and new["is_active"] is True
+        assert new["failures"] == 0
+        assert await repo.get_active_urls() == ["http://2.2.2.2:80"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,203 @@
+import json
+import asyncio
+from collections import Counter
+from types import SimpleNamespace
+
+from src.storage import redis_client as redis_client_module
+
+
+def domain(task):
+    return task["url"].split("/")[2]
+
+
+def test_add_skips_known_urls(queue):
+    async def scenario():
+        assert await queue.add_task("https://a.com/1", 1)
+        assert not await queue.add_task("https://a.com/1", 5)
+        assert await queue.add_tasks([("https://a.com/1", 1), ("https://a.com/2", 1), ("https://a.com/2", 1)]) == 1
+        assert await queue.queue_size() == 2
+
+        # Claimed tasks stay in the dedup index until they are acked
+        tasks = await queue.claim_tasks(2)
+        assert not await queue.add_task("https://a.com/1", 1)
+        for task in tasks:
+            await queue.ack_task(task)
+        assert await queue.add_task("https://a.com/1", 1)
+
+    asyncio.run(scenario())
+
+
+def test_expired_leases_are_retried_then_dead_lettered(queue, monkeypatch):
+    monkeypatch.setattr(redis_client_module, "RETRY_BACKOFF_BASE", 0)
+    monkeypatch.setattr(redis_client_module, "RETRY_BACKOFF_JITTER", 0)
+    monkeypatch.setattr(redis_client_module, "MAX_RETRIES", 2)
+
+    async def scenario():
+        await queue.add_task("https://a.com/1", 1)
+        for attempt in range(3):
+            tasks = await queue.claim_tasks(1, lease_seconds=0)
+            assert [task["url"] for task in tasks] == ["https://a.com/1"]
+            assert tasks[0]["retries"] == attempt
+            await asyncio.sleep(0.01)
+            assert await queue.requeue_expired_leases() == 1
+
+        assert await queue.queue_stats() == {"queued": 0, "inflight": 0, "delayed": 0, "dead": 1}
+        dead = json.loads(await queue.redisClient.hget(queue.dead_tasks, "https://a.com/1"))
+        assert dead["retries"] == 3
+        assert dead["last_error"] == "Lease expired"
+        assert await queue.claim_tasks(1) == []
+
+    asyncio.run(scenario())
+
+
+def test_nack_schedules_a_delayed_retry(queue, monkeypatch):
+    monkeypatch.setattr(redis_client_module, "RETRY_BACKOFF_JITTER", 0)
+
+    async def scenario():
+        await queue.add_task("https://a.com/1", 1)
+        task = await queue.claim_task()
+        outcome = await queue.nack_task(task, "boom")
+        assert outcome == {"status": "retry", "delay": redis_client_module.RETRY_BACKOFF_BASE}
+        assert await queue.queue_stats() == {"queued": 0, "inflight": 0, "delayed": 1, "dead": 0}
+        assert await queue.claim_tasks(1) == []
+
+    asyncio.run(scenario())
+
+
+def test_release_does_not_count_an_attempt(queue):
+    async def scenario():
+        await queue.add_tasks([("https://a.com/1", 1), ("https://a.com/2", 1)])
+        tasks = await queue.claim_tasks(2)
+        assert await queue.release_tasks(tasks) == 2
+        # Only leased tasks can be released
+        assert await queue.release_tasks(tasks) == 0
+        assert await queue.queue_stats() == {"queued": 2, "inflight": 0, "delayed": 0, "dead": 0}
+
+        again = await queue.claim_tasks(2)
+        assert sorted(task["url"] for task in again) == ["https://a.com/1", "https://a.com/2"]
+        assert all(task["retries"] == 0 for task in again)
+
+    asyncio.run(scenario())
+
+
+def test_extend_lease_only_while_leased(queue):
+    async def scenario():
+        await queue.add_task("https://a.com/1", 1)
+        task = await queue.claim_task(lease_seconds=0)
+        assert await queue.extend_lease(task, 60)
+        await asyncio.sleep(0.01)
+        assert await queue.requeue_expired_leases() == 0
+        await queue.ack_task(task)
+        assert not await queue.extend_lease(task, 60)
+
+    asyncio.run(scenario())
+
+
+def test_domains_share_claims_by_weight(queue):
+    async def scenario():
+        await queue.set_domain_weights({"bulk.com": 3})
+        await queue.add_tasks([(f"https://bulk.com/{i}", 10) for i in range(1000)])
+        await queue.add_tasks([(f"https://a.com/{i}", 1) for i in range(1000)])
+        await queue.add_tasks([(f"https://B.com:8080/{i}", 1) for i in range(1000)])
+
+        claimed = Counter(domain(task) for task in await queue.claim_tasks(500))
+        assert claimed == {"bulk.com": 300, "a.com": 100, "B.com:8080": 100}
+        assert await queue.queue_size() == 2500
+
+    asyncio.run(scenario())
+
+
+def test_idle_domain_joins_at_the_current_turn(queue):
+    async def scenario():
+        await queue.add_tasks([(f"https://bulk.com/{i}", 10) for i in range(100)])
+        await queue.claim_tasks(50)
+        # a.com was idle while bulk.com was served, so it has no turns saved
+        # up: it joins at the last pass served, one turn behind bulk.com,
+        # rather than getting 50 turns in a row (equal passes go by name)
+        await queue.add_tasks([(f"https://a.com/{i}", 1) for i in range(10)])
+        claimed = [domain(task) for task in await queue.claim_tasks(6)]
+        assert claimed == ["a.com", "a.com", "bulk.com", "a.com", "bulk.com", "a.com"]
+
+    asyncio.run(scenario())
+
+
+def test_tasks_age_into_higher_priority(queue, monkeypatch):
+    clock = SimpleNamespace(time=lambda: 1_000_000.0)
+    monkeypatch.setattr(redis_client_module, "time", clock)
+
+    async def scenario():
+        interval = redis_client_module.QUEUE_AGING_INTERVAL
+        clock.time = lambda: 1_000_000.0 - 2 * interval
+        await queue.add_task("https://a.com/old-low", 4)
+        clock.time = lambda: 1_000_000.0 - 10
+        await queue.add_task("https://a.com/older-high", 5)
+        clock.time = lambda: 1_000_000.0
+        await queue.add_task("https://a.com/new-high", 5)
+        await queue.add_task("https://a.com/new-low", 1)
+
+        assert (await queue.get_task())["url"] == "https://a.com/old-low"
+        claimed = [task["url"] for task in await queue.claim_tasks(4)]
+        assert claimed == [
+            "https://a.com/old-low",
+            "https://a.com/older-high",
+            "https://a.com/new-high",
+            "https://a.com/new-low",
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_claiming_the_last_task_clears_wakeup_tokens(queue):
+    async def scenario():
+        await queue.add_tasks([(f"https://a.com/{i}", 1) for i in range(5)])
+        assert await queue.redisClient.llen(queue.task_signal) == 5
+        await queue.claim_tasks(3)
+        assert await queue.redisClient.llen(queue.task_signal) == 5
+        await queue.claim_tasks(2)
+        assert await queue.redisClient.llen(queue.task_signal) == 0
+
+    asyncio.run(scenario())
+
+
+def test_migrates_legacy_list(queue):
+    async def scenario():
+        await queue.add_task("https://a.com/1", 1)
+        await queue.redisClient.rpush(
+            queue.legacy_task_queue,
+            json.dumps({"url": "https://a.com/1", "priority": 1, "retries": 0}),
+            json.dumps({"url": "https://a.com/2", "priority": 3, "retries": 1}),
+            json.dumps({"url": "https://b.com/1", "priority": 2}),
+            "not json",
+        )
+
+        result = await queue.migrate_legacy_queue(batch_size=2)
+        assert result == {"migrated": 2, "duplicates": 1, "invalid": 1, "requeued": 0}
+        assert not await queue.redisClient.exists(queue.legacy_task_queue)
+        assert await queue.queue_size() == 3
+        claimed = {task["url"]: task for task in await queue.claim_tasks(3)}
+        assert set(claimed) == {"https://a.com/1", "https://a.com/2", "https://b.com/1"}
+        assert claimed["https://a.com/2"]["retries"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_migrates_single_sorted_set_queue(queue):
+    async def scenario():
+        redis = queue.redisClient
+        for url, priority in (("https://a.com/1", 1), ("https://a.com/2", 5), ("https://b.com/1", 2)):
+            await redis.hset(queue.task_data, url, json.dumps({"url": url, "priority": priority, "retries": 0}))
+            await redis.zadd(queue.single_task_queue, {url: priority})
+        # A member whose task data is gone is dropped
+        await redis.zadd(queue.single_task_queue, {"https://c.com/stale": 9})
+
+        result = await queue.migrate_legacy_queue(batch_size=2)
+        assert result["requeued"] == 3
+        assert not await redis.exists(queue.single_task_queue)
+        assert await queue.queue_size() == 3
+
+        claimed = [task["url"] for task in await queue.claim_tasks(3)]
+        assert sorted(claimed) == ["https://a.com/1", "https://a.com/2", "https://b.com/1"]
+        # Within a domain, priority order survives the move
+        assert claimed.index("https://a.com/2") < claimed.index("https://a.com/1")
+
+    asyncio.run(scenario())
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from src.core.rate_limiter import RateLimiter
+
+
+def limiter(queue, **kwargs):
+    options = dict(domain_rps=20, domain_burst=2, proxy_domain_rps=0, proxy_domain_burst=1, domain_overrides={}, enabled=True)
+    options.update(kwargs)
+    return RateLimiter(queue.redisClient, **options)
+
+
+def test_burst_then_one_request_per_interval(queue):
+    async def scenario():
+        limits = limiter(queue)
+        waits = []
+
+        async def on_wait(wait):
+            waits.append(wait)
+
+        assert await limits.acquire("https://a.com/1", on_wait=on_wait) == 0
+        assert await limits.acquire("https://a.com/2", on_wait=on_wait) == 0
+        waited = await limits.acquire("https://a.com/3", on_wait=on_wait)
+        assert 0 < waited <= 0.05 * 1.1 + 0.01
+        assert waits and sum(waits) == pytest.approx(waited)
+        # Other domains have limits of their own
+        assert await limits.acquire("https://b.com/1") == 0
+
+    asyncio.run(scenario())
+
+
+def test_domain_overrides_and_proxy_limits(queue):
+    async def scenario():
+        limits = limiter(queue, domain_burst=1, domain_overrides={"slow.com": 2}, proxy_domain_rps=10)
+        assert await limits.acquire("https://slow.com/1") == 0
+        assert await limits.acquire("https://slow.com/2") >= 0.45
+
+        # The proxy x domain limit is stricter than the domain's here
+        assert await limits.acquire("https://a.com/1", "http://user:pw@1.2.3.4:80") == 0
+        assert await limits.acquire("https://a.com/2", "http://1.2.3.4:80") >= 0.09
+        assert await limits.acquire("https://a.com/3", "http://5.6.7.8:80") <= 0.06
+
+    asyncio.run(scenario())
+
+
+def test_blocks_slow_the_limits_down(queue):
+    async def scenario():
+        limits = limiter(queue, domain_burst=1)
+        await limits.acquire("https://a.com/1")
+        await limits.report("https://a.com/1", None, 200)
+        assert await limits.acquire("https://a.com/2") <= 0.06
+
+        await limits.report("https://a.com/2", None, 429)
+        await limits.report("https://a.com/2", None, 503)
+        assert await queue.redisClient.get("scraper:ratelimit:penalty:domain:a.com") == "4"
+        await limits.acquire("https://a.com/3")
+        assert await limits.acquire("https://a.com/4") >= 0.19
+
+    asyncio.run(scenario())
+
+
+def test_on_wait_errors_stop_the_wait(queue):
+    async def scenario():
+        limits = limiter(queue, domain_rps=0.5, domain_burst=1)
+        await limits.acquire("https://a.com/1")
+
+        async def lease_lost(wait):
+            raise RuntimeError(f"would wait {wait:.1f}s")
+
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(limits.acquire("https://a.com/2", on_wait=lease_lost), 1)
+
+    asyncio.run(scenario())
+
+
+def test_disabled_limiter_never_waits(queue):
+    async def scenario():
+        limits = limiter(queue, domain_burst=1, enabled=False)
+        for i in range(5):
+            assert await limits.acquire(f"https://a.com/{i}") == 0
+        assert await queue.redisClient.keys("scraper:ratelimit:*") == []
+
+    asyncio.run(scenario())
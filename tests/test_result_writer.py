@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime
+
+from src.repositories.result_repo import ResultRepository
+from src.storage import result_writer as result_writer_module
+from src.storage.result_writer import BufferedResultWriter
+
+
+class FlakySink:
+    """Fails the first `failures` writes, then writes everything but the rejected URLs"""
+
+    def __init__(self, failures=0, rejected=()):
+        self.failures = failures
+        self.rejected = set(rejected)
+        self.batches = []
+        self.closed = False
+
+    async def write_batch(self, results):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("sink unavailable")
+        self.batches.append([result["url"] for result in results])
+        return sum(1 for result in results if result["url"] not in self.rejected)
+
+    async def close(self):
+        self.closed = True
+
+
+def results(count):
+    return [{"url": f"https://a.com/{i}", "data": {}} for i in range(count)]
+
+
+async def no_sleep(delay):
+    pass
+
+
+def test_batches_and_drains_on_close():
+    async def scenario():
+        sink = FlakySink()
+        writer = BufferedResultWriter(sink, batch_size=10, flush_interval=60)
+        await writer.start()
+        for result in results(25):
+            await writer.put(result)
+        await writer.close()
+        return writer, sink
+
+    writer, sink = asyncio.run(scenario())
+    assert [len(batch) for batch in sink.batches] == [10, 10, 5]
+    assert (writer.written, writer.dropped, writer.pending) == (25, 0, 0)
+    assert sink.closed
+
+
+def test_flushes_partial_batches_after_the_interval():
+    async def scenario():
+        sink = FlakySink()
+        writer = BufferedResultWriter(sink, batch_size=100, flush_interval=0.05)
+        await writer.start()
+        for result in results(3):
+            await writer.put(result)
+        await asyncio.sleep(0.2)
+        flushed = list(sink.batches)
+        await writer.close()
+        return flushed
+
+    assert asyncio.run(scenario()) == [["https://a.com/0", "https://a.com/1", "https://a.com/2"]]
+
+
+def test_retries_failed_writes_while_running(monkeypatch):
+    sleep = asyncio.sleep
+    monkeypatch.setattr(result_writer_module.asyncio, "sleep", no_sleep)
+
+    async def scenario():
+        sink = FlakySink(failures=5)
+        writer = BufferedResultWriter(sink, batch_size=10, flush_interval=60)
+        await writer.start()
+        for result in results(10):
+            await writer.put(result)
+        while not sink.batches:
+            await sleep(0.01)
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert (writer.written, writer.dropped) == (10, 0)
+
+
+def test_gives_up_after_a_few_tries_on_shutdown(monkeypatch):
+    monkeypatch.setattr(result_writer_module.asyncio, "sleep", no_sleep)
+
+    async def scenario():
+        writer = BufferedResultWriter(FlakySink(failures=100), batch_size=10, flush_interval=60)
+        await writer.start()
+        for result in results(4):
+            await writer.put(result)
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert (writer.written, writer.dropped) == (0, 4)
+
+
+def test_rejected_results_count_as_dropped():
+    async def scenario():
+        writer = BufferedResultWriter(FlakySink(rejected={"https://a.com/1"}), batch_size=10, flush_interval=60)
+        await writer.start()
+        for result in results(5):
+            await writer.put(result)
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert (writer.written, writer.dropped) == (4, 1)
+
+
+def test_mongo_write_batch_reports_rejected_documents(mongo):
+    async def scenario():
+        repo = ResultRepository()
+        await repo.collection.insert_one({"_id": "taken", "url": "https://a.com/0"})
+        batch = [
+            {"_id": "taken", "url": "https://a.com/0", "scraped_at": datetime.utcnow()},
+            {"url": "https://a.com/1", "scraped_at": datetime.utcnow()},
+        ]
+        written = await repo.write_batch(batch)
+        return written, await repo.collection.count_documents({})
+
+    assert asyncio.run(scenario()) == (1, 2)
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from src.core.extractor import create_extractor
+from src.core.hedging import HedgePolicy, MIN_SAMPLES
+from src.tasks import worker as worker_module
+from src.tasks.worker import Worker
+
+
+@pytest.fixture
+def make_worker(queue, mongo, monkeypatch):
+    """Builds a Worker on the fakes, without proxies and with inline extraction"""
+    monkeypatch.setattr(worker_module, "USE_PROXY", False)
+    monkeypatch.setattr(worker_module, "create_extractor", lambda: create_extractor(processes=0))
+    return lambda: Worker("test-worker", slots=1)
+
+
+def test_rate_limiter_errors_release_the_task(make_worker, queue):
+    async def scenario():
+        worker = make_worker()
+
+        async def unavailable(url, proxy=None, on_wait=None):
+            raise ConnectionError("Redis went away")
+
+        worker.rate_limiter.acquire = unavailable
+        await queue.add_task("https://a.com/1", 1)
+        assert not await worker.process_task(await queue.claim_task())
+
+        assert await queue.queue_stats() == {"queued": 1, "inflight": 0, "delayed": 0, "dead": 0}
+        assert (await queue.claim_task())["retries"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_hedges_keep_the_lease_while_waiting(make_worker):
+    async def scenario():
+        worker = make_worker()
+        worker.hedging = HedgePolicy(budget=1)
+        worker.hedging.on_request()
+        worker.proxy_pool.get_proxy = lambda: "http://hedge:80"
+        waits = []
+
+        async def acquire(url, proxy=None, on_wait=None):
+            waits.append((proxy, on_wait))
+
+        async def attempt(url, proxy, on_headers=None):
+            return {"title": url}
+
+        worker.rate_limiter.acquire = acquire
+        worker._attempt = attempt
+        keep_leased = object()
+        hedge, _, _, _ = worker._start_hedge("https://a.com/1", "http://primary:80", keep_leased)
+        assert await hedge == {"title": "https://a.com/1"}
+        assert waits == [("http://hedge:80", keep_leased)]
+
+    asyncio.run(scenario())
+
+
+def hedging_worker(make_worker, primary_seconds):
+    """A worker whose primary attempt takes primary_seconds without headers and whose hedges answer at once"""
+    worker = make_worker()
+    worker.hedging = HedgePolicy(min_delay=0.01)
+    for _ in range(MIN_SAMPLES):
+        worker.hedging.observe_headers(0.01)
+    worker.hedging._tokens = 1.0
+    worker.proxy_pool.get_proxy = lambda: "http://hedge:80"
+
+    async def acquire(url, proxy=None, on_wait=None):
+        pass
+
+    async def attempt(url, proxy, on_headers=None):
+        if proxy == "http://hedge:80":
+            return {"proxy": proxy}
+        await asyncio.sleep(primary_seconds)
+        return {"proxy": proxy}
+
+    worker.rate_limiter.acquire = acquire
+    worker._attempt = attempt
+    return worker
+
+
+def test_hedge_wins_against_a_slow_primary(make_worker):
+    async def scenario():
+        worker = hedging_worker(make_worker, 10)
+        result, winner, _ = await asyncio.wait_for(worker._fetch("https://a.com/1", "http://primary:80"), 1)
+        assert (result, winner) == ({"proxy": "http://hedge:80"}, "http://hedge:80")
+        # The cancelled primary still counts, as at least as slow as the hedge delay
+        assert len(worker.hedging._samples) == MIN_SAMPLES + 1
+        assert worker.hedging._samples[-1] >= 0.01
+
+    asyncio.run(scenario())
+
+
+def test_fast_primary_is_not_hedged(make_worker):
+    async def scenario():
+        worker = hedging_worker(make_worker, 0)
+        result, winner, _ = await worker._fetch("https://a.com/1", "http://primary:80")
+        assert winner == "http://primary:80"
+        assert worker.hedging._tokens == 1.0 + worker.hedging.budget
+        assert len(worker.hedging._samples) == MIN_SAMPLES
+
+    asyncio.run(scenario())
+
+
+def test_primary_result_is_used_when_the_hedge_fails(make_worker):
+    async def scenario():
+        worker = hedging_worker(make_worker, 0.05)
+        attempt = worker._attempt
+
+        async def failing_hedge(url, proxy, on_headers=None):
+            if proxy == "http://hedge:80":
+                raise ConnectionError("hedge failed")
+            return await attempt(url, proxy, on_headers)
+
+        worker._attempt = failing_hedge
+        result, winner, _ = await worker._fetch("https://a.com/1", "http://primary:80")
+        assert winner == "http://primary:80"
+
+    asyncio.run(scenario())